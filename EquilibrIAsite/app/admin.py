@@ -1,13 +1,42 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from .ciclo_consultas import registrar_faltas
 from .models import *
 
 admin.site.register(Usuario, UserAdmin) 
 admin.site.register(Psicologo)
-admin.site.register(Consulta)
 admin.site.register(HorarioDisponivel)
 admin.site.register(AutoavaliacaoEmocional)
+admin.site.register(RespostaIA)
 admin.site.register(InteracaoIA)
 admin.site.register(Notificacao)
 admin.site.register(Avaliacao)
-admin.site.register(Agenda)
\ No newline at end of file
+admin.site.register(ResumoAvaliacoes)
+admin.site.register(Agenda)
+admin.site.register(MensagemContato)
+admin.site.register(InscritoNewsletter)
+admin.site.register(ResumoDiarioConsultas)
+admin.site.register(ExecucaoRollup)
+admin.site.register(ListaEspera)
+
+
+@admin.register(Artigo)
+class ArtigoAdmin(admin.ModelAdmin):
+    list_display = ('titulo', 'categoria', 'autor', 'publicado', 'publicado_em', 'atualizado_em')
+    list_filter = ('publicado', 'categoria')
+    search_fields = ('titulo', 'resumo')
+    prepopulated_fields = {'slug': ('titulo',)}
+
+
+@admin.register(Consulta)
+class ConsultaAdmin(admin.ModelAdmin):
+    list_display = ('usuario', 'psicologo', 'data', 'horario', 'status')
+    list_filter = ('status',)
+    date_hierarchy = 'data'
+    actions = ['registrar_falta']
+
+    @admin.action(description='Registrar falta do paciente')
+    def registrar_falta(self, request, queryset):
+        # Só consultas já terminadas, não canceladas nem avaliadas; o paciente é notificado
+        total = registrar_faltas(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f'{total} falta(s) registrada(s) de {queryset.count()} consulta(s) selecionada(s).')
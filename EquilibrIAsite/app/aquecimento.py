@@ -0,0 +1,147 @@
+"""
+Aquecimento do worker.
+
+Chamado por config/wsgi.py e config/asgi.py ao carregar a aplicação: faz
+antes da primeira requisição o que o Django faria sob demanda nela, para que
+um worker recém-criado (fork, autoscaling) não atenda a primeira requisição
+lentamente. Fases:
+
+- urls: importa o urlconf (e com ele views, modelos e formulários) e monta
+  os índices de reverse() de todos os namespaces;
+- templates: compila todos os templates, que ficam no loader em cache;
+- banco: com o pool (DATABASE_POOL), abre as conexões dele, que servem a
+  todas as threads do worker. Sem o pool, só sob WSGI abre a conexão
+  persistente, que serve à thread que carregou a aplicação (workers sync do
+  gunicorn); sob ASGI o ORM roda em threads do asgiref e ela ficaria ociosa;
+- caches: conecta a cada cache e prepara a primeira página do blog;
+- recomendacao: monta a matriz de psicólogos do processo (se houver numpy);
+- hash: sobe os processos do pool de hash de senhas (app/hashers.py), que
+  senão seriam criados, carregando o Django, no primeiro login.
+
+Falhas numa fase (ex.: banco fora do ar na subida) são registradas no log e
+não impedem o worker de iniciar: o trabalho volta a ser feito sob demanda.
+Sob o runserver o aquecimento não roda: lá cada recarga de código carrega a
+aplicação de novo, e a partida rápida importa mais que a primeira requisição.
+Não use com o --preload do gunicorn: a conexão aberta no processo mestre
+seria herdada por todos os workers.
+"""
+import logging
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def aquecer_urls():
+    resolver = get_resolver()
+    pendentes = [resolver]
+    total = 0
+    while pendentes:
+        atual = pendentes.pop()
+        total += len(atual.reverse_dict)  # reverse_dict monta os índices do resolver
+        pendentes.extend(sub for _, sub in atual.namespace_dict.values())
+    return f'{total} padrões de URL'
+
+
+def _nomes_de_templates(diretorios):
+    for diretorio in diretorios:
+        for raiz, _, arquivos in os.walk(diretorio):
+            for arquivo in arquivos:
+                if arquivo.endswith(('.html', '.txt', '.xml')):
+                    yield os.path.relpath(os.path.join(raiz, arquivo), diretorio).replace(os.sep, '/')
+
+
+def aquecer_templates():
+    compilados = 0
+    for engine in engines.all():
+        diretorios = list(engine.dirs)
+        if engine.app_dirs:
+            diretorios += get_app_template_dirs(engine.app_dirname)
+        for nome in set(_nomes_de_templates(diretorios)):
+            try:
+                engine.get_template(nome)
+                compilados += 1
+            except Exception:
+                # Arquivos que não são templates deste engine (ex.: fragmentos de outro)
+                logger.debug('Template não compilado no aquecimento: %s', nome, exc_info=True)
+    return f'{compilados} templates'
+
+
+def aquecer_banco():
+    abertas = 0
+    for conexao in connections.all():
+        if conexao.settings_dict.get('OPTIONS', {}).get('pool'):
+            conexao.ensure_connection()
+            conexao.close()  # devolve ao pool, que continua com as conexões abertas
+        elif getattr(settings, 'SERVIDOR_ASGI', False):
+            continue
+        else:
+            conexao.ensure_connection()
+        abertas += 1
+    return f'{abertas} conexão(ões)' if abertas else 'sem pool sob ASGI: nada a abrir'
+
+
+def aquecer_caches():
+    from .blog import listar_artigos
+
+    for alias in settings.CACHES:
+        caches[alias].get('aquecimento')
+    # Primeira página do blog: a listagem mais acessada
+    listar_artigos()
+    return f'{len(settings.CACHES)} cache(s)'
+
+
+def aquecer_recomendacao():
+    from . import recomendacao
+
+    if not recomendacao.disponivel():
+        return 'numpy ausente'
+    matriz = recomendacao.matriz()
+    with matriz.trava:
+        matriz.sincronizar(recomendacao.versao_atual())
+    return f'{matriz.matriz.shape[0]} psicólogos'
+
+
+def aquecer_hash():
+    from .hashers import iniciar_pool
+
+    processos = iniciar_pool()
+    return f'{processos} processo(s)' if processos else 'sem pool (HASH_PROCESSOS = 0)'
+
+
+FASES = [
+    ('urls', aquecer_urls),
+    ('templates', aquecer_templates),
+    ('banco', aquecer_banco),
+    ('caches', aquecer_caches),
+    ('recomendacao', aquecer_recomendacao),
+    ('hash', aquecer_hash),
+]
+
+
+def aquecer(forcar=False):
+    """Executa as fases e devolve [(fase, segundos, detalhe ou erro)]."""
+    if not forcar and (not getattr(settings, 'AQUECIMENTO_ATIVO', True) or sys.argv[1:2] == ['runserver']):
+        return []
+    resultados = []
+    for nome, fase in FASES:
+        inicio = time.perf_counter()
+        try:
+            detalhe = fase()
+        except Exception as erro:
+            logger.exception('Falha no aquecimento (%s).', nome)
+            detalhe = f'erro: {type(erro).__name__}: {erro}'
+        resultados.append((nome, time.perf_counter() - inicio, detalhe))
+    logger.info(
+        'Worker aquecido: %s',
+        ', '.join(f'{nome} {duracao * 1000:.0f} ms' for nome, duracao, _ in resultados),
+    )
+    return resultados
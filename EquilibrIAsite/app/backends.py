@@ -0,0 +1,81 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
+
+from .hashers import agerar_hash, averificar_senha
+from .models import Usuario
+
+
+def normalizar_identificador(valor):
+    """Normalização comum a login e cadastro: sem espaços nas pontas e em minúsculas."""
+    return (valor or '').strip().lower()
+
+
+class UsuarioOuEmailBackend(ModelBackend):
+    """
+    Autentica pelo nome de usuário ou pelo e-mail, sem diferenciar
+    maiúsculas de minúsculas, com uma única consulta que usa os índices
+    funcionais LOWER(username) e LOWER(email).
+    """
+
+    def buscar_usuario(self, identificador):
+        """
+        Conta cujo nome de usuário ou e-mail coincide com o identificador.
+        Contas antigas podem repetir um nome ou e-mail com outras maiúsculas,
+        e um nome de usuário pode coincidir com o e-mail de outra conta: vence
+        o nome de usuário sobre o e-mail, a grafia exata sobre a outra e, no
+        empate, a conta mais antiga.
+        """
+        digitado = (identificador or '').strip()
+        identificador = normalizar_identificador(identificador)
+        if not identificador:
+            return None
+        prioridade = Case(
+            When(username=digitado, then=Value(0)),
+            When(username_lower=identificador, then=Value(1)),
+            When(email=digitado, then=Value(2)),
+            default=Value(3),
+        )
+        return (
+            Usuario.objects
+            .alias(username_lower=Lower('username'), email_lower=Lower('email'))
+            .filter(Q(username_lower=identificador) | Q(email_lower=identificador))
+            .order_by(prioridade, 'pk')
+            .first()
+        )
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(Usuario.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        usuario = self.buscar_usuario(username)
+        if usuario is None:
+            # Calcula um hash mesmo assim, para não revelar pelo tempo de resposta se a conta existe
+            Usuario().set_password(password)
+            return None
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """Como authenticate, com o hash no pool de app/hashers.py (fora do event loop)."""
+        if username is None:
+            username = kwargs.get(Usuario.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        usuario = await sync_to_async(self.buscar_usuario)(username)
+        if usuario is None:
+            await agerar_hash(password)
+            return None
+        correta, novo_hash = await averificar_senha(password, usuario.password)
+        if not correta:
+            return None
+        if novo_hash:
+            # Hash antigo (outro algoritmo ou custos menores): regrava com o atual
+            usuario.password = novo_hash
+            await usuario.asave(update_fields=['password'])
+        return usuario if self.user_can_authenticate(usuario) else None
@@ -0,0 +1,189 @@
+"""
+Leitura do blog com cache.
+
+Artigos são lidos com projeções (.only) e a listagem usa paginação por chave
+(publicado_em, id): qualquer página custa o mesmo que a primeira, sem OFFSET
+nem COUNT. Listagens, feed e sitemap ficam em cache sob uma versão do blog,
+incrementada a cada alteração de artigo (ver signals.py), e só são gerados
+de novo depois de uma publicação ou edição. Cada artigo fica em cache pelo
+slug, com o HTML já renderizado no save(). Sem um cache compartilhado entre
+os processos (app/caches.py), as entradas duram no máximo BLOG_TTL_LOCAL:
+os outros workers não veem a invalidação.
+"""
+import datetime
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+
+from .caches import compartilhado
+from .models import Artigo
+
+CAMPOS_LISTAGEM = ('id', 'titulo', 'slug', 'autor', 'categoria', 'resumo', 'tempo_leitura', 'publicado_em')
+CAMPOS_ARTIGO = CAMPOS_LISTAGEM + ('corpo_html', 'atualizado_em')
+POR_PAGINA = 9
+CHAVE_VERSAO = 'blog:versao'
+_EPOCA = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _ttl():
+    ttl = getattr(settings, 'BLOG_CACHE_TTL', 60 * 60)
+    if compartilhado('default'):
+        return ttl
+    # Num cache local, a invalidação só vale para o processo que alterou o artigo
+    return min(ttl, getattr(settings, 'BLOG_TTL_LOCAL', 60))
+
+
+def versao_blog():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        # Recomeça num valor novo: nada do que foi guardado antes é reaproveitado
+        cache.add(CHAVE_VERSAO, time.time_ns(), None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def invalidar_blog(slug):
+    cache.delete(f'blog:artigo:{slug}')
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        pass  # sem versão em cache: a próxima leitura cria uma nova
+
+
+def publicados():
+    return Artigo.objects.filter(publicado=True).order_by('-publicado_em', '-id')
+
+
+# --- Listagem (paginação por chave) ---
+
+def codificar_cursor(artigo):
+    microssegundos = (artigo.publicado_em - _EPOCA) // datetime.timedelta(microseconds=1)
+    return f'{microssegundos}_{artigo.id}'
+
+
+def decodificar_cursor(cursor):
+    """(microssegundos de publicado_em, id) ou None, se o cursor for inválido."""
+    try:
+        microssegundos, artigo_id = (int(parte) for parte in cursor.split('_'))
+        datetime.timedelta(microseconds=microssegundos)
+    except (ValueError, OverflowError):
+        return None
+    return microssegundos, artigo_id
+
+
+def listar_artigos(cursor=None):
+    """(artigos da página, cursor da próxima página ou None)."""
+    posicao = decodificar_cursor(cursor) if cursor else None
+    chave = f'blog:lista:{versao_blog()}:' + ('%d_%d' % posicao if posicao else '')
+    pagina = cache.get(chave)
+    if pagina is None:
+        artigos = publicados().only(*CAMPOS_LISTAGEM)
+        if posicao:
+            microssegundos, artigo_id = posicao
+            publicado_em = _EPOCA + datetime.timedelta(microseconds=microssegundos)
+            artigos = artigos.filter(
+                Q(publicado_em__lt=publicado_em) | Q(publicado_em=publicado_em, id__lt=artigo_id)
+            )
+        artigos = list(artigos[:POR_PAGINA + 1])
+        proximo = codificar_cursor(artigos[POR_PAGINA - 1]) if len(artigos) > POR_PAGINA else None
+        pagina = (artigos[:POR_PAGINA], proximo)
+        cache.set(chave, pagina, _ttl())
+    return pagina
+
+
+# --- Página do artigo ---
+
+def obter_artigo(slug):
+    """Artigo publicado (só os campos exibidos) ou None; no máximo uma consulta."""
+    chave = f'blog:artigo:{slug}'
+    artigo = cache.get(chave)
+    if artigo is None:
+        artigo = publicados().only(*CAMPOS_ARTIGO).filter(slug=slug).first() or False
+        # Slugs inexistentes também ficam em cache, por menos tempo
+        cache.set(chave, artigo, _ttl() if artigo else min(_ttl(), 60))
+    return artigo or None
+
+
+def etag_artigo(artigo, request):
+    # O menu do base.html muda com o usuário: a ETag também
+    usuario = request.user.pk if request.user.is_authenticated else 0
+    psicologo = int(request.perfil.eh_psicologo) if usuario else 0
+    versao = (artigo.atualizado_em - _EPOCA) // datetime.timedelta(microseconds=1)
+    return f'"artigo-{artigo.id}-{versao}-{usuario}-{psicologo}"'
+
+
+# --- Feed e sitemap ---
+
+def em_cache_por_versao(view):
+    """Guarda a resposta da view até a próxima alteração de artigo."""
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        chave = f'blog:resposta:{versao_blog()}:{request.get_host()}:{request.get_full_path()}'
+        resposta = cache.get(chave)
+        if resposta is None:
+            resposta = view(request, *args, **kwargs)
+            if hasattr(resposta, 'render'):
+                resposta.render()
+            if resposta.status_code == 200:
+                cache.set(chave, resposta, _ttl())
+        return resposta
+    return _view
+
+
+class ArtigosFeed(Feed):
+    title = 'Blog Equilibria'
+    description = 'Artigos, dicas e reflexões sobre saúde mental e bem-estar'
+
+    def link(self):
+        return reverse('blog')
+
+    def items(self):
+        return publicados().only(*CAMPOS_LISTAGEM, 'atualizado_em')[:20]
+
+    def item_title(self, artigo):
+        return artigo.titulo
+
+    def item_description(self, artigo):
+        return artigo.resumo
+
+    def item_author_name(self, artigo):
+        return artigo.autor
+
+    def item_categories(self, artigo):
+        return [artigo.categoria]
+
+    def item_pubdate(self, artigo):
+        return artigo.publicado_em
+
+    def item_updateddate(self, artigo):
+        return artigo.atualizado_em
+
+
+class ArtigoSitemap(Sitemap):
+    changefreq = 'weekly'
+    limit = 5000  # artigos por página do sitemap
+
+    def items(self):
+        return Artigo.objects.filter(publicado=True).only('slug', 'atualizado_em').order_by('id')
+
+    def lastmod(self, artigo):
+        return artigo.atualizado_em
+
+
+class PaginasSitemap(Sitemap):
+    changefreq = 'monthly'
+
+    def items(self):
+        return ['home', 'sobre', 'servicos', 'profissionais', 'blog', 'contato', 'emergencias']
+
+    def location(self, nome):
+        return reverse(nome)
+
+
+SITEMAPS = {'paginas': PaginasSitemap, 'blog': ArtigoSitemap}
@@ -0,0 +1,17 @@
+"""
+Caches que guardam estado que outro processo pode invalidar.
+
+O contexto do chat (app/contexto.py), o log de alterações da recomendação
+(app/recomendacao.py) e o blog (app/blog.py) são invalidados por sinais, no
+processo que fez a alteração. Num cache local (LocMemCache, o padrão sem
+REDIS_URL), os outros workers não veriam a invalidação e continuariam usando
+o valor antigo até o TTL. Nesses casos os módulos não usam o cache, ou
+limitam a idade do valor.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def compartilhado(alias):
+    """Se o cache alias é o mesmo para todos os processos."""
+    return not isinstance(caches[alias], LocMemCache)
@@ -0,0 +1,128 @@
+"""
+Envio das mensagens de contato gravadas na caixa de saída (MensagemContato).
+
+Cada lote usa uma única conexão SMTP. O lote é reservado numa transação
+curta (SELECT ... FOR UPDATE SKIP LOCKED, que adia proxima_tentativa por
+CONTATO_RESERVA_SEGUNDOS), então vários processos de envio podem rodar ao
+mesmo tempo sem pegar a mesma mensagem, e nenhuma trava fica aberta
+durante o SMTP. Cada mensagem é marcada logo depois do seu envio; se o
+processo morrer no meio do lote, as não marcadas voltam à fila quando a
+reserva vence.
+
+Falhas do servidor de e-mail reagendam a mensagem com espera exponencial;
+após CONTATO_MAX_TENTATIVAS, ela fica como 'falhou' para análise no admin.
+Qualquer outro erro (ex.: cabeçalho inválido) não se resolve tentando de
+novo: a mensagem fica como 'falhou' na hora, sem travar o resto da fila.
+"""
+import datetime
+import random
+import smtplib
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InscritoNewsletter, MensagemContato
+
+CAMPOS_ATUALIZADOS = ['status', 'tentativas', 'proxima_tentativa', 'ultimo_erro', 'enviada_em']
+
+
+def montar_email(contato):
+    corpo = (
+        f"Nome: {contato.nome}\n"
+        f"E-mail: {contato.email}\n"
+        f"Telefone: {contato.telefone or '-'}\n"
+        f"Aceita newsletter: {'sim' if contato.aceito_newsletter else 'não'}\n"
+        f"Enviada em: {timezone.localtime(contato.criada_em).strftime('%d/%m/%Y %H:%M')}\n\n"
+        f"{contato.mensagem}\n"
+    )
+    return EmailMessage(
+        subject=f'[Contato] {contato.assunto} - {contato.nome}',
+        body=corpo,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=settings.CONTATO_DESTINATARIOS,
+        reply_to=[contato.email],
+    )
+
+
+def espera_para(tentativas):
+    """Espera exponencial (com variação aleatória) antes da próxima tentativa."""
+    base = getattr(settings, 'CONTATO_ESPERA_BASE', 60)
+    maxima = getattr(settings, 'CONTATO_ESPERA_MAXIMA', 6 * 60 * 60)
+    segundos = min(base * 2 ** (tentativas - 1), maxima)
+    return datetime.timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+def _registrar_falha(contato, erro, agora, definitiva=False):
+    contato.tentativas += 1
+    contato.ultimo_erro = f'{type(erro).__name__}: {erro}'
+    if definitiva or contato.tentativas >= getattr(settings, 'CONTATO_MAX_TENTATIVAS', 8):
+        contato.status = 'falhou'
+    else:
+        contato.proxima_tentativa = agora + espera_para(contato.tentativas)
+
+
+def reservar_lote(tamanho, agora):
+    """Reserva até tamanho mensagens pendentes para este processo e devolve a lista."""
+    reserva = datetime.timedelta(seconds=getattr(settings, 'CONTATO_RESERVA_SEGUNDOS', 10 * 60))
+    with transaction.atomic():
+        lote = list(
+            MensagemContato.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pendente', proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa', 'id')[:tamanho]
+        )
+        MensagemContato.objects.filter(id__in=[c.id for c in lote]).update(proxima_tentativa=agora + reserva)
+    return lote
+
+
+def _enviar(conexao, contato, agora):
+    """Envia uma mensagem e grava o resultado. Devolve True se foi enviada."""
+    try:
+        conexao.send_messages([montar_email(contato)])
+    except (smtplib.SMTPException, OSError) as erro:
+        _registrar_falha(contato, erro, agora)
+    except Exception as erro:
+        _registrar_falha(contato, erro, agora, definitiva=True)
+    else:
+        contato.status = 'enviada'
+        contato.tentativas += 1
+        contato.enviada_em = timezone.now()
+        contato.ultimo_erro = ''
+    contato.save(update_fields=CAMPOS_ATUALIZADOS)
+    return contato.status == 'enviada'
+
+
+def enviar_lote(tamanho=50):
+    """Envia um lote de mensagens pendentes. Devolve (enviadas, falhas)."""
+    agora = timezone.now()
+    lote = reservar_lote(tamanho, agora)
+    if not lote:
+        return 0, 0
+
+    enviadas = []
+    conexao = get_connection()
+    try:
+        conexao.open()
+    except (smtplib.SMTPException, OSError) as erro:
+        # Servidor indisponível: o lote inteiro volta para a fila
+        for contato in lote:
+            _registrar_falha(contato, erro, agora)
+        MensagemContato.objects.bulk_update(lote, CAMPOS_ATUALIZADOS)
+        return 0, len(lote)
+
+    try:
+        enviadas = [contato for contato in lote if _enviar(conexao, contato, agora)]
+    finally:
+        try:
+            conexao.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    # Só quem marcou a opção no formulário entra na newsletter
+    InscritoNewsletter.objects.bulk_create(
+        [InscritoNewsletter(email=c.email.lower(), nome=c.nome) for c in enviadas if c.aceito_newsletter],
+        ignore_conflicts=True,
+    )
+    return len(enviadas), len(lote) - len(enviadas)
@@ -0,0 +1,139 @@
+"""
+Ciclo de vida das consultas: encerra as que já passaram do horário.
+
+'agendada' e 'confirmada' viram 'realizada' e o paciente recebe um pedido de
+avaliação. Não há etapa de confirmação: uma consulta não confirmada não é
+uma falta. A falta só é registrada de forma explícita, pela equipe
+(registrar_faltas, ação "Registrar falta" do admin de Consulta), e o
+paciente é notificado.
+
+O trabalho é feito em conjuntos, não linha a linha: a tabela é percorrida em
+faixas de chave primária e, em cada faixa, numa transação curta:
+
+1. SELECT ... FOR UPDATE SKIP LOCKED das consultas vencidas da faixa. As que
+   estão travadas por um agendamento em andamento são puladas e ficam para a
+   próxima execução, em vez de bloquear o agendamento (ou o comando);
+2. um UPDATE só para as linhas travadas;
+3. um bulk_create com as notificações.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import Consulta, Notificacao
+from .recomendacao import marcar_alterado
+
+STATUS_EM_ABERTO = ('agendada', 'confirmada')
+# Status de uma consulta que já passou e pode ser corrigida para falta
+STATUS_FALTA_POSSIVEL = STATUS_EM_ABERTO + ('realizada',)
+
+
+def filtro_terminadas(agora=None):
+    """Consultas cujo horário de término já passou."""
+    duracao = datetime.timedelta(minutes=getattr(settings, 'CONSULTA_DURACAO_MINUTOS', 60))
+    corte = timezone.localtime(agora or timezone.now()) - duracao
+    return Q(data__lt=corte.date()) | Q(data=corte.date(), horario__lte=corte.time())
+
+
+def filtro_vencidas(agora=None):
+    """Consultas em aberto cujo horário de término já passou."""
+    return Q(status__in=STATUS_EM_ABERTO) & filtro_terminadas(agora)
+
+
+def _notificacao(usuario_id, status, nome_psicologo, data, horario):
+    quando = f"{data.strftime('%d/%m/%Y')} às {horario.strftime('%H:%M')}"
+    if status == 'realizada':
+        return Notificacao(
+            destinatario_id=usuario_id,
+            tipo='avaliacao',
+            mensagem=f'Como foi sua consulta com {nome_psicologo} em {quando}? Avalie o atendimento no seu perfil.',
+        )
+    return Notificacao(
+        destinatario_id=usuario_id,
+        tipo='consulta',
+        mensagem=(
+            f'Sua consulta com {nome_psicologo} em {quando} foi registrada como falta. '
+            'Se quiser, agende um novo horário.'
+        ),
+    )
+
+
+def processar_faixa(inicio, fim, filtro):
+    """Encerra as consultas vencidas com inicio <= id < fim. Devolve {status: total}."""
+    with transaction.atomic():
+        consultas = list(
+            Consulta.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(filtro, id__gte=inicio, id__lt=fim)
+            .order_by()
+            .values_list('id', 'status', 'usuario_id', 'psicologo_id', 'psicologo__nome', 'data', 'horario')
+        )
+        if not consultas:
+            return {}
+
+        # O filtro de status repete a condição: nada muda se a linha já saiu do estado
+        realizadas = Consulta.objects.filter(id__in=[c[0] for c in consultas], status__in=STATUS_EM_ABERTO).update(
+            status='realizada', atualizada_em=timezone.now(),
+        )
+
+        Notificacao.objects.bulk_create([
+            _notificacao(usuario_id, 'realizada', nome, data, horario)
+            for _, _, usuario_id, _, nome, data, horario in consultas
+        ])
+
+        # update() não dispara sinais: as horas livres dos psicólogos mudaram
+        psicologos = {c[3] for c in consultas}
+        transaction.on_commit(lambda: [marcar_alterado(psicologo_id) for psicologo_id in psicologos])
+    return {'realizada': realizadas}
+
+
+def atualizar_consultas(tamanho_faixa=5000, agora=None, progresso=None):
+    """
+    Percorre as consultas vencidas em faixas de id. Devolve
+    {'realizada': n, 'notificacoes': n, 'segundos': s}.
+    """
+    filtro = filtro_vencidas(agora)
+    limites = Consulta.objects.filter(filtro).aggregate(menor=Min('id'), maior=Max('id'))
+    totais = {'realizada': 0, 'notificacoes': 0}
+    inicio_execucao = time.perf_counter()
+
+    if limites['menor'] is not None:
+        for inicio in range(limites['menor'], limites['maior'] + 1, tamanho_faixa):
+            resultado = processar_faixa(inicio, inicio + tamanho_faixa, filtro)
+            for status, total in resultado.items():
+                totais[status] += total
+                totais['notificacoes'] += total
+            if progresso and resultado:
+                progresso(inicio, inicio + tamanho_faixa, resultado)
+
+    totais['segundos'] = time.perf_counter() - inicio_execucao
+    return totais
+
+
+def registrar_faltas(consulta_ids, agora=None):
+    """
+    Registra como falta do paciente as consultas dadas que já terminaram e
+    não foram canceladas nem avaliadas. Devolve quantas foram registradas.
+    """
+    with transaction.atomic():
+        consultas = list(
+            Consulta.objects
+            .select_for_update(of=('self',))
+            .filter(filtro_terminadas(agora), id__in=consulta_ids, status__in=STATUS_FALTA_POSSIVEL, avaliacao__isnull=True)
+            .order_by('id')
+            .values_list('id', 'usuario_id', 'psicologo_id', 'psicologo__nome', 'data', 'horario')
+        )
+        if not consultas:
+            return 0
+        Consulta.objects.filter(id__in=[c[0] for c in consultas]).update(status='faltou', atualizada_em=timezone.now())
+        Notificacao.objects.bulk_create([
+            _notificacao(usuario_id, 'faltou', nome, data, horario)
+            for _, usuario_id, _, nome, data, horario in consultas
+        ])
+        psicologos = {c[2] for c in consultas}
+        transaction.on_commit(lambda: [marcar_alterado(psicologo_id) for psicologo_id in psicologos])
+    return len(consultas)
@@ -0,0 +1,3 @@
+def perfil(request):
+    """Disponibiliza o papel do usuário nos templates (ex.: {% if perfil.eh_psicologo %})."""
+    return {'perfil': getattr(request, 'perfil', None)}
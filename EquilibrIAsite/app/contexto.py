@@ -0,0 +1,179 @@
+"""
+Contexto de conversa do chat, por usuário, mantido em cache.
+
+Guarda os últimos turnos (mensagem, resposta) e o resumo da autoavaliação
+emocional mais recente. Com a sessão aquecida, responder a uma mensagem
+não exige nenhuma consulta ao histórico: o contexto só é lido do banco
+quando não está no cache (primeiro acesso, TTL expirado ou despejo LRU).
+
+Formato: {'turnos': [[mensagem, resposta], ...], 'autoavaliacao': {...} ou None,
+          'versao': n}
+
+Cada usuário tem também um contador de versão, incrementado (incr, atômico)
+a cada turno registrado e a cada invalidação. O contexto em cache só vale
+se foi gravado com a versão atual: se duas abas registram turnos ao mesmo
+tempo, ou se uma autoavaliação muda enquanto outro processo relê o banco,
+a gravação que perdeu a corrida fica com versão antiga e o próximo acesso
+relê o histórico, em vez de usar um contexto sem um dos turnos.
+
+Sem um cache compartilhado entre os processos (app/caches.py), o contexto
+é sempre lido do banco: uma cópia por processo só poderia ser conferida com
+uma leitura no banco, que custaria o mesmo que as duas consultas indexadas
+que ela pouparia.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .caches import compartilhado
+from .models import InteracaoIA, AutoavaliacaoEmocional
+
+
+def _alias():
+    return getattr(settings, 'CONTEXTO_CHAT_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def _chave(usuario_id):
+    return f'contexto_chat:{usuario_id}'
+
+
+def _chave_versao(usuario_id):
+    return f'contexto_chat_versao:{usuario_id}'
+
+
+def _max_turnos():
+    return getattr(settings, 'CONTEXTO_CHAT_TURNOS', 10)
+
+
+def _ttl():
+    return getattr(settings, 'CONTEXTO_CHAT_TTL', 30 * 60)
+
+
+def resumir_autoavaliacao(autoavaliacao):
+    if autoavaliacao is None:
+        return None
+    return {
+        'id': autoavaliacao.id,
+        'data': autoavaliacao.data.isoformat(),
+        'humor': autoavaliacao.humor,
+        'ansiedade': autoavaliacao.ansiedade,
+        'estresse': autoavaliacao.estresse,
+    }
+
+
+def _consultas_historico(usuario_id):
+    turnos = (
+        InteracaoIA.objects
+        .filter(usuario_id=usuario_id)
+        .order_by('-timestamp', '-id')
+        .values_list('mensagem_usuario', 'resposta__texto')[:_max_turnos()]
+    )
+    autoavaliacao = (
+        AutoavaliacaoEmocional.objects
+        .filter(usuario_id=usuario_id)
+        .order_by('-data', '-id')
+        .only('id', 'data', 'humor', 'ansiedade', 'estresse')
+    )
+    return turnos, autoavaliacao
+
+
+def _em_cache(valores, usuario_id):
+    """(contexto em cache se estiver na versão atual, senão None; versão atual)."""
+    contexto = valores.get(_chave(usuario_id))
+    versao = valores.get(_chave_versao(usuario_id), 0)
+    if contexto is not None and contexto.get('versao') != versao:
+        contexto = None
+    return contexto, versao
+
+
+def carregar_contexto(usuario_id):
+    usar_cache = compartilhado(_alias())
+    contexto, versao = None, 0
+    if usar_cache:
+        contexto, versao = _em_cache(_cache().get_many([_chave(usuario_id), _chave_versao(usuario_id)]), usuario_id)
+    if contexto is None:
+        turnos, autoavaliacao = _consultas_historico(usuario_id)
+        contexto = {
+            'turnos': [list(turno) for turno in reversed(turnos)],
+            'autoavaliacao': resumir_autoavaliacao(autoavaliacao.first()),
+            'versao': versao,
+        }
+        if usar_cache:
+            _cache().set(_chave(usuario_id), contexto, _ttl())
+    return contexto
+
+
+async def acarregar_contexto(usuario_id):
+    usar_cache = compartilhado(_alias())
+    contexto, versao = None, 0
+    if usar_cache:
+        contexto, versao = _em_cache(
+            await _cache().aget_many([_chave(usuario_id), _chave_versao(usuario_id)]), usuario_id,
+        )
+    if contexto is None:
+        turnos, autoavaliacao = _consultas_historico(usuario_id)
+        contexto = {
+            'turnos': [list(turno) async for turno in turnos][::-1],
+            'autoavaliacao': resumir_autoavaliacao(await autoavaliacao.afirst()),
+            'versao': versao,
+        }
+        if usar_cache:
+            await _cache().aset(_chave(usuario_id), contexto, _ttl())
+    return contexto
+
+
+def _nova_versao(cache, usuario_id):
+    # Sem expiração: se o contador sumisse antes do contexto, uma versão antiga poderia voltar a valer
+    cache.add(_chave_versao(usuario_id), 0, None)
+    try:
+        return cache.incr(_chave_versao(usuario_id))
+    except ValueError:
+        return None
+
+
+async def _anova_versao(cache, usuario_id):
+    await cache.aadd(_chave_versao(usuario_id), 0, None)
+    try:
+        return await cache.aincr(_chave_versao(usuario_id))
+    except ValueError:
+        return None
+
+
+def _acrescentar(contexto, mensagem, resposta, versao):
+    contexto['turnos'].append([mensagem, resposta])
+    del contexto['turnos'][:-_max_turnos()]
+    contexto['versao'] = versao
+    return contexto
+
+
+def registrar_turno(usuario_id, contexto, mensagem, resposta):
+    """Grava o contexto com o novo turno (o turno já deve estar salvo no banco)."""
+    if not compartilhado(_alias()):
+        return
+    versao = _nova_versao(_cache(), usuario_id)
+    if versao != contexto['versao'] + 1:
+        # Outro turno ou invalidação entrou no meio: o próximo acesso relê o banco
+        _cache().delete(_chave(usuario_id))
+        return
+    _cache().set(_chave(usuario_id), _acrescentar(contexto, mensagem, resposta, versao), _ttl())
+
+
+async def aregistrar_turno(usuario_id, contexto, mensagem, resposta):
+    if not compartilhado(_alias()):
+        return
+    versao = await _anova_versao(_cache(), usuario_id)
+    if versao != contexto['versao'] + 1:
+        await _cache().adelete(_chave(usuario_id))
+        return
+    await _cache().aset(_chave(usuario_id), _acrescentar(contexto, mensagem, resposta, versao), _ttl())
+
+
+def descartar_contexto(usuario_id):
+    """Invalida o contexto do usuário, inclusive gravações em andamento com a versão anterior."""
+    if not compartilhado(_alias()):
+        return
+    _nova_versao(_cache(), usuario_id)
+    _cache().delete(_chave(usuario_id))
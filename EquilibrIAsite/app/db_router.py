@@ -0,0 +1,101 @@
+"""
+Roteamento de leituras para réplicas do banco de dados.
+
+Bancos em settings.DATABASES cujo alias começa com "replica" recebem as
+leituras feitas durante uma requisição. Ficam no primário ('default'):
+
+- todas as escritas (e select_for_update, que o Django trata como escrita);
+- leituras dentro de transaction.atomic(), que precisam ver as escritas
+  da própria transação;
+- leituras fora de requisições (comandos de gerenciamento, shell);
+- leituras de quem escreveu há pouco (read-your-writes): a primeira escrita
+  de uma requisição fixa as leituras restantes dela no primário, e o
+  ReplicaMiddleware (app/middleware.py) devolve um cookie que mantém o
+  usuário no primário por REPLICA_JANELA_FIXACAO segundos (ex.: logo
+  depois de agendar uma consulta).
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE_FIXACAO = 'fixar_primario'
+
+
+class EstadoReplica:
+    """Estado de uma requisição: mutável, para valer também nas threads de sync_to_async."""
+
+    def __init__(self, fixado):
+        self.fixado = fixado
+        self.escreveu = False
+
+
+_estado = contextvars.ContextVar('estado_replica', default=None)
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def fixar_no_primario():
+    """Leituras restantes da requisição (e das próximas, pelo cookie) vão para o primário."""
+    estado = _estado.get()
+    if estado is not None:
+        estado.fixado = estado.escreveu = True
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = replicas()
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if not self.replicas or estado is None or estado.fixado:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        fixar_no_primario()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas têm os mesmos dados do primário
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def iniciar_requisicao(request):
+    _estado.set(EstadoReplica(fixado=COOKIE_FIXACAO in request.COOKIES))
+
+
+def encerrar_requisicao():
+    """Encerra o estado da requisição; True se ela escreveu no banco."""
+    estado = _estado.get()
+    _estado.set(None)
+    return estado is not None and estado.escreveu
+
+
+def atraso_replicas():
+    """{alias: segundos de atraso da réplica, ou None se não for possível medir}."""
+    atrasos = {}
+    for alias in replicas():
+        conexao = connections[alias]
+        if conexao.vendor != 'postgresql':
+            atrasos[alias] = None
+            continue
+        with conexao.cursor() as cursor:
+            # Sem nada pendente para aplicar, a réplica está em dia mesmo que
+            # a última transação replicada seja antiga.
+            cursor.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL '
+                'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+            )
+            atraso = cursor.fetchone()[0]
+        atrasos[alias] = float(atraso) if atraso is not None else None
+    return atrasos
@@ -0,0 +1,165 @@
+"""
+Exportação dos dados pessoais de um usuário (portabilidade - LGPD).
+
+As linhas são lidas com cursores do lado do servidor (``.iterator()``) e
+serializadas em blocos, de forma que o consumo de memória não cresce com o
+volume de dados do usuário. Sob ASGI, a view usa agerar_exportacao(): o
+Django consumiria um iterador síncrono inteiro (montando o arquivo em
+memória) antes de enviar o primeiro byte.
+"""
+import csv
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import Consulta, InteracaoIA, AutoavaliacaoEmocional, Notificacao, Avaliacao
+
+FORMATOS = ('jsonl', 'csv')
+
+# Tamanho aproximado (em bytes) de cada bloco entregue ao cliente.
+TAMANHO_BLOCO = 64 * 1024
+
+# (nome da tabela, modelo, campo que aponta para o usuário, campos exportados).
+# Um campo pode ser um par (nome, expressão) para campos vindos de outra tabela.
+TABELAS = [
+    ('consulta', Consulta, 'usuario', [
+        'id', 'psicologo_id', 'psicologo__nome', 'data', 'horario', 'status', 'criada_em',
+    ]),
+    ('autoavaliacao_emocional', AutoavaliacaoEmocional, 'usuario', [
+        'id', 'data', 'humor', 'ansiedade', 'estresse', 'observacoes',
+    ]),
+    ('interacao_ia', InteracaoIA, 'usuario', [
+        'id', 'timestamp', 'mensagem_usuario', ('resposta_ia', F('resposta__texto')),
+        'autoavaliacao_relacionada_id',
+    ]),
+    ('notificacao', Notificacao, 'destinatario', [
+        'id', 'tipo', 'mensagem', 'data_envio', 'lida',
+    ]),
+    ('avaliacao', Avaliacao, 'consulta__usuario', [
+        'id', 'consulta_id', 'nota', 'comentario', 'data_criacao',
+    ]),
+]
+
+# Cabeçalho único do CSV: a coluna "tabela" seguida da união dos campos.
+COLUNAS_CSV = ['tabela'] + list(dict.fromkeys(
+    campo[0] if isinstance(campo, tuple) else campo
+    for _tabela, _modelo, _filtro, campos in TABELAS for campo in campos
+))
+
+
+def iterar_registros(usuario, chunk_size=None):
+    """
+    Gera tuplas (tabela, dicionário) com todos os dados do usuário,
+    tabela por tabela, sem carregar nenhuma delas inteira em memória.
+    """
+    chunk_size = chunk_size or getattr(settings, 'EXPORTACAO_CHUNK_SIZE', 2000)
+    for tabela, modelo, filtro, campos in TABELAS:
+        simples = [campo for campo in campos if not isinstance(campo, tuple)]
+        expressoes = dict(campo for campo in campos if isinstance(campo, tuple))
+        registros = (
+            modelo.objects
+            .filter(**{filtro: usuario})
+            .order_by('pk')
+            .values(*simples, **expressoes)
+            .iterator(chunk_size=chunk_size)
+        )
+        for registro in registros:
+            yield tabela, registro
+
+
+def contar_registros(usuario):
+    """Total de linhas que a exportação do usuário vai conter (uma contagem por tabela)."""
+    return sum(modelo.objects.filter(**{filtro: usuario}).count() for _tabela, modelo, filtro, _campos in TABELAS)
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravá-la."""
+    def write(self, valor):
+        return valor
+
+
+def _linhas_jsonl(registros):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for tabela, registro in registros:
+        yield encoder.encode({'tabela': tabela, **registro}) + '\n'
+
+
+def _linhas_csv(registros):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_CSV)
+    for tabela, registro in registros:
+        linha = [tabela] + [_valor_csv(registro.get(coluna)) for coluna in COLUNAS_CSV[1:]]
+        yield escritor.writerow(linha)
+
+
+def gerar_exportacao(usuario, formato='jsonl', compactar=False, chunk_size=None):
+    """
+    Gera os bytes da exportação em blocos de ~TAMANHO_BLOCO, prontos para
+    um StreamingHttpResponse ou para gravação em arquivo.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato de exportação inválido: {formato}')
+
+    registros = iterar_registros(usuario, chunk_size=chunk_size)
+    linhas = _linhas_jsonl(registros) if formato == 'jsonl' else _linhas_csv(registros)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compactar else None  # 31 = gzip
+
+    buffer = []
+    tamanho = 0
+    for linha in linhas:
+        dados = linha.encode('utf-8')
+        buffer.append(dados)
+        tamanho += len(dados)
+        if tamanho >= TAMANHO_BLOCO:
+            bloco = b''.join(buffer)
+            buffer, tamanho = [], 0
+            if compressor:
+                bloco = compressor.compress(bloco)
+            if bloco:
+                yield bloco
+
+    bloco = b''.join(buffer)
+    if compressor:
+        bloco = compressor.compress(bloco) + compressor.flush()
+    if bloco:
+        yield bloco
+
+
+async def agerar_exportacao(usuario, formato='jsonl', compactar=False, chunk_size=None):
+    """
+    gerar_exportacao() para servidores ASGI: cada bloco é lido numa thread,
+    sempre a mesma da requisição (o cursor do lado do servidor fica na
+    conexão dela), e entregue assim que fica pronto.
+    """
+    blocos = gerar_exportacao(usuario, formato, compactar, chunk_size)
+    proximo = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (bloco := await proximo(blocos, None)) is not None:
+            yield bloco
+    finally:
+        # Cliente desconectou no meio: fecha o gerador (e o cursor) na mesma thread
+        await sync_to_async(blocos.close, thread_sensitive=True)()
+
+
+def nome_arquivo(usuario, formato, compactar=False):
+    nome = f'equilibria-dados-{usuario.username}.{formato}'
+    return nome + '.gz' if compactar else nome
+
+
+def tipo_conteudo(formato, compactar=False):
+    if compactar:
+        return 'application/gzip'
+    if formato == 'csv':
+        return 'text/csv; charset=utf-8'
+    return 'application/x-ndjson; charset=utf-8'
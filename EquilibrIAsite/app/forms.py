@@ -1,7 +1,14 @@
 # forms.py
+import datetime
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
-from .models import Usuario
+from django.db.models.functions import Lower
+from django.utils import timezone
+from .models import ListaEspera, Usuario
+from .backends import normalizar_identificador
+from .hashers import agerar_hash
 
 class RegistroForm(UserCreationForm):
     email = forms.EmailField(
@@ -28,8 +35,9 @@ class RegistroForm(UserCreationForm):
         self.fields['password2'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Confirme a senha'})
 
     def clean_email(self):
-        email = self.cleaned_data.get('email')
-        if Usuario.objects.filter(email=email).exists():
+        # Mesma normalização do login (UsuarioOuEmailBackend), usando o índice LOWER(email)
+        email = normalizar_identificador(self.cleaned_data.get('email'))
+        if Usuario.objects.alias(email_lower=Lower('email')).filter(email_lower=email).exists():
             raise forms.ValidationError('Este e-mail já está em uso.')
         return email
 
@@ -42,6 +50,17 @@ class RegistroForm(UserCreationForm):
             user.save()
         return user
 
+    async def asave(self):
+        """Cria o usuário com o hash da senha gerado no pool de app/hashers.py."""
+        # ModelForm.save direto: o save do UserCreationForm calcularia o hash aqui mesmo
+        user = forms.ModelForm.save(self, commit=False)
+        user.email = self.cleaned_data['email']
+        user.first_name = self.cleaned_data['first_name']
+        user.last_name = self.cleaned_data['last_name']
+        user.password = await agerar_hash(self.cleaned_data['password1'])
+        await user.asave()
+        return user
+
 
 class LoginForm(forms.Form):
     username = forms.CharField(
@@ -49,4 +68,36 @@ class LoginForm(forms.Form):
     )
     password = forms.CharField(
         widget=forms.PasswordInput(attrs={'class': 'form-control', 'placeholder': 'Senha'})
-    )
\ No newline at end of file
+    )
+
+
+class ListaEsperaForm(forms.ModelForm):
+    class Meta:
+        model = ListaEspera
+        fields = ('psicologo', 'data_inicio', 'data_fim')
+        widgets = {
+            'psicologo': forms.Select(attrs={'class': 'form-control'}),
+            'data_inicio': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'data_fim': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        }
+
+    def __init__(self, *args, usuario=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.usuario = usuario
+
+    def clean(self):
+        dados = super().clean()
+        inicio, fim, psicologo = dados.get('data_inicio'), dados.get('data_fim'), dados.get('psicologo')
+        if inicio and fim:
+            if inicio < timezone.localdate():
+                raise forms.ValidationError('A janela não pode começar no passado.')
+            if fim < inicio:
+                raise forms.ValidationError('A data final deve ser igual ou posterior à inicial.')
+            maxima = getattr(settings, 'LISTA_ESPERA_JANELA_MAXIMA_DIAS', 60)
+            if fim - inicio > datetime.timedelta(days=maxima):
+                raise forms.ValidationError(f'A janela pode ter no máximo {maxima} dias.')
+        if psicologo and self.usuario and ListaEspera.objects.filter(
+            usuario=self.usuario, psicologo=psicologo, status__in=('aguardando', 'ofertada'),
+        ).exists():
+            raise forms.ValidationError('Você já está na lista de espera deste profissional.')
+        return dados
@@ -0,0 +1,190 @@
+"""
+Hash de senhas fora do worker da requisição.
+
+Gerar e verificar hashes é trabalho de CPU proposital (centenas de
+milissegundos): dentro do worker, um pico de cadastros ou logins atrasa o
+chat e o agendamento. As views de login e cadastro usam agerar_hash() e
+averificar_senha(), que rodam num pool dedicado de HASH_PROCESSOS processos:
+no máximo esse número de hashes roda ao mesmo tempo, o restante espera na
+fila do pool sem ocupar o event loop. Com HASH_PROCESSOS = 0, o hash roda
+em threads do próprio processo.
+
+Os processos do pool são iniciados com "spawn" (não herdam o estado do
+worker) e carregam as mesmas settings. A verificação devolve também o novo
+hash quando o atual usa outro algoritmo ou outros custos, para que o login
+o regrave sem um segundo hash no worker.
+"""
+import asyncio
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, get_hasher, make_password, verify_password
+
+
+class Argon2ConfiguravelHasher(Argon2PasswordHasher):
+    """Argon2id com os custos de ARGON2_TIME_COST, ARGON2_MEMORY_COST e ARGON2_PARALLELISM."""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+# --- Funções executadas nos processos do pool ---
+
+def _vigiar_worker(pid):
+    # Worker encerrado sem desligar o pool (ex.: SIGKILL): o processo não fica órfão
+    while os.getppid() == pid:
+        time.sleep(1)
+    os._exit(0)
+
+
+def _inicializar_processo(modulo_settings, worker_pid):
+    threading.Thread(target=_vigiar_worker, args=(worker_pid,), daemon=True).start()
+    os.environ['DJANGO_SETTINGS_MODULE'] = modulo_settings
+    import django
+    django.setup()
+
+
+def gerar_hash(senha):
+    return make_password(senha)
+
+
+def verificar_senha(senha, codificado):
+    """(senha correta, novo hash se o atual precisar ser refeito, senão None)."""
+    correta, refazer = verify_password(senha, codificado)
+    return correta, make_password(senha) if correta and refazer else None
+
+
+def _pronto(barreira):
+    # Segura o processo até todos chegarem: cada tarefa fica num processo diferente
+    barreira.wait()
+    return os.getpid()
+
+
+# --- Pool ---
+
+_pool = None
+_pool_pid = None
+_trava = threading.Lock()
+
+
+def pool():
+    """Pool do processo atual (recriado se o processo foi criado por fork depois dele)."""
+    global _pool, _pool_pid
+    processos = getattr(settings, 'HASH_PROCESSOS', 2)
+    if not processos:
+        return None
+    with _trava:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=processos,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_processo,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'), os.getpid()),
+            )
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def iniciar_pool(timeout=60):
+    """Sobe todos os processos do pool (cada um carrega o Django ao iniciar)."""
+    executor = pool()
+    if executor is None:
+        return 0
+    processos = getattr(settings, 'HASH_PROCESSOS', 2)
+    with multiprocessing.get_context('spawn').Manager() as gerente:
+        barreira = gerente.Barrier(processos, timeout=timeout)
+        futuros = [executor.submit(_pronto, barreira) for _ in range(processos)]
+        return len({futuro.result(timeout) for futuro in futuros})
+
+
+def _descartar(executor):
+    """Tira de uso um pool quebrado; o próximo pool() cria outro."""
+    global _pool
+    with _trava:
+        if _pool is executor:
+            _pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _executar(funcao, *args):
+    executor = pool()
+    if executor is None:
+        return await sync_to_async(funcao, thread_sensitive=False)(*args)
+    # Um processo do pool que morre (ex.: falta de memória) quebra o pool inteiro:
+    # tenta de novo num pool novo e, se também quebrar, numa thread do worker
+    for _ in range(2):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, funcao, *args)
+        except BrokenProcessPool:
+            _descartar(executor)
+            executor = pool()
+    return await sync_to_async(funcao, thread_sensitive=False)(*args)
+
+
+async def agerar_hash(senha):
+    return await _executar(gerar_hash, senha)
+
+
+async def averificar_senha(senha, codificado):
+    return await _executar(verificar_senha, senha, codificado)
+
+
+# --- Calibração (comando calibrar_hash) ---
+
+def medir(hasher, repeticoes=5):
+    """Mediana, em segundos, do tempo de um hash com o hasher dado."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        hasher.encode('calibracao-de-custo', hasher.salt())
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def hasher_argon2(time_cost, memory_cost, parallelism):
+    hasher = Argon2PasswordHasher()
+    hasher.time_cost = time_cost
+    hasher.memory_cost = memory_cost
+    hasher.parallelism = parallelism
+    return hasher
+
+
+def calibrar_argon2(alvo, memorias, parallelism=1, repeticoes=5, time_cost_maximo=10):
+    """
+    Para cada custo de memória (KiB), o maior time_cost cujo hash leva até
+    alvo segundos: [(memory_cost, time_cost ou None, segundos)].
+    """
+    resultados = []
+    for memoria in memorias:
+        escolhido = (memoria, None, None)
+        for time_cost in range(1, time_cost_maximo + 1):
+            segundos = medir(hasher_argon2(time_cost, memoria, parallelism), repeticoes)
+            if segundos > alvo:
+                if escolhido[1] is None:
+                    escolhido = (memoria, None, segundos)
+                break
+            escolhido = (memoria, time_cost, segundos)
+        resultados.append(escolhido)
+    return resultados
+
+
+def medir_atual(repeticoes=5):
+    """(algoritmo, segundos) do hasher usado hoje para senhas novas."""
+    hasher = get_hasher()
+    return hasher.algorithm, medir(hasher, repeticoes)
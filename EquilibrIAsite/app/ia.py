@@ -0,0 +1,168 @@
+"""
+Geração das respostas do chat de apoio emocional.
+
+Concentra a lógica antes duplicada entre ApoioEmocionalView e chat_ia_api.
+Se settings.IA_RESPONDER_URL estiver definido, a resposta vem de um serviço
+externo (POST JSON {"mensagem": ...} -> {"resposta": ...}); caso contrário,
+usa o simulador com respostas fixas.
+"""
+import asyncio
+import contextlib
+import logging
+import random
+import time
+
+from django.conf import settings
+
+try:
+    import httpx
+except ImportError:  # opcional: só é necessário com IA_RESPONDER_URL
+    httpx = None
+
+from .contexto import acarregar_contexto, aregistrar_turno
+from .models import InteracaoIA
+
+logger = logging.getLogger(__name__)
+
+RESPOSTAS_EXEMPLO = [
+    "Entendo que você está passando por um momento difícil. É importante reconhecer seus sentimentos. Que tal tentarmos um exercício de respiração?",
+    "Obrigado por compartilhar isso comigo. Seus sentimentos são válidos. Como posso te ajudar melhor neste momento?",
+    "Percebo que você está enfrentando desafios. Lembre-se de que buscar ajuda é um sinal de força, não de fraqueza.",
+    "É normal sentir-se assim às vezes. Vamos trabalhar juntos para encontrar estratégias que possam te ajudar.",
+]
+
+RESPOSTA_ANSIEDADE = "Entendo que você está sentindo ansiedade. Vamos tentar um exercício de respiração: inspire por 4 segundos, segure por 4, expire por 6. Repita algumas vezes. Como você está se sentindo agora?"
+
+RESPOSTA_TRISTEZA = "Sinto muito que você esteja se sentindo assim. Seus sentimentos são válidos e você não está sozinho. Às vezes, conversar sobre o que está acontecendo pode ajudar. Gostaria de me contar mais sobre o que está te deixando triste?"
+
+RESPOSTA_ESTRESSE = "O estresse pode ser muito desafiador. Uma técnica que pode ajudar é a regra 5-4-3-2-1: identifique 5 coisas que você pode ver, 4 que pode tocar, 3 que pode ouvir, 2 que pode cheirar e 1 que pode saborear. Isso pode te ajudar a se conectar com o momento presente."
+
+# Todas as respostas fixas que o simulador pode devolver.
+RESPOSTAS_FIXAS = [RESPOSTA_ANSIEDADE, RESPOSTA_TRISTEZA, RESPOSTA_ESTRESSE] + RESPOSTAS_EXEMPLO
+
+
+# Palavras-chave de cada tema do chat, na ordem de prioridade.
+TEMAS = [
+    ('ansiedade', ['ansioso', 'ansiedade', 'nervoso']),
+    ('tristeza', ['triste', 'deprimido', 'sozinho']),
+    ('estresse', ['estresse', 'estressado', 'pressão']),
+]
+
+RESPOSTAS_POR_TEMA = {
+    'ansiedade': RESPOSTA_ANSIEDADE,
+    'tristeza': RESPOSTA_TRISTEZA,
+    'estresse': RESPOSTA_ESTRESSE,
+}
+
+
+def detectar_tema(mensagem):
+    """Tema da mensagem pelas palavras-chave, ou None."""
+    mensagem_lower = mensagem.lower()
+    for tema, palavras in TEMAS:
+        if any(palavra in mensagem_lower for palavra in palavras):
+            return tema
+    return None
+
+
+def _resposta_simulada(mensagem, contexto=None):
+    tema = detectar_tema(mensagem)
+    autoavaliacao = contexto['autoavaliacao'] if contexto else None
+
+    if tema:
+        return RESPOSTAS_POR_TEMA[tema]
+
+    # Sem palavra-chave na mensagem, considera a autoavaliação mais recente
+    elif autoavaliacao and autoavaliacao['ansiedade'] >= 7:
+        return RESPOSTA_ANSIEDADE
+
+    elif autoavaliacao and autoavaliacao['estresse'] >= 7:
+        return RESPOSTA_ESTRESSE
+
+    elif autoavaliacao and autoavaliacao['humor'] <= 3:
+        return RESPOSTA_TRISTEZA
+
+    else:
+        return random.choice(RESPOSTAS_EXEMPLO)
+
+
+def gerar_resposta_ia(mensagem, contexto=None):
+    """Versão síncrona do simulador (sem serviço externo)."""
+    latencia = getattr(settings, 'IA_LATENCIA_SIMULADA', 0)
+    if latencia:
+        time.sleep(latencia)
+    return _resposta_simulada(mensagem, contexto)
+
+
+# Sob ASGI, um cliente HTTP por event loop do worker, reaproveitado entre
+# requisições. Sob WSGI, cada requisição assíncrona roda num loop novo,
+# descartado ao final: o cliente é aberto e fechado na própria chamada.
+_clientes_http = {}
+
+
+@contextlib.asynccontextmanager
+async def _cliente_http():
+    timeout = getattr(settings, 'IA_RESPONDER_TIMEOUT', 10)
+    if not getattr(settings, 'SERVIDOR_ASGI', False):
+        async with httpx.AsyncClient(timeout=timeout) as cliente:
+            yield cliente
+        return
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_http.get(loop)
+    if cliente is None:
+        cliente = _clientes_http[loop] = httpx.AsyncClient(timeout=timeout)
+    yield cliente
+
+
+async def agerar_resposta_ia(mensagem, contexto=None):
+    """
+    Versão assíncrona: não ocupa uma thread enquanto espera o serviço
+    externo. Em caso de falha do serviço, usa o simulador.
+    """
+    url = getattr(settings, 'IA_RESPONDER_URL', None)
+    if url and httpx is None:
+        logger.error('IA_RESPONDER_URL exige o pacote "httpx"; usando o simulador.')
+        url = None
+    if not url:
+        latencia = getattr(settings, 'IA_LATENCIA_SIMULADA', 0)
+        if latencia:
+            await asyncio.sleep(latencia)
+        return _resposta_simulada(mensagem, contexto)
+
+    dados = {'mensagem': mensagem}
+    if contexto:
+        dados['historico'] = contexto['turnos']
+        dados['autoavaliacao'] = contexto['autoavaliacao']
+    try:
+        async with _cliente_http() as cliente:
+            response = await cliente.post(url, json=dados)
+        response.raise_for_status()
+        resposta = response.json()['resposta']
+        if not isinstance(resposta, str):
+            raise TypeError(f'resposta do tipo {type(resposta).__name__}')
+        return resposta
+    except (httpx.HTTPError, KeyError, TypeError, ValueError):
+        logger.exception('Falha no serviço de respostas da IA; usando o simulador.')
+        return _resposta_simulada(mensagem, contexto)
+
+
+async def aresponder_mensagem(usuario, mensagem, contexto=None):
+    """
+    Fluxo completo de uma mensagem do chat: gera a resposta com o contexto
+    do usuário e, se ele estiver logado, registra a interação. Quem já
+    carregou o contexto (para as recomendações, por exemplo) o passa aqui.
+    """
+    if not usuario.is_authenticated:
+        return await agerar_resposta_ia(mensagem)
+
+    if contexto is None:
+        contexto = await acarregar_contexto(usuario.id)
+    resposta = await agerar_resposta_ia(mensagem, contexto)
+    autoavaliacao = contexto['autoavaliacao']
+    await InteracaoIA.objects.acreate(
+        usuario=usuario,
+        mensagem_usuario=mensagem,
+        resposta_ia=resposta,
+        autoavaliacao_relacionada_id=autoavaliacao['id'] if autoavaliacao else None,
+    )
+    await aregistrar_turno(usuario.id, contexto, mensagem, resposta)
+    return resposta
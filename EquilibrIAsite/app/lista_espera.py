@@ -0,0 +1,154 @@
+"""
+Lista de espera: horários liberados por cancelamento vão para quem espera.
+
+Quando uma consulta é cancelada (sinal em signals.py), o primeiro paciente
+da fila daquele psicólogo cuja janela de datas contém o horário recebe uma
+reserva de LISTA_ESPERA_RESERVA_MINUTOS e uma notificação. Enquanto a
+reserva vale, o horário só pode ser agendado por ele (AgendamentoView). Se
+ela expirar (comando processar_lista_espera), o horário vai para o próximo.
+
+Métricas: tentativas de agendamento e conflitos (horário ocupado ou
+reservado) por dia no cache e, nas entradas atendidas, o tempo entre a
+oferta e o novo agendamento.
+"""
+import datetime
+import statistics
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Consulta, ListaEspera, Notificacao
+
+CAMPOS_OFERTA = ['status', 'oferta_data', 'oferta_horario', 'ofertada_em', 'oferta_expira_em']
+
+
+def _reserva():
+    return datetime.timedelta(minutes=getattr(settings, 'LISTA_ESPERA_RESERVA_MINUTOS', 30))
+
+
+def reservas_ativas(psicologo_id, data, horario, agora=None):
+    return ListaEspera.objects.filter(
+        psicologo_id=psicologo_id,
+        oferta_data=data,
+        oferta_horario=horario,
+        status='ofertada',
+        oferta_expira_em__gt=agora or timezone.now(),
+    )
+
+
+def horario_ocupado(psicologo_id, data, horario):
+    return (
+        Consulta.objects
+        .filter(psicologo_id=psicologo_id, data=data, horario=horario)
+        .exclude(status__in=Consulta.STATUS_CANCELADOS)
+        .exists()
+    )
+
+
+def oferecer_horario(psicologo_id, data, horario, exceto_usuario_id=None, agora=None):
+    """Reserva o horário para o primeiro da fila e o notifica. Devolve a entrada ou None."""
+    agora = agora or timezone.now()
+    inicio_consulta = timezone.make_aware(datetime.datetime.combine(data, horario))
+    if inicio_consulta <= agora:
+        return None
+
+    with transaction.atomic():
+        if horario_ocupado(psicologo_id, data, horario) or reservas_ativas(psicologo_id, data, horario, agora).exists():
+            return None
+        fila = ListaEspera.objects.filter(
+            psicologo_id=psicologo_id, status='aguardando', data_inicio__lte=data, data_fim__gte=data,
+        )
+        if exceto_usuario_id:
+            fila = fila.exclude(usuario_id=exceto_usuario_id)
+        entrada = (
+            fila.select_for_update(skip_locked=True, of=('self',))
+            .select_related('psicologo')
+            .order_by('criada_em', 'id')
+            .first()
+        )
+        if entrada is None:
+            return None
+
+        entrada.status = 'ofertada'
+        entrada.oferta_data = data
+        entrada.oferta_horario = horario
+        entrada.ofertada_em = agora
+        entrada.oferta_expira_em = min(agora + _reserva(), inicio_consulta)
+        entrada.save(update_fields=CAMPOS_OFERTA)
+        expira = timezone.localtime(entrada.oferta_expira_em)
+        Notificacao.objects.create(
+            destinatario_id=entrada.usuario_id,
+            tipo='consulta',
+            mensagem=(
+                f'Abriu um horário com {entrada.psicologo.nome} em {data.strftime("%d/%m/%Y")} às '
+                f'{horario.strftime("%H:%M")}. Ele está reservado para você até {expira.strftime("%H:%M")}: '
+                'acesse o agendamento para confirmar.'
+            ),
+        )
+    return entrada
+
+
+def expirar_reservas(agora=None):
+    """Encerra as reservas vencidas e oferece cada horário ao próximo da fila."""
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        vencidas = list(
+            ListaEspera.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='ofertada', oferta_expira_em__lte=agora)
+        )
+        ListaEspera.objects.filter(id__in=[e.id for e in vencidas]).update(status='expirada')
+    reofertadas = sum(
+        oferecer_horario(e.psicologo_id, e.oferta_data, e.oferta_horario, exceto_usuario_id=e.usuario_id, agora=agora)
+        is not None
+        for e in vencidas
+    )
+    return len(vencidas), reofertadas
+
+
+def registrar_atendimento(usuario_id, psicologo_id, data, horario):
+    """Marca como atendida a reserva do usuário para o horário agendado, se houver."""
+    return reservas_ativas(psicologo_id, data, horario).filter(usuario_id=usuario_id).update(
+        status='atendida', atendida_em=timezone.now(),
+    )
+
+
+# --- Métricas ---
+
+def registrar_tentativa(conflito):
+    """Conta uma tentativa de agendamento (e se ela esbarrou num horário ocupado)."""
+    dia = timezone.localdate().isoformat()
+    for nome in ('tentativas', 'conflitos') if conflito else ('tentativas',):
+        chave = f'agendamento:{nome}:{dia}'
+        cache.add(chave, 0, 3 * 24 * 60 * 60)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            pass  # chave expirou entre o add e o incr
+
+
+def metricas(dias=7):
+    """Tentativas/conflitos por dia e tempo da oferta ao novo agendamento (s)."""
+    hoje = timezone.localdate()
+    datas = [(hoje - datetime.timedelta(days=n)).isoformat() for n in range(dias)]
+    contadores = cache.get_many([f'agendamento:{nome}:{dia}' for dia in datas for nome in ('tentativas', 'conflitos')])
+    atendidas = ListaEspera.objects.filter(
+        status='atendida', atendida_em__gte=timezone.now() - datetime.timedelta(days=dias),
+    ).values_list('ofertada_em', 'atendida_em')
+    latencias = sorted((atendida - ofertada).total_seconds() for ofertada, atendida in atendidas)
+    return {
+        'agendamento': {
+            dia: {
+                'tentativas': contadores.get(f'agendamento:tentativas:{dia}', 0),
+                'conflitos': contadores.get(f'agendamento:conflitos:{dia}', 0),
+            }
+            for dia in datas
+        },
+        'lista_espera': {
+            'atendidas': len(latencias),
+            'segundos_ate_reagendar_mediana': statistics.median(latencias) if latencias else None,
+            'segundos_ate_reagendar_p95': latencias[int(len(latencias) * 0.95)] if latencias else None,
+        },
+    }
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.db_router import atraso_replicas
+
+
+class Command(BaseCommand):
+    help = 'Mostra o atraso de replicação (em segundos) de cada réplica de leitura configurada.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help='Repete a medição a cada N segundos (0: mede uma vez).')
+
+    def handle(self, *args, **options):
+        while True:
+            atrasos = atraso_replicas()
+            if not atrasos:
+                self.stdout.write('Nenhuma réplica configurada (DATABASE_REPLICAS).')
+                return
+            for alias, atraso in atrasos.items():
+                texto = f'{atraso:.2f}s' if atraso is not None else 'não medido'
+                self.stdout.write(f'{alias}: {texto}')
+            if not options['intervalo']:
+                return
+            time.sleep(options['intervalo'])
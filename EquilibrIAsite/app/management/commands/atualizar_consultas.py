@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from app.ciclo_consultas import atualizar_consultas
+
+
+class Command(BaseCommand):
+    help = (
+        'Encerra as consultas cujo horário já passou: agendadas e confirmadas viram realizadas, com '
+        'pedido de avaliação ao paciente (faltas são registradas pela equipe, no admin). Feito para '
+        'rodar todas as noites (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faixa', type=int, default=5000,
+                            help='Quantidade de ids percorrida em cada transação.')
+        parser.add_argument('--verboso', action='store_true', help='Mostra o resultado de cada faixa.')
+
+    def handle(self, *args, **options):
+        def progresso(inicio, fim, resultado):
+            self.stdout.write(f'  ids {inicio}-{fim - 1}: {resultado}')
+
+        totais = atualizar_consultas(options['faixa'], progresso=progresso if options['verboso'] else None)
+        linhas = totais['realizada']
+        segundos = totais['segundos']
+        taxa = f' ({linhas / segundos:.0f} consultas/s)' if linhas and segundos else ''
+        self.stdout.write(
+            f"{totais['realizada']} realizadas, "
+            f"{totais['notificacoes']} notificações em {segundos:.2f}s{taxa}."
+        )
@@ -0,0 +1,29 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from app.utilizacao import atualizar_resumos
+
+
+class Command(BaseCommand):
+    help = (
+        'Atualiza o resumo diário das consultas (utilização, faltas e cancelamentos) a partir das '
+        'consultas alteradas desde a última execução. Feito para rodar periodicamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconstruir', action='store_true',
+                            help='Recalcula todos os dias (necessário após excluir consultas ou mudar a data delas).')
+        parser.add_argument('--ofertas-desde', type=datetime.date.fromisoformat, metavar='AAAA-MM-DD',
+                            help='Só na primeira execução: aplica os horários atuais aos dias passados a partir '
+                                 'desta data (sem isso, a oferta é registrada a partir de hoje).')
+        parser.add_argument('--lote', type=int, default=1000, help='Pares (psicólogo, dia) por consulta agregada.')
+
+    def handle(self, *args, **options):
+        execucao = atualizar_resumos(
+            reconstruir=options['reconstruir'], lote=options['lote'], ofertas_desde=options['ofertas_desde'],
+        )
+        self.stdout.write(
+            f'{execucao.pares_recalculados} dias de psicólogos recalculados e {execucao.dias_ofertados} dias de '
+            f'oferta congelados em {execucao.duracao:.2f}s.'
+        )
@@ -0,0 +1,62 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from app.models import Avaliacao, ResumoAvaliacoes
+from app.views import ProfissionaisView
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a listagem do diretório ordenada por avaliação (a partir de ResumoAvaliacoes) '
+        'e o custo de manter o resumo ao alterar uma avaliação.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=100)
+
+    def handle(self, *args, **options):
+        repeticoes = options['repeticoes']
+        self.stdout.write(
+            f'{ResumoAvaliacoes.objects.count()} psicólogos, {Avaliacao.objects.count()} avaliações.'
+        )
+
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as consultas:
+                list(
+                    ResumoAvaliacoes.objects
+                    .select_related('psicologo')
+                    .order_by('-media_bayesiana', 'psicologo_id')[:ProfissionaisView.POR_PAGINA]
+                )
+            tempos.append(time.perf_counter() - inicio)
+        self.stdout.write(
+            f'Página do diretório por avaliação: média {statistics.mean(tempos) * 1000:.2f} ms, '
+            f'{len(consultas)} consulta(s)'
+        )
+
+        avaliacao_ids = list(Avaliacao.objects.values_list('id', flat=True)[:repeticoes])
+        if not avaliacao_ids:
+            raise CommandError('Nenhuma avaliação cadastrada; rode "semear_dados --avaliacoes N".')
+        tempos = []
+        for avaliacao in Avaliacao.objects.filter(id__in=avaliacao_ids):
+            avaliacao.nota = random.randint(1, 5)
+            inicio = time.perf_counter()
+            avaliacao.save()
+            tempos.append(time.perf_counter() - inicio)
+        self.stdout.write(f'Alteração de avaliação + resumo: média {statistics.mean(tempos) * 1000:.2f} ms')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'EXPLAIN ' + str(
+                        ResumoAvaliacoes.objects.order_by('-media_bayesiana', 'psicologo_id')[:30].query
+                    )
+                )
+                for (linha,) in cursor.fetchall():
+                    self.stdout.write(linha)
@@ -0,0 +1,42 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.backends import UsuarioOuEmailBackend
+
+
+def resumo(tempos):
+    tempos = sorted(tempos)
+    p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+    return f'média {statistics.mean(tempos) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms'
+
+
+class Command(BaseCommand):
+    help = 'Mede a latência do login separando a busca do usuário do cálculo do hash da senha.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('identificador', help='Nome de usuário ou e-mail.')
+        parser.add_argument('senha')
+        parser.add_argument('--repeticoes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        backend = UsuarioOuEmailBackend()
+        busca, hash_senha = [], []
+
+        for _ in range(options['repeticoes']):
+            inicio = time.perf_counter()
+            usuario = backend.buscar_usuario(options['identificador'])
+            meio = time.perf_counter()
+            if usuario is None:
+                raise CommandError(f'Usuário "{options["identificador"]}" não encontrado.')
+            if not usuario.check_password(options['senha']):
+                raise CommandError('Senha incorreta.')
+            fim = time.perf_counter()
+            busca.append(meio - inicio)
+            hash_senha.append(fim - meio)
+
+        self.stdout.write(f'Busca do usuário (1 consulta): {resumo(busca)}')
+        self.stdout.write(f'Verificação do hash da senha: {resumo(hash_senha)}')
+        total = [b + h for b, h in zip(busca, hash_senha)]
+        self.stdout.write(f'Total: {resumo(total)}')
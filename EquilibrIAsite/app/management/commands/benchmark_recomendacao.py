@@ -0,0 +1,74 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import recomendacao
+from app.models import HorarioDisponivel, Psicologo
+
+
+def resumo(tempos):
+    tempos = sorted(tempos)
+    p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+    return f'média {statistics.mean(tempos) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a recomendação de psicólogos: construção da matriz de características, '
+        'atualização incremental após alterações e pontuação de todos os candidatos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=200)
+        parser.add_argument('--alteracoes', type=int, default=20,
+                            help='Horários alterados antes de medir a atualização incremental.')
+
+    def handle(self, *args, **options):
+        if not recomendacao.disponivel():
+            raise CommandError('A recomendação requer o pacote "numpy".')
+
+        matriz = recomendacao.matriz()
+        versao = recomendacao.versao_atual()
+        inicio = time.perf_counter()
+        matriz.reconstruir(versao)
+        self.stdout.write(
+            f'Matriz {matriz.matriz.shape[0]} psicólogos x {matriz.matriz.shape[1]} colunas '
+            f'construída em {(time.perf_counter() - inicio) * 1000:.1f} ms '
+            f'({int(matriz.elegiveis.sum())} com horários livres).'
+        )
+
+        horarios = list(HorarioDisponivel.objects.order_by('?')[:options['alteracoes']])
+        if horarios:
+            for horario in horarios:
+                horario.save()  # dispara os sinais (em autocommit, on_commit roda na hora)
+            inicio = time.perf_counter()
+            matriz.sincronizar(recomendacao.versao_atual())
+            self.stdout.write(
+                f'Atualização incremental de {len(horarios)} alterações: '
+                f'{(time.perf_counter() - inicio) * 1000:.1f} ms'
+            )
+
+        tempos = []
+        for _ in range(options['repeticoes']):
+            autoavaliacao = {
+                'ansiedade': random.randint(1, 10),
+                'estresse': random.randint(1, 10),
+                'humor': random.randint(1, 10),
+            }
+            tema = random.choice([None, 'ansiedade', 'estresse'])
+            inicio = time.perf_counter()
+            matriz.melhores(recomendacao.intensidades_do_usuario(autoavaliacao, tema), 5)
+            tempos.append(time.perf_counter() - inicio)
+        self.stdout.write(f'Pontuação de todos os candidatos + top-5: {resumo(tempos)}')
+
+        usuario_id = 0
+        recomendacao.recomendar(usuario_id, autoavaliacao, tema)
+        tempos = []
+        for _ in range(options['repeticoes']):
+            inicio = time.perf_counter()
+            recomendacao.recomendar(usuario_id, autoavaliacao, tema)
+            tempos.append(time.perf_counter() - inicio)
+        self.stdout.write(f'Recomendação em cache: {resumo(tempos)}')
+        self.stdout.write(f'{Psicologo.objects.count()} psicólogos no banco.')
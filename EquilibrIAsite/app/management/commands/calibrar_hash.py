@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.hashers import calibrar_argon2, medir_atual
+
+try:
+    import argon2
+except ImportError:  # opcional: sem ele, as senhas usam PBKDF2
+    argon2 = None
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo do hash de senhas nesta máquina e sugere ARGON2_TIME_COST e '
+        'ARGON2_MEMORY_COST para um tempo-alvo por hash. Rode no hardware de produção.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alvo-ms', type=float, default=250.0,
+                            help='Tempo máximo aceitável de um hash, em milissegundos.')
+        parser.add_argument('--memorias', default='19456,47104,65536',
+                            help='Custos de memória (KiB) a testar, separados por vírgula.')
+        parser.add_argument('--paralelismo', type=int, default=1)
+        parser.add_argument('--repeticoes', type=int, default=5, help='Hashes medidos por combinação.')
+
+    def handle(self, *args, **options):
+        processos = max(1, getattr(settings, 'HASH_PROCESSOS', 2))
+        algoritmo, segundos = medir_atual(options['repeticoes'])
+        self.stdout.write(
+            f'Atual ({algoritmo}): {segundos * 1000:.0f} ms por hash, '
+            f'até {processos / segundos:.1f} cadastros/logins por segundo com {processos} processo(s).'
+        )
+        if argon2 is None:
+            raise CommandError('Instale o pacote "argon2-cffi" para usar e calibrar o Argon2.')
+
+        alvo = options['alvo_ms'] / 1000
+        memorias = [int(m) for m in options['memorias'].split(',')]
+        resultados = calibrar_argon2(alvo, memorias, options['paralelismo'], options['repeticoes'])
+        for memoria, time_cost, segundos in resultados:
+            if time_cost is None:
+                self.stdout.write(f'  {memoria:>7} KiB: acima do alvo já com time_cost=1 ({segundos * 1000:.0f} ms)')
+            else:
+                self.stdout.write(f'  {memoria:>7} KiB: time_cost={time_cost} ({segundos * 1000:.0f} ms)')
+
+        possiveis = [r for r in resultados if r[1] is not None]
+        if not possiveis:
+            raise CommandError('Nenhuma combinação cabe no alvo: aumente --alvo-ms ou teste memórias menores.')
+        # Memória é o que mais encarece ataques com GPU: vence a maior que cabe no alvo
+        memoria, time_cost, segundos = max(possiveis, key=lambda r: (r[0], r[1]))
+        self.stdout.write(
+            f'Sugestão ({segundos * 1000:.0f} ms por hash, até {processos / segundos:.1f}/s com '
+            f'{processos} processo(s)):\n'
+            f'  ARGON2_TIME_COST={time_cost}\n'
+            f'  ARGON2_MEMORY_COST={memoria}\n'
+            f'  ARGON2_PARALLELISM={options["paralelismo"]}'
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.caixa_saida import enviar_lote
+
+
+class Command(BaseCommand):
+    help = (
+        'Envia por e-mail as mensagens de contato pendentes na caixa de saída, '
+        'em lotes com uma conexão SMTP cada. Com --continuo, funciona como worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50)
+        parser.add_argument('--continuo', action='store_true',
+                            help='Não termina quando a fila esvazia; verifica de novo a cada --intervalo segundos.')
+        parser.add_argument('--intervalo', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        total_enviadas = total_falhas = 0
+        while True:
+            inicio = time.perf_counter()
+            enviadas, falhas = enviar_lote(options['lote'])
+            if enviadas or falhas:
+                total_enviadas += enviadas
+                total_falhas += falhas
+                self.stdout.write(
+                    f'Lote: {enviadas} enviadas, {falhas} falhas em {time.perf_counter() - inicio:.2f}s.'
+                )
+                continue
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+        self.stdout.write(f'Total: {total_enviadas} enviadas, {total_falhas} falhas (reagendadas ou esgotadas).')
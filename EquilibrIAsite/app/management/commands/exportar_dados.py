@@ -0,0 +1,62 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.exportacao import FORMATOS, contar_registros, gerar_exportacao
+from app.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta todos os dados pessoais de um usuário (LGPD) em JSONL ou CSV, opcionalmente com gzip. '
+        'Com --alvo, falha se a exportação levar mais que o tempo-alvo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario', help='Nome de usuário ou e-mail do titular dos dados.')
+        parser.add_argument('--formato', choices=FORMATOS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true', help='Compacta a saída com gzip.')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: saída padrão).')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Linhas buscadas por vez no cursor do banco.')
+        parser.add_argument('--alvo', type=float, default=None,
+                            help='Tempo-alvo em segundos para a exportação completa (ex.: 10 para 100 mil linhas).')
+
+    def handle(self, *args, **options):
+        identificador = options['usuario']
+        usuario = (
+            Usuario.objects.filter(username=identificador).first()
+            or Usuario.objects.filter(email=identificador).first()
+        )
+        if usuario is None:
+            raise CommandError(f'Usuário "{identificador}" não encontrado.')
+
+        linhas = contar_registros(usuario)
+        blocos = gerar_exportacao(
+            usuario,
+            formato=options['formato'],
+            compactar=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+
+        inicio = time.perf_counter()
+        total_bytes = 0
+        destino = open(options['saida'], 'wb') if options['saida'] else sys.stdout.buffer
+        try:
+            for bloco in blocos:
+                destino.write(bloco)
+                total_bytes += len(bloco)
+        finally:
+            if options['saida']:
+                destino.close()
+            else:
+                destino.flush()
+
+        duracao = time.perf_counter() - inicio
+        self.stderr.write(
+            f'{linhas} linhas ({total_bytes} bytes) exportadas em {duracao:.2f}s '
+            f'({linhas / duracao:.0f} linhas/s).'
+        )
+        if options['alvo'] is not None and duracao > options['alvo']:
+            raise CommandError(f'Exportação acima do alvo: {duracao:.2f}s > {options["alvo"]:.2f}s.')
@@ -0,0 +1,132 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Executado num interpretador novo: mede a partida a frio de um worker.
+SCRIPT = r'''
+import json, sys, time
+
+marcas = []
+inicio = time.perf_counter()
+
+
+def marcar(fase, detalhe=''):
+    global inicio
+    agora = time.perf_counter()
+    marcas.append((fase, agora - inicio, detalhe))
+    inicio = agora
+
+
+import django
+marcar('import do django')
+django.setup(set_prefix=False)
+marcar('setup (settings, apps e modelos)')
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+handler = WSGIHandler()
+marcar('middleware')
+
+if sys.argv[1] == '1':
+    from app.aquecimento import aquecer
+    for fase, duracao, detalhe in aquecer(forcar=True):
+        marcas.append(('aquecimento: ' + fase, duracao, detalhe))
+    inicio = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+hosts = [h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*']
+for url in sys.argv[2:]:
+    caminho, _, consulta = url.partition('?')
+    environ = {'PATH_INFO': caminho, 'QUERY_STRING': consulta}
+    if hosts:
+        environ['HTTP_HOST'] = hosts[0]
+    setup_testing_defaults(environ)
+    status = []
+    corpo = handler(environ, lambda s, h, e=None: status.append(s))
+    b''.join(corpo)
+    corpo.close()
+    marcar('1a requisição ' + url, status[0])
+
+print(json.dumps(marcas))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a partida a frio de um worker, por fase (imports, setup, middleware, '
+        'aquecimento e primeiras requisições), com e sem o aquecimento de app/aquecimento.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urls', default='/,/blog/,/profissionais/',
+                            help='Requisições feitas logo após a inicialização, separadas por vírgula.')
+        parser.add_argument('--repeticoes', type=int, default=3,
+                            help='Processos por modo; cada fase mostra a mediana.')
+        parser.add_argument('--modulos', type=int, default=10,
+                            help='Mostra os N imports mais lentos (python -X importtime); 0 desativa.')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON, para acompanhar regressões.')
+
+    def executar(self, aquecer, urls, importtime=False):
+        comando = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+        comando += ['-c', SCRIPT, '1' if aquecer else '0'] + urls
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'))
+        if importtime:
+            # Sem aquecimento: os processos do pool de hash herdariam o -X importtime
+            # e misturariam os imports deles na mesma saída
+            env['AQUECIMENTO'] = '0'
+        processo = subprocess.run(comando, capture_output=True, text=True, env=env, cwd=settings.BASE_DIR)
+        if processo.returncode != 0:
+            raise CommandError(f'Falha no processo de medição:\n{processo.stderr[-2000:]}')
+        return json.loads(processo.stdout.strip().splitlines()[-1]), processo.stderr
+
+    def medir(self, aquecer, urls, repeticoes):
+        execucoes = [self.executar(aquecer, urls)[0] for _ in range(repeticoes)]
+        fases = []
+        for i, (fase, _, detalhe) in enumerate(execucoes[0]):
+            fases.append({
+                'fase': fase,
+                'ms': statistics.median(execucao[i][1] for execucao in execucoes) * 1000,
+                'detalhe': detalhe,
+            })
+        return fases
+
+    def handle(self, *args, **options):
+        urls = [url.strip() for url in options['urls'].split(',') if url.strip()]
+        resultado = {
+            'sem_aquecimento': self.medir(False, urls, options['repeticoes']),
+            'com_aquecimento': self.medir(True, urls, options['repeticoes']),
+        }
+        if options['modulos']:
+            _, saida = self.executar(False, urls, importtime=True)
+            resultado['imports_mais_lentos'] = self.imports_mais_lentos(saida, options['modulos'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, ensure_ascii=False, indent=2))
+            return
+
+        for modo, titulo in (('sem_aquecimento', 'Sem aquecimento'), ('com_aquecimento', 'Com aquecimento')):
+            self.stdout.write(f'{titulo} (mediana de {options["repeticoes"]} processos):')
+            for fase in resultado[modo]:
+                self.stdout.write(f'  {fase["fase"]:<42} {fase["ms"]:8.1f} ms  {fase["detalhe"]}')
+            inicializacao = sum(f['ms'] for f in resultado[modo] if not f['fase'].startswith('1a requisição'))
+            requisicoes = sum(f['ms'] for f in resultado[modo] if f['fase'].startswith('1a requisição'))
+            self.stdout.write(f'  Inicialização: {inicializacao:.1f} ms; primeiras requisições: {requisicoes:.1f} ms')
+
+        if options['modulos']:
+            self.stdout.write('Imports mais lentos (acumulado, até as primeiras requisições):')
+            for modulo, ms in resultado['imports_mais_lentos']:
+                self.stdout.write(f'  {modulo:<50} {ms:8.1f} ms')
+
+    def imports_mais_lentos(self, saida, quantidade):
+        tempos = []
+        for linha in saida.splitlines():
+            if not linha.startswith('import time:') or 'cumulative' in linha:
+                continue
+            _, acumulado, modulo = linha[len('import time:'):].split('|')
+            tempos.append((modulo.strip(), int(acumulado) / 1000))
+        return sorted(tempos, key=lambda item: -item[1])[:quantidade]
@@ -0,0 +1,31 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.lista_espera import expirar_reservas, metricas
+
+
+class Command(BaseCommand):
+    help = (
+        'Encerra as reservas da lista de espera que expiraram e oferece cada horário ao próximo da '
+        'fila. Feito para rodar a cada minuto (cron) ou como worker com --continuo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true')
+        parser.add_argument('--intervalo', type=float, default=30.0)
+        parser.add_argument('--metricas', action='store_true',
+                            help='Só mostra tentativas/conflitos de agendamento e o tempo até reagendar.')
+
+    def handle(self, *args, **options):
+        if options['metricas']:
+            self.stdout.write(json.dumps(metricas(), indent=2, ensure_ascii=False))
+            return
+        while True:
+            expiradas, reofertadas = expirar_reservas()
+            if expiradas or not options['continuo']:
+                self.stdout.write(f'{expiradas} reservas expiradas, {reofertadas} horários oferecidos de novo.')
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
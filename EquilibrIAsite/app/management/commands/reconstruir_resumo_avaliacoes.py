@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.models import ResumoAvaliacoes
+from app.recomendacao import marcar_tudo_alterado
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o resumo de avaliações (total, soma e média bayesiana) de todos os psicólogos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total = ResumoAvaliacoes.reconstruir(lote=options['lote'])
+        marcar_tudo_alterado()  # as notas da matriz de recomendação mudaram
+        self.stdout.write(f'{total} resumos recalculados em {time.perf_counter() - inicio:.2f}s.')
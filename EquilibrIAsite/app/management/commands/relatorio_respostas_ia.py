@@ -0,0 +1,91 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import Length
+
+from app.ia import RESPOSTAS_FIXAS
+from app.models import Usuario, InteracaoIA, RespostaIA
+
+
+class Command(BaseCommand):
+    help = 'Mostra o ganho de espaço e de vazão de inserção da deduplicação das respostas da IA.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--insercoes', type=int, default=0,
+                            help='Mede a vazão inserindo N interações (desfeitas ao final).')
+
+    def handle(self, *args, **options):
+        self.relatorio_espaco()
+        if options['insercoes']:
+            self.relatorio_insercao(options['insercoes'])
+
+    def relatorio_espaco(self):
+        respostas = RespostaIA.objects.annotate(usos=Count('interacoes'), tamanho=Length('texto'))
+        total_interacoes = 0
+        bytes_logicos = 0
+        bytes_armazenados = 0
+        distintas = 0
+        for usos, tamanho in respostas.values_list('usos', 'tamanho').iterator():
+            total_interacoes += usos
+            bytes_logicos += usos * tamanho
+            bytes_armazenados += tamanho
+            distintas += 1
+
+        self.stdout.write(f'Interações: {total_interacoes}')
+        self.stdout.write(f'Respostas distintas: {distintas}')
+        self.stdout.write(f'Texto de respostas sem deduplicação: {bytes_logicos / 1024 / 1024:.1f} MiB')
+        self.stdout.write(f'Texto de respostas armazenado: {bytes_armazenados / 1024 / 1024:.1f} MiB')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for tabela in (InteracaoIA._meta.db_table, RespostaIA._meta.db_table):
+                    cursor.execute('SELECT pg_size_pretty(pg_total_relation_size(%s))', [tabela])
+                    self.stdout.write(f'Tamanho de {tabela}: {cursor.fetchone()[0]}')
+
+    def relatorio_insercao(self, total):
+        usuario = Usuario.objects.order_by('id').first()
+        if usuario is None:
+            self.stderr.write('Nenhum usuário cadastrado; rode "semear_dados" antes.')
+            return
+
+        # Aquece o cache de ids fora da transação medida: lá dentro o on_commit que o
+        # preenche não dispara, e cada linha pagaria um SELECT que o caminho legado não paga
+        for texto in RESPOSTAS_FIXAS:
+            RespostaIA.obter_id(texto)
+
+        # Os dois caminhos medidos na mesma transação, desfeita ao final
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            for n in range(total):
+                InteracaoIA.objects.create(
+                    usuario=usuario,
+                    mensagem_usuario='benchmark',
+                    resposta_ia=RESPOSTAS_FIXAS[n % len(RESPOSTAS_FIXAS)],
+                )
+            deduplicado = total / (time.perf_counter() - inicio)
+
+            legado = None
+            if connection.vendor == 'postgresql':
+                # Mesmo volume numa tabela temporária com o layout antigo (texto completo por linha)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'CREATE TEMP TABLE interacao_legada ('
+                        'id bigserial PRIMARY KEY, usuario_id bigint, mensagem_usuario text, '
+                        'resposta_ia text, timestamp timestamptz) ON COMMIT DROP'
+                    )
+                    inicio = time.perf_counter()
+                    for n in range(total):
+                        cursor.execute(
+                            'INSERT INTO interacao_legada (usuario_id, mensagem_usuario, resposta_ia, timestamp) '
+                            'VALUES (%s, %s, %s, now())',
+                            [usuario.id, 'benchmark', RESPOSTAS_FIXAS[n % len(RESPOSTAS_FIXAS)]],
+                        )
+                    legado = total / (time.perf_counter() - inicio)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Inserção com deduplicação: {deduplicado:.0f} linhas/s')
+        if legado is not None:
+            self.stdout.write(f'Inserção com texto completo: {legado:.0f} linhas/s')
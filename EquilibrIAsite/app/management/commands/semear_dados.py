@@ -0,0 +1,178 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from app.ia import RESPOSTAS_FIXAS
+from app.models import (
+    Usuario, InteracaoIA, RespostaIA, Psicologo, HorarioDisponivel, Consulta, Avaliacao, ResumoAvaliacoes,
+)
+from app.recomendacao import marcar_tudo_alterado
+
+MENSAGENS = [
+    'Estou me sentindo ansioso',
+    'Me sinto triste hoje',
+    'Estou estressado com o trabalho',
+    'Preciso de técnicas de relaxamento',
+    'Não consegui dormir bem',
+]
+
+ESPECIALIDADES = [
+    'Ansiedade', 'Depressão', 'Estresse', 'Terapia Cognitivo-Comportamental', 'Terapia de Casal',
+    'Luto', 'Autoestima', 'Relacionamentos', 'Psicologia Infantil', 'Dependência Química',
+]
+
+
+class Command(BaseCommand):
+    help = 'Popula o banco com dados sintéticos para testes de carga e benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--interacoes', type=int, default=0)
+        parser.add_argument('--psicologos', type=int, default=0)
+        parser.add_argument('--avaliacoes', type=int, default=0,
+                            help='Consultas realizadas e avaliadas, distribuídas entre os psicólogos.')
+        parser.add_argument('--consultas-vencidas', type=int, default=0,
+                            help='Consultas passadas ainda agendadas/confirmadas (ver atualizar_consultas).')
+        parser.add_argument('--fracao-livre', type=float, default=0.01,
+                            help='Fração de interações com resposta livre (texto único).')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['semente'])
+        lote = options['lote']
+
+        usuario_ids = self.semear_usuarios(options['usuarios'], lote)
+        if options['interacoes']:
+            self.semear_interacoes(usuario_ids, options['interacoes'], options['fracao_livre'], lote)
+        if options['psicologos']:
+            self.semear_psicologos(options['psicologos'], lote)
+        if options['avaliacoes']:
+            self.semear_avaliacoes(usuario_ids, options['avaliacoes'], lote)
+        if options['consultas_vencidas']:
+            self.semear_consultas_vencidas(usuario_ids, options['consultas_vencidas'], lote)
+        if options['psicologos'] or options['avaliacoes']:
+            # bulk_create não passa pelo save(): recalcula os resumos de uma vez
+            ResumoAvaliacoes.reconstruir()
+            marcar_tudo_alterado()
+
+    def semear_usuarios(self, total, lote, prefixo='semente'):
+        inicio = Usuario.objects.count()  # sufixos sempre novos entre execuções
+        senha = make_password(None)  # senha inutilizável, sem custo de hash por usuário
+        usuarios = [
+            Usuario(username=f'{prefixo}_{n}', email=f'{prefixo}_{n}@exemplo.com', password=senha)
+            for n in range(inicio, inicio + total)
+        ]
+        Usuario.objects.bulk_create(usuarios, batch_size=lote)
+        self.stdout.write(f'{total} usuários criados.')
+        return list(Usuario.objects.filter(username__startswith=f'{prefixo}_').values_list('id', flat=True))
+
+    def semear_interacoes(self, usuario_ids, total, fracao_livre, lote):
+        respostas_fixas = [RespostaIA.obter_id(texto) for texto in RESPOSTAS_FIXAS]
+
+        criadas = 0
+        inicio = time.perf_counter()
+        while criadas < total:
+            tamanho = min(lote, total - criadas)
+            interacoes = []
+            for n in range(tamanho):
+                if random.random() < fracao_livre:
+                    resposta_id = RespostaIA.obter_id(f'Resposta livre do modelo #{criadas + n}: {random.random()}')
+                else:
+                    resposta_id = random.choice(respostas_fixas)
+                interacoes.append(InteracaoIA(
+                    usuario_id=random.choice(usuario_ids),
+                    mensagem_usuario=random.choice(MENSAGENS),
+                    resposta_id=resposta_id,
+                ))
+            InteracaoIA.objects.bulk_create(interacoes, batch_size=lote)
+            criadas += tamanho
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'{criadas} interações criadas em {duracao:.1f}s ({criadas / duracao:.0f} linhas/s).')
+
+    def semear_psicologos(self, total, lote):
+        self.semear_usuarios(total, lote, prefixo='psicologo_semente')
+        sem_perfil = Usuario.objects.filter(
+            username__startswith='psicologo_semente_', psicologo__isnull=True
+        ).values_list('id', flat=True)
+        inicio = Psicologo.objects.count()
+        psicologos = [
+            Psicologo(
+                usuario_id=usuario_id,
+                nome=f'Psicólogo(a) {inicio + n}',
+                crp=f'{(inicio + n) // 1000000:02d}/{(inicio + n) % 1000000:06d}',
+                especialidades=', '.join(random.sample(ESPECIALIDADES, random.randint(1, 4))),
+            )
+            for n, usuario_id in enumerate(sem_perfil)
+        ]
+        psicologos = Psicologo.objects.bulk_create(psicologos, batch_size=lote)
+        horarios = [
+            HorarioDisponivel(
+                psicologo_id=psicologo.id,
+                dia_semana=dia,
+                hora_inicio=datetime.time(inicio),
+                hora_fim=datetime.time(inicio + random.randint(2, 4)),
+            )
+            for psicologo in psicologos
+            for dia in random.sample(range(6), random.randint(0, 4))
+            for inicio in [random.choice([8, 13, 18])]
+        ]
+        HorarioDisponivel.objects.bulk_create(horarios, batch_size=lote)
+        self.stdout.write(f'{len(psicologos)} psicólogos criados, com {len(horarios)} horários disponíveis.')
+
+    def _gerador_de_consultas(self, usuario_ids):
+        """Devolve uma função que cria n consultas passadas em horários ainda livres."""
+        psicologo_ids = list(Psicologo.objects.values_list('id', flat=True))
+        # Próximo horário livre de cada psicólogo: (psicologo, data, horario) é único
+        proximo_slot = dict(
+            Consulta.objects.order_by().values('psicologo_id').annotate(n=Count('id')).values_list('psicologo_id', 'n')
+        )
+        base = datetime.date(2020, 1, 1)
+
+        def gerar(n, status):
+            consultas = []
+            for _ in range(n):
+                psicologo_id = random.choice(psicologo_ids)
+                slot = proximo_slot.get(psicologo_id, 0)
+                proximo_slot[psicologo_id] = slot + 1
+                consultas.append(Consulta(
+                    usuario_id=random.choice(usuario_ids),
+                    psicologo_id=psicologo_id,
+                    data=base + datetime.timedelta(days=slot // 10),
+                    horario=datetime.time(8 + slot % 10),
+                    status=random.choice(status) if isinstance(status, tuple) else status,
+                ))
+            return consultas
+        return gerar
+
+    def semear_avaliacoes(self, usuario_ids, total, lote):
+        gerar = self._gerador_de_consultas(usuario_ids)
+
+        criadas = 0
+        inicio = time.perf_counter()
+        while criadas < total:
+            consultas = Consulta.objects.bulk_create(gerar(min(lote, total - criadas), 'realizada'), batch_size=lote)
+            Avaliacao.objects.bulk_create(
+                [Avaliacao(consulta_id=consulta.id, nota=random.choices([1, 2, 3, 4, 5], [1, 1, 2, 4, 6])[0])
+                 for consulta in consultas],
+                batch_size=lote,
+            )
+            criadas += len(consultas)
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'{criadas} avaliações criadas em {duracao:.1f}s.')
+
+
+    def semear_consultas_vencidas(self, usuario_ids, total, lote):
+        gerar = self._gerador_de_consultas(usuario_ids)
+        criadas = 0
+        while criadas < total:
+            consultas = gerar(min(lote, total - criadas), ('agendada', 'confirmada'))
+            Consulta.objects.bulk_create(consultas, batch_size=lote)
+            criadas += len(consultas)
+        self.stdout.write(f'{criadas} consultas vencidas (agendadas/confirmadas) criadas.')
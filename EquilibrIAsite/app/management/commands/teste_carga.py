@@ -0,0 +1,293 @@
+import asyncio
+import contextlib
+import http.cookiejar
+import json
+import secrets
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    import websockets
+except ImportError:  # opcional: só para --websocket
+    websockets = None
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class SessaoChat:
+    """Cliente HTTP com cookies próprios, como uma aba de navegador."""
+
+    def __init__(self, base_url, pagina, rota):
+        self.base_url = base_url.rstrip('/')
+        self.pagina = pagina
+        self.rota = rota
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def abrir(self):
+        """Carrega a página do chat para receber o cookie CSRF."""
+        self.opener.open(self.base_url + self.pagina, timeout=30).read()
+        self.csrf = next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+
+    def enviar(self, dados):
+        requisicao = urllib.request.Request(
+            self.base_url + self.rota,
+            data=urllib.parse.urlencode(dados).encode(),
+            headers={'X-CSRFToken': self.csrf, 'Referer': self.base_url + self.pagina},
+        )
+        try:
+            with self.opener.open(requisicao, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as erro:
+            return erro.code
+
+    def cadastrar(self):
+        """Envia o formulário de cadastro de uma conta nova; True se terminou no login."""
+        sufixo = secrets.token_hex(6)
+        requisicao = urllib.request.Request(
+            self.base_url + self.rota,
+            data=urllib.parse.urlencode({
+                'csrfmiddlewaretoken': self.csrf,
+                'username': f'carga_{sufixo}',
+                'first_name': 'Carga',
+                'last_name': 'Teste',
+                'email': f'carga_{sufixo}@example.com',
+                'password1': f'Tempestade-{sufixo}',
+                'password2': f'Tempestade-{sufixo}',
+            }).encode(),
+            headers={'Referer': self.base_url + self.pagina},
+        )
+        with self.opener.open(requisicao, timeout=60) as response:
+            response.read()
+            # Sucesso redireciona para o login; erro de validação devolve o próprio formulário
+            return urllib.parse.urlsplit(response.geturl()).path != self.rota
+
+
+def memoria_do_processo(pid):
+    """Memória residente (KB) de um processo local, lida de /proc."""
+    with open(f'/proc/{pid}/status') as status:
+        for linha in status:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1])
+    raise CommandError(f'VmRSS não encontrado para o processo {pid}.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga contra um servidor em execução (WSGI ou ASGI): para cada nível de '
+        'sessões de chat simultâneas, mede vazão e latência p50/p95. Com --websocket, as '
+        'mensagens vão pelo canal WebSocket (servidor ASGI) em vez do POST. Com --cadastros, '
+        'cada nível roda também durante uma tempestade de cadastros, para ver quanto o hash das '
+        'senhas atrasa o chat.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Endereço do servidor.')
+        parser.add_argument('--pagina', default='/apoio_emocional/', help='Página que entrega o cookie CSRF.')
+        parser.add_argument('--rota', default='/api/chat-ia/', help='Rota que recebe as mensagens.')
+        parser.add_argument('--sessoes', default='10,25,50,100,200',
+                            help='Níveis de sessões simultâneas, separados por vírgula.')
+        parser.add_argument('--mensagens', type=int, default=10, help='Mensagens por sessão.')
+        parser.add_argument('--pausa', type=float, default=0.5,
+                            help='Segundos de "digitação" entre mensagens de uma sessão.')
+        parser.add_argument('--p95-alvo', type=float, default=500.0,
+                            help='Latência p95 (ms) aceitável para considerar o nível sustentado.')
+        parser.add_argument('--websocket', action='store_true',
+                            help='Usa o canal WebSocket do chat (requer o pacote "websockets").')
+        parser.add_argument('--rota-websocket', default='/ws/apoio_emocional/')
+        parser.add_argument('--ociosas', type=int, default=0,
+                            help='Em vez do teste de vazão, abre N conexões WebSocket ociosas e mede a '
+                                 'memória do servidor por conexão (requer --pid).')
+        parser.add_argument('--pid', type=int, help='PID do worker do servidor, na mesma máquina.')
+        parser.add_argument('--cadastros', type=int, default=0,
+                            help='Repete cada nível com N cadastros simultâneos e contínuos em --rota-cadastro. '
+                                 'Cria contas "carga_*": use só em ambiente de teste.')
+        parser.add_argument('--rota-cadastro', default='/registro/')
+
+    def handle(self, *args, **options):
+        if (options['websocket'] or options['ociosas']) and websockets is None:
+            raise CommandError('Instale o pacote "websockets" para testar o canal WebSocket.')
+        if options['ociosas']:
+            if not options['pid']:
+                raise CommandError('--ociosas exige --pid.')
+            return asyncio.run(self.medir_ociosas(options))
+
+        niveis = [int(n) for n in options['sessoes'].split(',')]
+        sustentado = 0
+        executar = self.executar_nivel_websocket if options['websocket'] else self.executar_nivel
+
+        for nivel in niveis:
+            execucoes = [('', lambda: executar(nivel, options))]
+            if options['cadastros']:
+                execucoes.append(('com cadastros', lambda: self.durante_cadastros(executar, nivel, options)))
+            for rotulo, execucao in execucoes:
+                latencias, erros, recusadas, duracao = execucao()
+                if not latencias:
+                    raise CommandError(f'Nenhuma resposta do servidor em {options["url"]}.')
+                p50 = percentil(latencias, 50) * 1000
+                p95 = percentil(latencias, 95) * 1000
+                self.stdout.write(
+                    f'{nivel:>5} sessões{" " + rotulo if rotulo else ""}: {len(latencias) / duracao:7.1f} msg/s, '
+                    f'p50 {p50:7.1f} ms, p95 {p95:7.1f} ms, média {statistics.mean(latencias) * 1000:7.1f} ms, '
+                    f'{erros} erros, {recusadas} recusadas (429)'
+                )
+            # Com --cadastros, vale a execução durante a tempestade (a última)
+            if p95 <= options['p95_alvo'] and not erros and not recusadas:
+                sustentado = nivel
+
+        self.stdout.write(f'Sessões simultâneas sustentadas com p95 <= {options["p95_alvo"]:.0f} ms: {sustentado}')
+
+    def durante_cadastros(self, executar, nivel, options):
+        with self.tempestade_de_cadastros(options) as (latencias, falhas, inicio):
+            resultado = executar(nivel, options)
+        duracao = time.perf_counter() - inicio
+        if latencias:
+            self.stdout.write(
+                f'      cadastros: {len(latencias) / duracao:7.1f}/s, p50 {percentil(latencias, 50) * 1000:7.1f} ms, '
+                f'p95 {percentil(latencias, 95) * 1000:7.1f} ms, {falhas[0]} falhas'
+            )
+        else:
+            self.stdout.write(f'      cadastros: nenhum concluído, {falhas[0]} falhas')
+        return resultado
+
+    @contextlib.contextmanager
+    def tempestade_de_cadastros(self, options):
+        """--cadastros clientes cadastrando contas sem pausa enquanto o bloco executa."""
+        latencias = []
+        falhas = [0]
+        trava = threading.Lock()
+        parar = threading.Event()
+
+        def cadastrar():
+            while not parar.is_set():
+                cliente = SessaoChat(options['url'], options['rota_cadastro'], options['rota_cadastro'])
+                inicio = time.perf_counter()
+                try:
+                    cliente.abrir()
+                    criada = cliente.cadastrar()
+                except (urllib.error.URLError, OSError):
+                    criada = False
+                with trava:
+                    if criada:
+                        latencias.append(time.perf_counter() - inicio)
+                    else:
+                        falhas[0] += 1
+
+        threads = [threading.Thread(target=cadastrar) for _ in range(options['cadastros'])]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            yield latencias, falhas, inicio
+        finally:
+            parar.set()
+            for thread in threads:
+                thread.join()
+
+    def executar_nivel(self, nivel, options):
+        latencias = []
+        erros = [0]
+        recusadas = [0]
+        trava = threading.Lock()
+
+        def sessao():
+            chat = SessaoChat(options['url'], options['pagina'], options['rota'])
+            try:
+                chat.abrir()
+            except (urllib.error.URLError, OSError):
+                with trava:
+                    erros[0] += 1
+                return
+            for _ in range(options['mensagens']):
+                inicio = time.perf_counter()
+                try:
+                    status = chat.enviar({'mensagem': 'Estou me sentindo ansioso'})
+                except (urllib.error.URLError, OSError):
+                    status = None
+                latencia = time.perf_counter() - inicio
+                with trava:
+                    if status == 200:
+                        latencias.append(latencia)
+                    elif status == 429:
+                        recusadas[0] += 1
+                    else:
+                        erros[0] += 1
+                time.sleep(options['pausa'])
+
+        threads = [threading.Thread(target=sessao) for _ in range(nivel)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencias, erros[0], recusadas[0], time.perf_counter() - inicio
+
+    # --- Canal WebSocket ---
+
+    def _conectar(self, options):
+        base = options['url'].rstrip('/')
+        uri = base.replace('http', 'ws', 1) + options['rota_websocket']
+        return websockets.connect(uri, origin=base, max_queue=None)
+
+    def executar_nivel_websocket(self, nivel, options):
+        """Mesma carga do executar_nivel, com uma conexão WebSocket por sessão."""
+        latencias = []
+        erros = [0]
+        recusadas = [0]
+
+        async def sessao():
+            try:
+                conexao = await self._conectar(options)
+            except (OSError, websockets.WebSocketException):
+                erros[0] += 1
+                return
+            async with conexao:
+                for _ in range(options['mensagens']):
+                    inicio = time.perf_counter()
+                    try:
+                        await conexao.send(json.dumps({'mensagem': 'Estou me sentindo ansioso'}))
+                        dados = json.loads(await conexao.recv())
+                    except (OSError, ValueError, websockets.WebSocketException):
+                        dados = {}
+                    if 'resposta' in dados:
+                        latencias.append(time.perf_counter() - inicio)
+                    elif 'retry_after' in dados:
+                        recusadas[0] += 1
+                    else:
+                        erros[0] += 1
+                    await asyncio.sleep(options['pausa'])
+
+        async def nivel_completo():
+            await asyncio.gather(*(sessao() for _ in range(nivel)))
+
+        inicio = time.perf_counter()
+        asyncio.run(nivel_completo())
+        return latencias, erros[0], recusadas[0], time.perf_counter() - inicio
+
+    async def medir_ociosas(self, options):
+        total = options['ociosas']
+        antes = memoria_do_processo(options['pid'])
+        conexoes = []
+        try:
+            for _ in range(total):
+                conexoes.append(await self._conectar(options))
+            await asyncio.sleep(2)  # deixa o servidor assentar as conexões
+            depois = memoria_do_processo(options['pid'])
+        finally:
+            await asyncio.gather(*(conexao.close() for conexao in conexoes), return_exceptions=True)
+        self.stdout.write(
+            f'{len(conexoes)} conexões ociosas: {antes} KB -> {depois} KB '
+            f'({(depois - antes) / len(conexoes):.1f} KB por conexão).'
+        )
@@ -0,0 +1,70 @@
+import logging
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga da limitação de taxa: mede a vazão dos clientes bem-comportados '
+        'sozinhos e depois junto com um cliente abusivo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rota', default='apoio_emocional', help='Nome da URL a testar.')
+        parser.add_argument('--clientes', type=int, default=5, help='Clientes bem-comportados.')
+        parser.add_argument('--intervalo', type=float, default=4.0,
+                            help='Segundos entre mensagens de cada cliente bem-comportado.')
+        parser.add_argument('--abusivos', type=int, default=1)
+        parser.add_argument('--duracao', type=float, default=20.0, help='Segundos por fase.')
+
+    def handle(self, *args, **options):
+        self.url = reverse(options['rota'])
+        # Cada 429 geraria um aviso no log de django.request
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        for fase, abusivos in (('sem abuso', 0), ('com abuso', options['abusivos'])):
+            resultados = self.executar_fase(options['clientes'], abusivos, options['intervalo'], options['duracao'])
+            self.stdout.write(f'--- Fase {fase} ({options["duracao"]:.0f}s) ---')
+            for tipo, (aceitas, recusadas, latencias) in resultados.items():
+                if not aceitas + recusadas:
+                    continue
+                media = sum(latencias) / len(latencias) * 1000
+                self.stdout.write(
+                    f'{tipo}: {aceitas / options["duracao"]:.1f} aceitas/s, '
+                    f'{recusadas} recusadas (429), latência média {media:.1f} ms'
+                )
+
+    def executar_fase(self, clientes, abusivos, intervalo, duracao):
+        resultados = {'bem-comportados': [0, 0, []], 'abusivos': [0, 0, []]}
+        trava = threading.Lock()
+        fim = time.monotonic() + duracao
+
+        def cliente(tipo, ip, espera):
+            client = Client(REMOTE_ADDR=ip)
+            while time.monotonic() < fim:
+                inicio = time.perf_counter()
+                response = client.post(self.url, {'mensagem': 'Estou me sentindo ansioso'})
+                latencia = time.perf_counter() - inicio
+                with trava:
+                    resultado = resultados[tipo]
+                    resultado[0 if response.status_code == 200 else 1] += 1
+                    resultado[2].append(latencia)
+                if espera:
+                    time.sleep(espera)
+
+        threads = [
+            threading.Thread(target=cliente, args=('bem-comportados', f'10.0.0.{n + 1}', intervalo))
+            for n in range(clientes)
+        ] + [
+            threading.Thread(target=cliente, args=('abusivos', f'10.0.1.{n + 1}', 0))
+            for n in range(abusivos)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultados
@@ -0,0 +1,96 @@
+"""
+Conversor de Markdown para HTML seguro, usado ao salvar os artigos do blog.
+
+Todo o texto é escapado antes de qualquer marcação ser aplicada, então HTML
+digitado pelo editor aparece como texto e nunca é executado. Subconjunto
+suportado:
+
+- títulos (#, ##, ###), parágrafos e quebras de linha;
+- listas com "-"/"*" e numeradas ("1."), citações (">") e linha horizontal ("---");
+- **negrito**, *itálico*, `código` e [links](https://...) (só http, https,
+  mailto e caminhos do próprio site).
+"""
+import html
+import re
+
+_LINK = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+_NEGRITO = re.compile(r'\*\*(.+?)\*\*')
+_ITALICO = re.compile(r'(?<![\*\w])\*(?!\s)(.+?)(?<!\s)\*(?![\*\w])')
+_CODIGO = re.compile(r'`([^`]+)`')
+_TITULO = re.compile(r'^(#{1,3})\s+(.*)$')
+_ITEM = re.compile(r'^[-*]\s+(.*)$')
+_ITEM_NUMERADO = re.compile(r'^\d+[.)]\s+(.*)$')
+_ESQUEMAS_PERMITIDOS = ('http://', 'https://', 'mailto:')
+
+
+def _link(match):
+    texto, url = match.groups()
+    # url já está escapada (&quot; no lugar de aspas): não sai do atributo
+    if url.startswith(_ESQUEMAS_PERMITIDOS) or (url.startswith('/') and not url.startswith('//')):
+        externo = ' rel="noopener nofollow"' if not url.startswith('/') else ''
+        return f'<a href="{url}"{externo}>{texto}</a>'
+    return texto
+
+
+def _inline(texto):
+    texto = html.escape(texto)
+    partes = _CODIGO.split(texto)
+    # Índices ímpares são trechos de código: sem outras marcações dentro deles
+    for i in range(0, len(partes), 2):
+        trecho = _LINK.sub(_link, partes[i])
+        trecho = _NEGRITO.sub(r'<strong>\1</strong>', trecho)
+        partes[i] = _ITALICO.sub(r'<em>\1</em>', trecho)
+    for i in range(1, len(partes), 2):
+        partes[i] = f'<code>{partes[i]}</code>'
+    return ''.join(partes)
+
+
+def renderizar_markdown(texto):
+    blocos = []
+    paragrafo, lista, tipo_lista, citacao = [], [], None, []
+
+    def fechar():
+        nonlocal tipo_lista
+        if paragrafo:
+            blocos.append('<p>' + '<br>\n'.join(_inline(l) for l in paragrafo) + '</p>')
+            paragrafo.clear()
+        if lista:
+            itens = ''.join(f'<li>{_inline(item)}</li>' for item in lista)
+            blocos.append(f'<{tipo_lista}>{itens}</{tipo_lista}>')
+            lista.clear()
+            tipo_lista = None
+        if citacao:
+            blocos.append('<blockquote><p>' + '<br>\n'.join(_inline(l) for l in citacao) + '</p></blockquote>')
+            citacao.clear()
+
+    for linha in texto.replace('\r\n', '\n').split('\n'):
+        linha = linha.rstrip()
+        titulo = _TITULO.match(linha)
+        item = _ITEM.match(linha)
+        numerado = _ITEM_NUMERADO.match(linha)
+
+        if not linha.strip():
+            fechar()
+        elif linha.strip() in ('---', '***'):
+            fechar()
+            blocos.append('<hr>')
+        elif titulo:
+            fechar()
+            nivel = len(titulo.group(1)) + 1  # h1 fica com o título do artigo
+            blocos.append(f'<h{nivel}>{_inline(titulo.group(2))}</h{nivel}>')
+        elif item or numerado:
+            tipo = 'ul' if item else 'ol'
+            if paragrafo or citacao or (lista and tipo != tipo_lista):
+                fechar()
+            tipo_lista = tipo
+            lista.append((item or numerado).group(1))
+        elif linha.startswith('>'):
+            if paragrafo or lista:
+                fechar()
+            citacao.append(linha[1:].strip())
+        else:
+            if lista or citacao:
+                fechar()
+            paragrafo.append(linha.strip())
+    fechar()
+    return '\n'.join(blocos)
@@ -0,0 +1,79 @@
+import math
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .papeis import resolver_perfil
+from .db_router import COOKIE_FIXACAO, encerrar_requisicao, iniciar_requisicao, replicas
+from .throttling import interpretar_taxa, consumir_ficha, identificar_cliente
+
+
+class ThrottleMiddleware(MiddlewareMixin):
+    """
+    Recusa com 429 as requisições que excedem o limite configurado para a
+    rota em settings.THROTTLE_TAXAS, antes de qualquer trabalho da view
+    (banco de dados ou geração de resposta da IA).
+    """
+    METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.taxas = {
+            rota: interpretar_taxa(taxa)
+            for rota, taxa in getattr(settings, 'THROTTLE_TAXAS', {}).items()
+        }
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in self.METODOS_SEGUROS:
+            return None
+
+        rota = request.resolver_match.url_name if request.resolver_match else None
+        if rota not in self.taxas:
+            return None
+
+        capacidade, por_segundo = self.taxas[rota]
+        chave = f'throttle:{rota}:{identificar_cliente(request)}'
+        permitido, espera = consumir_ficha(chave, capacidade, por_segundo)
+        if permitido:
+            return None
+
+        response = JsonResponse(
+            {'error': 'Muitas mensagens em pouco tempo. Aguarde um instante e tente novamente.'},
+            status=429,
+        )
+        response['Retry-After'] = str(max(1, math.ceil(espera)))
+        return response
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """
+    Abre o estado de roteamento para réplicas (app/db_router.py) de cada
+    requisição e, se ela escreveu no banco, devolve o cookie que fixa as
+    leituras do usuário no primário por alguns segundos. Deve vir antes do
+    SessionMiddleware, para enxergar a gravação da sessão na resposta.
+    """
+
+    def process_request(self, request):
+        iniciar_requisicao(request)
+
+    def process_response(self, request, response):
+        if encerrar_requisicao() and replicas():
+            response.set_cookie(
+                COOKIE_FIXACAO, '1',
+                max_age=getattr(settings, 'REPLICA_JANELA_FIXACAO', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class PerfilMiddleware(MiddlewareMixin):
+    """
+    Define request.perfil (app/papeis.py), resolvido só se for usado. Deve
+    vir depois do SessionMiddleware e do AuthenticationMiddleware.
+    """
+
+    def process_request(self, request):
+        request.perfil = SimpleLazyObject(lambda: resolver_perfil(request.user, request.session))
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_alter_horariodisponivel_psicologo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespostaIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True, verbose_name='Hash SHA-256')),
+                ('texto', models.TextField(verbose_name='Texto da resposta')),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Resposta da IA',
+                'verbose_name_plural': 'Respostas da IA',
+            },
+        ),
+        migrations.AddField(
+            model_name='interacaoia',
+            name='resposta',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='interacoes', to='app.respostaia', verbose_name='Resposta da IA'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.db import migrations, transaction
+
+TAMANHO_LOTE = 10000
+
+
+def deduplicar_respostas(apps, schema_editor):
+    """
+    Move o texto de InteracaoIA.resposta_ia para RespostaIA, em lotes por
+    faixa de chave primária. Cada lote é uma transação curta, então a
+    migração pode ser interrompida e retomada sem refazer o que já foi feito.
+    """
+    InteracaoIA = apps.get_model('app', 'InteracaoIA')
+    RespostaIA = apps.get_model('app', 'RespostaIA')
+
+    ultimo_id = 0
+    while True:
+        lote = list(
+            InteracaoIA.objects
+            .filter(id__gt=ultimo_id, resposta__isnull=True)
+            .order_by('id')
+            .values_list('id', 'resposta_ia')[:TAMANHO_LOTE]
+        )
+        if not lote:
+            break
+        ultimo_id = lote[-1][0]
+
+        ids_por_hash = {}
+        textos = {}
+        for interacao_id, texto in lote:
+            hash_texto = hashlib.sha256(texto.encode('utf-8')).hexdigest()
+            ids_por_hash.setdefault(hash_texto, []).append(interacao_id)
+            textos[hash_texto] = texto
+
+        with transaction.atomic():
+            RespostaIA.objects.bulk_create(
+                [RespostaIA(hash=h, texto=t) for h, t in textos.items()],
+                ignore_conflicts=True,
+            )
+            respostas = dict(
+                RespostaIA.objects.filter(hash__in=textos).values_list('hash', 'id')
+            )
+            # Poucas respostas distintas por lote: um UPDATE por resposta
+            for hash_texto, interacao_ids in ids_por_hash.items():
+                InteracaoIA.objects.filter(id__in=interacao_ids).update(resposta_id=respostas[hash_texto])
+
+
+def restaurar_respostas(apps, schema_editor):
+    InteracaoIA = apps.get_model('app', 'InteracaoIA')
+    RespostaIA = apps.get_model('app', 'RespostaIA')
+
+    for resposta_id, texto in RespostaIA.objects.values_list('id', 'texto').iterator():
+        InteracaoIA.objects.filter(resposta_id=resposta_id).update(resposta_ia=texto)
+
+
+class Migration(migrations.Migration):
+
+    # Lotes com transações próprias
+    atomic = False
+
+    dependencies = [
+        ('app', '0003_respostaia_interacaoia_resposta'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicar_respostas, restaurar_respostas),
+    ]
@@ -0,0 +1,21 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_deduplicar_respostas_ia'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='interacaoia',
+            name='resposta_ia',
+        ),
+        migrations.AlterField(
+            model_name='interacaoia',
+            name='resposta',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='interacoes', to='app.respostaia', verbose_name='Resposta da IA'),
+        ),
+    ]
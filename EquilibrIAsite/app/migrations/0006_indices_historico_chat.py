@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_remove_interacaoia_resposta_ia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='autoavaliacaoemocional',
+            index=models.Index(fields=['usuario', '-data'], name='autoavaliacao_usuario_data'),
+        ),
+        migrations.AddIndex(
+            model_name='interacaoia',
+            index=models.Index(fields=['usuario', '-timestamp'], name='interacaoia_usuario_timestamp'),
+        ),
+    ]
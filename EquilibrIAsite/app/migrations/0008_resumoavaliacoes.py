@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def criar_resumos(apps, schema_editor):
+    Psicologo = apps.get_model('app', 'Psicologo')
+    Avaliacao = apps.get_model('app', 'Avaliacao')
+    ResumoAvaliacoes = apps.get_model('app', 'ResumoAvaliacoes')
+
+    peso = getattr(settings, 'AVALIACAO_PRIOR_PESO', 5)
+    media = getattr(settings, 'AVALIACAO_PRIOR_MEDIA', 3.0)
+    totais = {
+        linha['consulta__psicologo_id']: (linha['total'], linha['soma'])
+        for linha in (
+            Avaliacao.objects
+            .order_by()
+            .values('consulta__psicologo_id')
+            .annotate(total=models.Count('id'), soma=models.Sum('nota'))
+        )
+    }
+    resumos = []
+    for psicologo_id in Psicologo.objects.values_list('id', flat=True).iterator():
+        total, soma = totais.get(psicologo_id, (0, 0))
+        resumos.append(ResumoAvaliacoes(
+            psicologo_id=psicologo_id,
+            total=total,
+            soma=soma,
+            media_bayesiana=(peso * media + soma) / (peso + total),
+        ))
+    ResumoAvaliacoes.objects.bulk_create(resumos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_indices_login_case_insensitive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoAvaliacoes',
+            fields=[
+                ('psicologo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_avaliacoes', serialize=False, to='app.psicologo', verbose_name='Psicólogo')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Número de avaliações')),
+                ('soma', models.PositiveIntegerField(default=0, verbose_name='Soma das notas')),
+                ('media_bayesiana', models.FloatField(default=0, verbose_name='Média bayesiana')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Avaliações',
+                'verbose_name_plural': 'Resumos de Avaliações',
+                'indexes': [models.Index(fields=['-media_bayesiana', 'psicologo'], name='resumo_media_bayesiana')],
+            },
+        ),
+        migrations.RunPython(criar_resumos, migrations.RunPython.noop),
+    ]
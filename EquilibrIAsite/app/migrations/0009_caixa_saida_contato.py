@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_resumoavaliacoes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InscritoNewsletter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='E-mail')),
+                ('nome', models.CharField(blank=True, max_length=150, verbose_name='Nome')),
+                ('inscrito_em', models.DateTimeField(auto_now_add=True)),
+                ('ativo', models.BooleanField(default=True, verbose_name='Ativo')),
+            ],
+            options={
+                'verbose_name': 'Inscrito na Newsletter',
+                'verbose_name_plural': 'Inscritos na Newsletter',
+            },
+        ),
+        migrations.CreateModel(
+            name='MensagemContato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=150, verbose_name='Nome')),
+                ('email', models.EmailField(max_length=254, verbose_name='E-mail')),
+                ('telefone', models.CharField(blank=True, max_length=30, verbose_name='Telefone')),
+                ('assunto', models.CharField(max_length=100, verbose_name='Assunto')),
+                ('mensagem', models.TextField(verbose_name='Mensagem')),
+                ('aceito_newsletter', models.BooleanField(default=False, verbose_name='Aceita receber a newsletter')),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviada', 'Enviada'), ('falhou', 'Falhou')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('enviada_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Mensagem de Contato',
+                'verbose_name_plural': 'Mensagens de Contato',
+                'ordering': ['-criada_em'],
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='contato_fila_envio')],
+            },
+        ),
+    ]
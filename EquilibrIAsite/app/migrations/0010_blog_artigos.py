@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_caixa_saida_contato'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artigo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=200, verbose_name='Título')),
+                ('slug', models.SlugField(blank=True, max_length=200, unique=True)),
+                ('autor', models.CharField(help_text='Ex: Dra. Ana Carolina Silva', max_length=150, verbose_name='Autor(a)')),
+                ('categoria', models.CharField(max_length=50, verbose_name='Categoria')),
+                ('resumo', models.TextField(max_length=500, verbose_name='Resumo')),
+                ('corpo_markdown', models.TextField(verbose_name='Texto (Markdown)')),
+                ('corpo_html', models.TextField(editable=False)),
+                ('tempo_leitura', models.PositiveIntegerField(default=1, editable=False, verbose_name='Minutos de leitura')),
+                ('publicado', models.BooleanField(default=False, verbose_name='Publicado')),
+                ('publicado_em', models.DateTimeField(blank=True, null=True, verbose_name='Publicado em')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Artigo',
+                'verbose_name_plural': 'Artigos',
+                'ordering': ['-publicado_em', '-id'],
+                'indexes': [models.Index(condition=models.Q(('publicado', True)), fields=['-publicado_em', '-id'], name='artigo_publicados')],
+            },
+        ),
+    ]
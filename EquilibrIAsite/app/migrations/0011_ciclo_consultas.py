@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_blog_artigos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacao',
+            name='tipo',
+            field=models.CharField(choices=[('consulta', 'Consulta'), ('sistema', 'Sistema'), ('ia', 'Interação com IA'), ('avaliacao', 'Pedido de avaliação')], default='sistema', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['status', 'data'], name='consulta_status_data'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_ciclo_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('iniciada_em', models.DateTimeField(auto_now_add=True)),
+                ('marca', models.DateTimeField(verbose_name='Consultas alteradas até')),
+                ('ofertas_ate', models.DateField(verbose_name='Ofertas congeladas até')),
+                ('pares_recalculados', models.PositiveIntegerField(default=0)),
+                ('dias_ofertados', models.PositiveIntegerField(default=0)),
+                ('duracao', models.FloatField(default=0, verbose_name='Duração (s)')),
+            ],
+            options={
+                'verbose_name': 'Execução do Resumo Diário',
+                'verbose_name_plural': 'Execuções do Resumo Diário',
+                'get_latest_by': 'id',
+            },
+        ),
+        migrations.AddField(
+            model_name='consulta',
+            name='atualizada_em',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='ResumoDiarioConsultas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('semana', models.DateField(verbose_name='Semana (segunda-feira)')),
+                ('minutos_ofertados', models.PositiveIntegerField(default=0, verbose_name='Minutos ofertados')),
+                ('minutos_reservados', models.PositiveIntegerField(default=0, verbose_name='Minutos reservados')),
+                ('consultas', models.PositiveIntegerField(default=0, verbose_name='Consultas marcadas')),
+                ('realizadas', models.PositiveIntegerField(default=0)),
+                ('faltas', models.PositiveIntegerField(default=0)),
+                ('canceladas_paciente', models.PositiveIntegerField(default=0)),
+                ('canceladas_psicologo', models.PositiveIntegerField(default=0)),
+                ('psicologo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios', to='app.psicologo', verbose_name='Psicólogo')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Consultas',
+                'verbose_name_plural': 'Resumos Diários de Consultas',
+                'indexes': [models.Index(fields=['data', 'semana'], name='resumo_diario_data')],
+                'constraints': [models.UniqueConstraint(fields=('psicologo', 'data'), name='resumo_diario_psicologo_data')],
+            },
+        ),
+    ]
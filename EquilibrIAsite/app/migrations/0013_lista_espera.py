@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_resumo_diario_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_inicio', models.DateField(verbose_name='A partir de')),
+                ('data_fim', models.DateField(verbose_name='Até')),
+                ('status', models.CharField(choices=[('aguardando', 'Aguardando'), ('ofertada', 'Horário oferecido'), ('atendida', 'Consulta agendada'), ('expirada', 'Oferta expirada'), ('cancelada', 'Cancelada')], default='aguardando', max_length=20)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('oferta_data', models.DateField(blank=True, null=True, verbose_name='Data oferecida')),
+                ('oferta_horario', models.TimeField(blank=True, null=True, verbose_name='Horário oferecido')),
+                ('ofertada_em', models.DateTimeField(blank=True, null=True)),
+                ('oferta_expira_em', models.DateTimeField(blank=True, null=True, verbose_name='Reserva válida até')),
+                ('atendida_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Lista de Espera',
+                'verbose_name_plural': 'Listas de Espera',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='consulta',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='consulta',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('cancelada_paciente', 'cancelada_psicologo')), _negated=True), fields=('psicologo', 'data', 'horario'), name='consulta_horario_ocupado'),
+        ),
+        migrations.AddField(
+            model_name='listaespera',
+            name='psicologo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lista_espera', to='app.psicologo', verbose_name='Psicólogo'),
+        ),
+        migrations.AddField(
+            model_name='listaespera',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listas_espera', to=settings.AUTH_USER_MODEL, verbose_name='Paciente'),
+        ),
+        migrations.AddIndex(
+            model_name='listaespera',
+            index=models.Index(condition=models.Q(('status', 'aguardando')), fields=['psicologo', 'data_inicio', 'data_fim', 'criada_em'], name='espera_fila'),
+        ),
+        migrations.AddIndex(
+            model_name='listaespera',
+            index=models.Index(condition=models.Q(('status', 'ofertada')), fields=['psicologo', 'oferta_data', 'oferta_horario'], name='espera_reservas'),
+        ),
+        migrations.AddIndex(
+            model_name='listaespera',
+            index=models.Index(condition=models.Q(('status', 'ofertada')), fields=['oferta_expira_em'], name='espera_reservas_expiracao'),
+        ),
+    ]
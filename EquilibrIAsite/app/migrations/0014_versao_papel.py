@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_lista_espera'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='versao_papel',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,9 +1,19 @@
-from django.db import models
+import datetime
+import hashlib
+
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Lower
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
+from .markdown_seguro import renderizar_markdown
+
 # ========== MODELO DE USUÁRIO PERSONALIZADO ==========
 class Usuario(AbstractUser):
     """
@@ -15,13 +25,32 @@ class Usuario(AbstractUser):
 
     # Campos adicionais podem ser adicionados aqui
 
+    # Muda quando o perfil de psicólogo do usuário é criado ou excluído;
+    # invalida o papel guardado nas sessões dele (app/papeis.py)
+    versao_papel = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         # Corrigido para usar self.get_full_name() que é um método do AbstractUser
         return self.get_full_name() or self.username
 
+    def save(self, *args, **kwargs):
+        # versao_papel só é alterada por UPDATE atômico (papeis.invalidar_perfil):
+        # o save() de uma instância lida antes não pode gravar a versão antiga
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'versao_papel'
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Usuário"
         verbose_name_plural = "Usuários"
+        indexes = [
+            # Login por nome de usuário ou e-mail sem diferenciar maiúsculas
+            models.Index(Lower('username'), name='usuario_username_lower'),
+            models.Index(Lower('email'), name='usuario_email_lower'),
+        ]
 
 
 # ========== MODELO DE PSICÓLOGO ==========
@@ -76,6 +105,7 @@ class Consulta(models.Model):
         ('cancelada_psicologo', 'Cancelada pelo psicólogo'),
         ('faltou', 'Paciente não compareceu'),
     ]
+    STATUS_CANCELADOS = ('cancelada_paciente', 'cancelada_psicologo')
 
     # Corrigido para usar 'Usuario' diretamente
     usuario = models.ForeignKey(
@@ -99,6 +129,15 @@ class Consulta(models.Model):
         verbose_name="Status"
     )
     criada_em = models.DateTimeField(auto_now_add=True)
+    # Marca d'água do resumo diário (app/utilizacao.py): update() em massa precisa preenchê-lo
+    atualizada_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        consulta = super().from_db(db, field_names, values)
+        # Status lido do banco: o sinal de cancelamento compara com o novo (lista de espera)
+        consulta._status_original = consulta.__dict__.get('status')
+        return consulta
 
     def __str__(self):
         return f"Consulta: {self.usuario} → {self.psicologo} em {self.data} às {self.horario}"
@@ -106,7 +145,18 @@ class Consulta(models.Model):
     class Meta:
         verbose_name = "Consulta"
         verbose_name_plural = "Consultas"
-        unique_together = ('psicologo', 'data', 'horario')  # Evita duplicatas no mesmo horário
+        constraints = [
+            # Evita duplicatas no mesmo horário; consultas canceladas liberam o horário
+            models.UniqueConstraint(
+                fields=['psicologo', 'data', 'horario'],
+                condition=~models.Q(status__in=('cancelada_paciente', 'cancelada_psicologo')),
+                name='consulta_horario_ocupado',
+            ),
+        ]
+        indexes = [
+            # Consultas vencidas ainda em aberto (comando atualizar_consultas)
+            models.Index(fields=['status', 'data'], name='consulta_status_data'),
+        ]
 
 
 # ========== MODELO DE HORÁRIO DISPONÍVEL ==========
@@ -202,12 +252,63 @@ class AutoavaliacaoEmocional(models.Model):
     class Meta:
         verbose_name = "Autoavaliação Emocional"
         verbose_name_plural = "Autoavaliações Emocionais"
+        indexes = [
+            models.Index(fields=['usuario', '-data'], name='autoavaliacao_usuario_data'),
+        ]
+
+
+# ========== MODELO DE RESPOSTA DA IA (deduplicada) ==========
+class RespostaIA(models.Model):
+    """
+    Texto de uma resposta da IA, armazenado uma única vez e endereçado
+    pelo hash SHA-256 do conteúdo. Quase todas as respostas são frases
+    fixas, então cada InteracaoIA guarda apenas a referência.
+    """
+    hash = models.CharField(max_length=64, unique=True, verbose_name="Hash SHA-256")
+    texto = models.TextField(verbose_name="Texto da resposta")
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    # Cache local (por processo) de hash -> id, para evitar consultas
+    # repetidas ao gravar as respostas fixas.
+    _ids_por_hash = {}
+    MAX_IDS_EM_CACHE = 1024
+
+    @staticmethod
+    def calcular_hash(texto):
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def obter_id(cls, texto):
+        """Devolve o id da resposta com este texto, criando-a se necessário."""
+        hash_texto = cls.calcular_hash(texto)
+        resposta_id = cls._ids_por_hash.get(hash_texto)
+        if resposta_id is None:
+            resposta, _ = cls.objects.get_or_create(hash=hash_texto, defaults={'texto': texto})
+            resposta_id = resposta.id
+            # Só guarda no cache depois do commit, para nunca apontar para uma linha desfeita
+            transaction.on_commit(lambda: cls._guardar_id(hash_texto, resposta_id))
+        return resposta_id
+
+    @classmethod
+    def _guardar_id(cls, hash_texto, resposta_id):
+        if len(cls._ids_por_hash) >= cls.MAX_IDS_EM_CACHE:
+            cls._ids_por_hash.clear()
+        cls._ids_por_hash[hash_texto] = resposta_id
+
+    def __str__(self):
+        return f"{self.texto[:60]}… ({self.hash[:8]})"
+
+    class Meta:
+        verbose_name = "Resposta da IA"
+        verbose_name_plural = "Respostas da IA"
 
 
 # ========== MODELO DE INTERAÇÃO COM IA ==========
 class InteracaoIA(models.Model):
     """
     Registra conversas entre o usuário e a IA (ex: chatbot de suporte emocional).
+    O texto da resposta fica em RespostaIA; use o atributo ``resposta_ia``
+    para ler ou definir o texto diretamente.
     """
     # Corrigido para usar 'Usuario' diretamente
     usuario = models.ForeignKey(
@@ -216,7 +317,12 @@ class InteracaoIA(models.Model):
         verbose_name="Paciente"
     )
     mensagem_usuario = models.TextField(verbose_name="Mensagem do usuário")
-    resposta_ia = models.TextField(verbose_name="Resposta da IA")
+    resposta = models.ForeignKey(
+        RespostaIA,
+        on_delete=models.PROTECT,
+        related_name='interacoes',
+        verbose_name="Resposta da IA"
+    )
     timestamp = models.DateTimeField(auto_now_add=True)
     autoavaliacao_relacionada = models.ForeignKey(
         AutoavaliacaoEmocional,
@@ -226,12 +332,35 @@ class InteracaoIA(models.Model):
         verbose_name="Autoavaliação associada"
     )
 
+    @property
+    def resposta_ia(self):
+        texto = getattr(self, '_resposta_texto', None)
+        if texto is not None:
+            return texto
+        return self.resposta.texto if self.resposta_id else ''
+
+    @resposta_ia.setter
+    def resposta_ia(self, texto):
+        # A RespostaIA correspondente é resolvida no save()
+        self._resposta_texto = texto
+
+    def save(self, *args, **kwargs):
+        texto = getattr(self, '_resposta_texto', None)
+        if texto is not None:
+            self.resposta_id = RespostaIA.obter_id(texto)
+            self._resposta_texto = None
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"IA ↔ {self.usuario} em {self.timestamp.strftime('%d/%m/%Y %H:%M')}"
 
     class Meta:
         verbose_name = "Interação com IA"
         verbose_name_plural = "Interações com IA"
+        indexes = [
+            # Últimos turnos de um usuário (contexto do chat)
+            models.Index(fields=['usuario', '-timestamp'], name='interacaoia_usuario_timestamp'),
+        ]
 
 
 # ========== MODELO DE NOTIFICAÇÃO ==========
@@ -243,6 +372,7 @@ class Notificacao(models.Model):
         ('consulta', 'Consulta'),
         ('sistema', 'Sistema'),
         ('ia', 'Interação com IA'),
+        ('avaliacao', 'Pedido de avaliação'),
     ]
 
     # Corrigido para usar 'Usuario' diretamente
@@ -282,9 +412,387 @@ class Avaliacao(models.Model):
     comentario = models.TextField(blank=True, null=True, verbose_name="Comentário")
     data_criacao = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        # A avaliação e o resumo do psicólogo são gravados na mesma transação
+        with transaction.atomic():
+            anterior = None
+            if self.pk:
+                anterior = (
+                    Avaliacao.objects
+                    .filter(pk=self.pk)
+                    .values_list('consulta__psicologo_id', 'nota')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+
+            psicologo_id = Consulta.objects.values_list('psicologo_id', flat=True).get(pk=self.consulta_id)
+            if anterior is None:
+                ResumoAvaliacoes.registrar(psicologo_id, total=1, soma=self.nota)
+            elif anterior == (psicologo_id, self.nota):
+                pass
+            else:
+                ResumoAvaliacoes.registrar(anterior[0], total=-1, soma=-anterior[1])
+                ResumoAvaliacoes.registrar(psicologo_id, total=1, soma=self.nota)
+
     def __str__(self):
         return f"Avaliação da consulta {self.consulta.id} – Nota: {self.nota}"
 
     class Meta:
         verbose_name = "Avaliação"
         verbose_name_plural = "Avaliações"
+
+
+# ========== MODELO DE RESUMO DAS AVALIAÇÕES ==========
+class ResumoAvaliacoes(models.Model):
+    """
+    Agregado das avaliações de um psicólogo, mantido a cada avaliação
+    criada, alterada ou excluída. Evita um JOIN + AVG por psicólogo ao
+    exibir o diretório e permite ordená-lo por um índice.
+
+    A média bayesiana puxa psicólogos com poucas avaliações para a média
+    a priori: (PESO * MEDIA + soma) / (PESO + total).
+    """
+    psicologo = models.OneToOneField(
+        Psicologo,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumo_avaliacoes',
+        verbose_name="Psicólogo"
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name="Número de avaliações")
+    soma = models.PositiveIntegerField(default=0, verbose_name="Soma das notas")
+    media_bayesiana = models.FloatField(default=0, verbose_name="Média bayesiana")
+
+    @staticmethod
+    def prior():
+        return (
+            getattr(settings, 'AVALIACAO_PRIOR_PESO', 5),
+            getattr(settings, 'AVALIACAO_PRIOR_MEDIA', 3.0),
+        )
+
+    @classmethod
+    def calcular_media(cls, total, soma):
+        peso, media = cls.prior()
+        return (peso * media + soma) / (peso + total)
+
+    @classmethod
+    def registrar(cls, psicologo_id, total, soma):
+        """
+        Soma (ou subtrai) avaliações do resumo num único UPDATE atômico:
+        os F() do lado direito usam os valores anteriores da linha, então
+        a média fica consistente mesmo com gravações concorrentes.
+        """
+        peso, media = cls.prior()
+        for _tentativa in range(2):
+            atualizadas = cls.objects.filter(psicologo_id=psicologo_id).update(
+                total=F('total') + total,
+                soma=F('soma') + soma,
+                media_bayesiana=(
+                    (Cast(F('soma') + soma, FloatField()) + peso * media)
+                    / (Cast(F('total') + total, FloatField()) + peso)
+                ),
+            )
+            # Sem linha para descontar (ex.: psicólogo sendo excluído em cascata), nada a fazer
+            if atualizadas or total <= 0:
+                return
+            # Psicólogo ainda sem resumo: cria a linha zerada e tenta de novo
+            cls.objects.bulk_create(
+                [cls(psicologo_id=psicologo_id, media_bayesiana=cls.calcular_media(0, 0))],
+                ignore_conflicts=True,
+            )
+
+    @classmethod
+    def reconstruir(cls, lote=1000):
+        """Recalcula todos os resumos a partir das avaliações (uma consulta agregada)."""
+        totais = {
+            linha['consulta__psicologo_id']: (linha['total'], linha['soma'])
+            for linha in (
+                Avaliacao.objects
+                .order_by()
+                .values('consulta__psicologo_id')
+                .annotate(total=models.Count('id'), soma=models.Sum('nota'))
+            )
+        }
+        psicologo_ids = list(Psicologo.objects.order_by('id').values_list('id', flat=True))
+        for inicio in range(0, len(psicologo_ids), lote):
+            resumos = []
+            for psicologo_id in psicologo_ids[inicio:inicio + lote]:
+                total, soma = totais.get(psicologo_id, (0, 0))
+                resumos.append(cls(
+                    psicologo_id=psicologo_id,
+                    total=total,
+                    soma=soma,
+                    media_bayesiana=cls.calcular_media(total, soma),
+                ))
+            cls.objects.bulk_create(
+                resumos,
+                update_conflicts=True,
+                unique_fields=['psicologo'],
+                update_fields=['total', 'soma', 'media_bayesiana'],
+            )
+        return len(psicologo_ids)
+
+    @property
+    def media(self):
+        return self.soma / self.total if self.total else None
+
+    def __str__(self):
+        return f"{self.psicologo.nome}: {self.media_bayesiana:.2f} ({self.total} avaliações)"
+
+    class Meta:
+        verbose_name = "Resumo de Avaliações"
+        verbose_name_plural = "Resumos de Avaliações"
+        indexes = [
+            # Diretório ordenado por avaliação
+            models.Index(fields=['-media_bayesiana', 'psicologo'], name='resumo_media_bayesiana'),
+        ]
+
+
+# ========== MODELO DE MENSAGEM DE CONTATO (caixa de saída) ==========
+class MensagemContato(models.Model):
+    """
+    Mensagem enviada pelo formulário de contato. A view só grava a mensagem;
+    o envio por e-mail fica a cargo do comando enviar_contatos, com novas
+    tentativas em caso de falha do servidor de e-mail.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('enviada', 'Enviada'),
+        ('falhou', 'Falhou'),
+    ]
+
+    nome = models.CharField(max_length=150, verbose_name="Nome")
+    email = models.EmailField(verbose_name="E-mail")
+    telefone = models.CharField(max_length=30, blank=True, verbose_name="Telefone")
+    assunto = models.CharField(max_length=100, verbose_name="Assunto")
+    mensagem = models.TextField(verbose_name="Mensagem")
+    aceito_newsletter = models.BooleanField(default=False, verbose_name="Aceita receber a newsletter")
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    enviada_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.assunto} - {self.nome} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Mensagem de Contato"
+        verbose_name_plural = "Mensagens de Contato"
+        ordering = ['-criada_em']
+        indexes = [
+            # Fila do comando enviar_contatos
+            models.Index(fields=['status', 'proxima_tentativa'], name='contato_fila_envio'),
+        ]
+
+
+# ========== MODELO DE INSCRITO NA NEWSLETTER ==========
+class InscritoNewsletter(models.Model):
+    """
+    E-mails que aceitaram receber a newsletter (ex.: pelo formulário de contato).
+    """
+    email = models.EmailField(unique=True, verbose_name="E-mail")
+    nome = models.CharField(max_length=150, blank=True, verbose_name="Nome")
+    inscrito_em = models.DateTimeField(auto_now_add=True)
+    ativo = models.BooleanField(default=True, verbose_name="Ativo")
+
+    def __str__(self):
+        return self.email
+
+    class Meta:
+        verbose_name = "Inscrito na Newsletter"
+        verbose_name_plural = "Inscritos na Newsletter"
+
+
+# ========== MODELO DE ARTIGO DO BLOG ==========
+class Artigo(models.Model):
+    """
+    Artigo do blog escrito em Markdown. O HTML (já sanitizado) é gerado uma
+    única vez ao salvar e guardado em corpo_html: exibir o artigo não exige
+    nenhuma conversão.
+    """
+    titulo = models.CharField(max_length=200, verbose_name="Título")
+    slug = models.SlugField(max_length=200, unique=True, blank=True)
+    autor = models.CharField(max_length=150, verbose_name="Autor(a)", help_text="Ex: Dra. Ana Carolina Silva")
+    categoria = models.CharField(max_length=50, verbose_name="Categoria")
+    resumo = models.TextField(max_length=500, verbose_name="Resumo")
+    corpo_markdown = models.TextField(verbose_name="Texto (Markdown)")
+    corpo_html = models.TextField(editable=False)
+    tempo_leitura = models.PositiveIntegerField(default=1, editable=False, verbose_name="Minutos de leitura")
+    publicado = models.BooleanField(default=False, verbose_name="Publicado")
+    publicado_em = models.DateTimeField(null=True, blank=True, verbose_name="Publicado em")
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    PALAVRAS_POR_MINUTO = 200
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        artigo = super().from_db(db, field_names, values)
+        # Slug lido do banco: se mudar, o cache do endereço antigo também é descartado
+        artigo._slug_original = artigo.__dict__.get('slug')
+        return artigo
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.titulo)[:200]
+        self.corpo_html = renderizar_markdown(self.corpo_markdown)
+        self.tempo_leitura = max(1, round(len(self.corpo_markdown.split()) / self.PALAVRAS_POR_MINUTO))
+        if self.publicado and self.publicado_em is None:
+            self.publicado_em = timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {
+                *kwargs['update_fields'], 'slug', 'corpo_html', 'tempo_leitura', 'publicado_em', 'atualizado_em',
+            }
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse('artigo', args=[self.slug])
+
+    def __str__(self):
+        return self.titulo
+
+    class Meta:
+        verbose_name = "Artigo"
+        verbose_name_plural = "Artigos"
+        ordering = ['-publicado_em', '-id']
+        indexes = [
+            # Listagem do blog (paginação por chave) e feed
+            models.Index(
+                fields=['-publicado_em', '-id'],
+                condition=models.Q(publicado=True),
+                name='artigo_publicados',
+            ),
+        ]
+
+
+# ========== MODELO DE RESUMO DIÁRIO DAS CONSULTAS ==========
+class ResumoDiarioConsultas(models.Model):
+    """
+    Consultas de um psicólogo em um dia, agregadas por status, e os minutos
+    que ele ofereceu nesse dia (HorarioDisponivel do dia da semana, congelado
+    quando o dia chega). Preenchido de forma incremental pelo comando
+    atualizar_resumos_consultas; os relatórios de utilização leem só daqui.
+    """
+    psicologo = models.ForeignKey(
+        Psicologo,
+        on_delete=models.CASCADE,
+        related_name='resumos_diarios',
+        verbose_name="Psicólogo"
+    )
+    data = models.DateField(verbose_name="Data")
+    semana = models.DateField(verbose_name="Semana (segunda-feira)")
+    minutos_ofertados = models.PositiveIntegerField(default=0, verbose_name="Minutos ofertados")
+    minutos_reservados = models.PositiveIntegerField(default=0, verbose_name="Minutos reservados")
+    consultas = models.PositiveIntegerField(default=0, verbose_name="Consultas marcadas")
+    realizadas = models.PositiveIntegerField(default=0)
+    faltas = models.PositiveIntegerField(default=0)
+    canceladas_paciente = models.PositiveIntegerField(default=0)
+    canceladas_psicologo = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.psicologo_id} em {self.data}: {self.consultas} consultas"
+
+    @staticmethod
+    def semana_de(data):
+        return data - datetime.timedelta(days=data.weekday())
+
+    class Meta:
+        verbose_name = "Resumo Diário de Consultas"
+        verbose_name_plural = "Resumos Diários de Consultas"
+        constraints = [
+            models.UniqueConstraint(fields=['psicologo', 'data'], name='resumo_diario_psicologo_data'),
+        ]
+        indexes = [
+            # Relatórios por período (todos os psicólogos), agrupados por semana
+            models.Index(fields=['data', 'semana'], name='resumo_diario_data'),
+        ]
+
+
+# ========== MODELO DE EXECUÇÃO DO RESUMO DIÁRIO ==========
+class ExecucaoRollup(models.Model):
+    """
+    Registro de cada execução do resumo diário. A última indica até onde as
+    consultas alteradas já foram agregadas e até que dia as ofertas de
+    horários já foram congeladas.
+    """
+    iniciada_em = models.DateTimeField(auto_now_add=True)
+    marca = models.DateTimeField(verbose_name="Consultas alteradas até")
+    ofertas_ate = models.DateField(verbose_name="Ofertas congeladas até")
+    pares_recalculados = models.PositiveIntegerField(default=0)
+    dias_ofertados = models.PositiveIntegerField(default=0)
+    duracao = models.FloatField(default=0, verbose_name="Duração (s)")
+
+    def __str__(self):
+        return f"Resumo até {self.marca:%d/%m/%Y %H:%M}"
+
+    class Meta:
+        verbose_name = "Execução do Resumo Diário"
+        verbose_name_plural = "Execuções do Resumo Diário"
+        get_latest_by = 'id'
+
+
+# ========== MODELO DE LISTA DE ESPERA ==========
+class ListaEspera(models.Model):
+    """
+    Paciente aguardando um horário com um psicólogo dentro de uma janela de
+    datas. Quando uma consulta da janela é cancelada, o primeiro da fila
+    recebe o horário reservado por alguns minutos (oferta_*) e uma
+    notificação; ver app/lista_espera.py.
+    """
+    STATUS_CHOICES = [
+        ('aguardando', 'Aguardando'),
+        ('ofertada', 'Horário oferecido'),
+        ('atendida', 'Consulta agendada'),
+        ('expirada', 'Oferta expirada'),
+        ('cancelada', 'Cancelada'),
+    ]
+
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='listas_espera',
+        verbose_name="Paciente"
+    )
+    psicologo = models.ForeignKey(
+        Psicologo,
+        on_delete=models.CASCADE,
+        related_name='lista_espera',
+        verbose_name="Psicólogo"
+    )
+    data_inicio = models.DateField(verbose_name="A partir de")
+    data_fim = models.DateField(verbose_name="Até")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='aguardando')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    oferta_data = models.DateField(null=True, blank=True, verbose_name="Data oferecida")
+    oferta_horario = models.TimeField(null=True, blank=True, verbose_name="Horário oferecido")
+    ofertada_em = models.DateTimeField(null=True, blank=True)
+    oferta_expira_em = models.DateTimeField(null=True, blank=True, verbose_name="Reserva válida até")
+    atendida_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.usuario} aguardando {self.psicologo} ({self.data_inicio} a {self.data_fim})"
+
+    class Meta:
+        verbose_name = "Lista de Espera"
+        verbose_name_plural = "Listas de Espera"
+        indexes = [
+            # Primeiro da fila de um psicólogo cuja janela contém a data liberada
+            models.Index(
+                fields=['psicologo', 'data_inicio', 'data_fim', 'criada_em'],
+                condition=models.Q(status='aguardando'),
+                name='espera_fila',
+            ),
+            # Reservas ativas de um horário (agendamento) e reservas a expirar
+            models.Index(
+                fields=['psicologo', 'oferta_data', 'oferta_horario'],
+                condition=models.Q(status='ofertada'),
+                name='espera_reservas',
+            ),
+            models.Index(
+                fields=['oferta_expira_em'],
+                condition=models.Q(status='ofertada'),
+                name='espera_reservas_expiracao',
+            ),
+        ]
@@ -0,0 +1,66 @@
+"""
+Papel do usuário logado (paciente ou psicólogo) e seu perfil de Psicologo.
+
+PerfilMiddleware expõe request.perfil, resolvido sob demanda e no máximo
+uma vez por requisição. O papel resolvido (o id do Psicologo, ou None) fica
+na sessão junto com Usuario.versao_papel, de modo que nas requisições
+seguintes a verificação não consulta o banco: o usuário já é lido pela
+autenticação. Os sinais de Psicologo incrementam a versão ao salvar ou
+excluir o perfil, o que invalida o papel em todas as sessões do usuário,
+em qualquer processo.
+"""
+from functools import cached_property, wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db.models import F
+from django.shortcuts import redirect
+
+from .models import Psicologo, Usuario
+
+CHAVE_SESSAO = '_papel'
+
+
+class PerfilUsuario:
+    def __init__(self, psicologo_id=None):
+        self.psicologo_id = psicologo_id
+
+    @property
+    def eh_psicologo(self):
+        return self.psicologo_id is not None
+
+    @cached_property
+    def psicologo(self):
+        # Só as views de psicólogo precisam da instância
+        if self.psicologo_id is None:
+            return None
+        return Psicologo.objects.filter(pk=self.psicologo_id).first()
+
+
+def resolver_perfil(usuario, sessao=None):
+    if not usuario.is_authenticated:
+        return PerfilUsuario()
+    if sessao is not None:
+        guardado = sessao.get(CHAVE_SESSAO)
+        if guardado and guardado[0] == usuario.versao_papel:
+            return PerfilUsuario(guardado[1])
+    psicologo_id = Psicologo.objects.filter(usuario_id=usuario.pk).values_list('id', flat=True).first()
+    if sessao is not None:
+        sessao[CHAVE_SESSAO] = [usuario.versao_papel, psicologo_id]
+    return PerfilUsuario(psicologo_id)
+
+
+def invalidar_perfil(usuario_id):
+    # Na mesma transação da alteração do perfil: quem ler a versão nova lê o perfil novo
+    Usuario.objects.filter(pk=usuario_id).update(versao_papel=F('versao_papel') + 1)
+
+
+def psicologo_requerido(view_func):
+    """Restringe a view a psicólogos; o perfil fica em request.perfil.psicologo."""
+    @wraps(view_func)
+    def _view(request, *args, **kwargs):
+        if not request.perfil.eh_psicologo:
+            messages.error(request, 'Acesso negado. Você não está cadastrado como psicólogo.')
+            return redirect('home')
+        return view_func(request, *args, **kwargs)
+    return login_required(_view)
@@ -0,0 +1,383 @@
+"""
+Recomendação de psicólogos a partir da autoavaliação emocional e do tema do chat.
+
+Cada processo mantém uma matriz de características dos psicólogos, com uma
+linha por psicólogo e as colunas:
+
+- especialidades em codificação one-hot (uma coluna por especialidade),
+  com a linha normalizada;
+- horas livres na semana (horários disponíveis menos consultas marcadas
+  nos próximos 7 dias), normalizadas;
+- nota (média bayesiana de ResumoAvaliacoes), normalizada.
+
+Pontuar todos os candidatos é um único produto matriz-vetor, e os k melhores
+saem de np.argpartition, sem ordenar a lista inteira.
+
+Alterações de perfis, horários, consultas e avaliações entram num log de
+versões no cache (ver marcar_alterado). Antes de recomendar, cada processo
+relê do banco só as linhas alteradas desde a última versão que viu. O top-k
+de cada usuário fica em cache, com a versão na chave.
+
+Num cache local (LocMem, o padrão sem REDIS_URL; ver app/caches.py), o log
+só registra as alterações feitas no próprio processo: a matriz é então
+reconstruída quando fica mais velha que RECOMENDACAO_TTL_LOCAL, e o top-k
+também não dura mais que isso.
+
+O NumPy é opcional: sem ele, disponivel() é False e as recomendações são omitidas.
+"""
+import datetime
+import hashlib
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sem ele não há recomendações
+    np = None
+
+from .caches import compartilhado
+from .contexto import acarregar_contexto
+from .ia import detectar_tema
+from .models import Consulta, HorarioDisponivel, Psicologo, ResumoAvaliacoes
+
+# Necessidade do usuário -> trechos de especialidade que a atendem
+NECESSIDADES = {
+    'ansiedade': ['ansiedade', 'pânico', 'fobia'],
+    'estresse': ['estresse', 'burnout'],
+    'tristeza': ['depressão', 'luto', 'autoestima'],
+}
+
+# Temas do chat que anexam recomendações à resposta
+TEMAS_COM_RECOMENDACAO = ('ansiedade', 'estresse')
+
+STATUS_OCUPADOS = ('agendada', 'confirmada')
+
+PESO_HORAS = 0.3
+PESO_NOTA = 0.5
+HORAS_REFERENCIA = 20.0  # horas livres na semana que já valem o peso cheio
+
+CHAVE_VERSAO = 'recomendacao:versao'
+# Acima disso, é mais barato reconstruir a matriz do que reler linha a linha
+LIMITE_ALTERACOES = 500
+
+
+def disponivel():
+    return np is not None
+
+
+def _alias():
+    return getattr(settings, 'RECOMENDACAO_CACHE', 'default')
+
+
+def _cache():
+    return caches[_alias()]
+
+
+def _ttl():
+    return getattr(settings, 'RECOMENDACAO_CACHE_TTL', 10 * 60)
+
+
+def _idade_maxima():
+    """Idade máxima da matriz e do top-k; None se o log de versões é compartilhado."""
+    if compartilhado(_alias()):
+        return None
+    return getattr(settings, 'RECOMENDACAO_TTL_LOCAL', 60)
+
+
+def _chave_alteracao(versao):
+    return f'recomendacao:alteracao:{versao}'
+
+
+def separar_especialidades(texto):
+    return [especialidade.strip().lower() for especialidade in texto.split(',') if especialidade.strip()]
+
+
+# --- Log de alterações (compartilhado entre processos pelo cache) ---
+
+def versao_atual(cache=None):
+    cache = cache or _cache()
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        # Se a chave for despejada, recomeça num valor maior que qualquer
+        # versão anterior: o salto faz os processos reconstruírem a matriz.
+        cache.add(CHAVE_VERSAO, time.time_ns() // 1000, None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def marcar_alterado(psicologo_id):
+    """Registra que a linha do psicólogo precisa ser relida do banco."""
+    cache = _cache()
+    versao_atual(cache)
+    try:
+        versao = cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        versao = versao_atual(cache)
+    cache.set(_chave_alteracao(versao), psicologo_id, _ttl())
+
+
+def marcar_tudo_alterado():
+    """Para cargas em massa (bulk_create, reconstruções), que não disparam sinais."""
+    _cache().delete(CHAVE_VERSAO)
+
+
+# --- Leitura das características no banco ---
+
+def _horas(inicio, fim):
+    dia = datetime.date.min
+    segundos = (datetime.datetime.combine(dia, fim) - datetime.datetime.combine(dia, inicio)).total_seconds()
+    return max(segundos, 0) / 3600
+
+
+def carregar_caracteristicas(ids=None):
+    """{psicologo_id: (nome, especialidades, horas_livres, nota)}, de todos ou só dos ids."""
+    psicologos = Psicologo.objects.order_by('id').values_list('id', 'nome', 'especialidades')
+    horarios = HorarioDisponivel.objects.values_list('psicologo_id', 'hora_inicio', 'hora_fim')
+    hoje = timezone.localdate()
+    ocupadas = (
+        Consulta.objects
+        .filter(status__in=STATUS_OCUPADOS, data__gte=hoje, data__lt=hoje + datetime.timedelta(days=7))
+        .order_by()
+        .values('psicologo_id')
+        .annotate(total=Count('id'))
+        .values_list('psicologo_id', 'total')
+    )
+    notas = ResumoAvaliacoes.objects.values_list('psicologo_id', 'media_bayesiana')
+    if ids is not None:
+        psicologos = psicologos.filter(id__in=ids)
+        horarios = horarios.filter(psicologo_id__in=ids)
+        ocupadas = ocupadas.filter(psicologo_id__in=ids)
+        notas = notas.filter(psicologo_id__in=ids)
+
+    horas = {}
+    for psicologo_id, inicio, fim in horarios:
+        horas[psicologo_id] = horas.get(psicologo_id, 0) + _horas(inicio, fim)
+    duracao = getattr(settings, 'CONSULTA_DURACAO_MINUTOS', 60) / 60
+    for psicologo_id, total in ocupadas:
+        horas[psicologo_id] = horas.get(psicologo_id, 0) - total * duracao
+    notas = dict(notas)
+    _, media_prior = ResumoAvaliacoes.prior()
+
+    return {
+        psicologo_id: (
+            nome,
+            especialidades,
+            max(horas.get(psicologo_id, 0), 0),
+            notas.get(psicologo_id, media_prior),
+        )
+        for psicologo_id, nome, especialidades in psicologos
+    }
+
+
+# --- Matriz de características ---
+
+class MatrizPsicologos:
+    """
+    Matriz (psicólogos x características) em float32. As duas últimas colunas
+    são horas livres e nota; as demais, uma por especialidade. Linhas de
+    psicólogos excluídos ficam inativas até a próxima reconstrução completa.
+    """
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.versao = None
+        self.dia = None
+        self.construida_em = None  # time.monotonic() da última reconstrução
+        self.colunas = {}        # especialidade -> coluna
+        self.linhas = {}         # psicologo_id -> linha
+        self.ids = []
+        self.dados = []          # (nome, especialidades, horas_livres, nota) por linha
+        self.matriz = np.zeros((0, 2), dtype=np.float32)
+        self.elegiveis = np.zeros(0, dtype=bool)
+        self.colunas_por_necessidade = {}
+
+    def _coluna(self, especialidade):
+        coluna = self.colunas.get(especialidade)
+        if coluna is None:
+            coluna = self.colunas[especialidade] = len(self.colunas)
+            self.matriz = np.insert(self.matriz, coluna, 0, axis=1)
+            self.colunas_por_necessidade = {
+                necessidade: np.array(
+                    [c for nome, c in self.colunas.items() if any(t in nome for t in trechos)],
+                    dtype=np.intp,
+                )
+                for necessidade, trechos in NECESSIDADES.items()
+            }
+        return coluna
+
+    def _preencher(self, linha, dados):
+        nome, especialidades, horas, nota = dados
+        colunas = [self._coluna(e) for e in separar_especialidades(especialidades)]
+        self.matriz[linha, :] = 0
+        # Normalizada: listar muitas especialidades não aumenta a pontuação
+        self.matriz[linha, colunas] = 1 / np.sqrt(len(colunas)) if colunas else 0
+        self.matriz[linha, -2] = min(horas, HORAS_REFERENCIA) / HORAS_REFERENCIA
+        self.matriz[linha, -1] = (nota - 1) / 4
+        self.elegiveis[linha] = horas > 0
+        self.dados[linha] = dados
+
+    def reconstruir(self, versao):
+        caracteristicas = carregar_caracteristicas()
+        self.colunas, self.colunas_por_necessidade = {}, {}
+        self.ids = list(caracteristicas)
+        self.linhas = {psicologo_id: linha for linha, psicologo_id in enumerate(self.ids)}
+        self.dados = [None] * len(self.ids)
+        self.matriz = np.zeros((len(self.ids), 2), dtype=np.float32)
+        self.elegiveis = np.zeros(len(self.ids), dtype=bool)
+        for linha, psicologo_id in enumerate(self.ids):
+            self._preencher(linha, caracteristicas[psicologo_id])
+        self.versao, self.dia = versao, timezone.localdate()
+        self.construida_em = time.monotonic()
+
+    def atualizar_linhas(self, ids, versao):
+        caracteristicas = carregar_caracteristicas(ids)
+        novos = [psicologo_id for psicologo_id in caracteristicas if psicologo_id not in self.linhas]
+        if novos:
+            self.matriz = np.vstack([self.matriz, np.zeros((len(novos), self.matriz.shape[1]), dtype=np.float32)])
+            self.elegiveis = np.concatenate([self.elegiveis, np.zeros(len(novos), dtype=bool)])
+            for psicologo_id in novos:
+                self.linhas[psicologo_id] = len(self.ids)
+                self.ids.append(psicologo_id)
+                self.dados.append(None)
+        for psicologo_id in ids:
+            linha = self.linhas.get(psicologo_id)
+            if linha is None:
+                continue
+            if psicologo_id in caracteristicas:
+                self._preencher(linha, caracteristicas[psicologo_id])
+            else:  # excluído
+                self.elegiveis[linha] = False
+                del self.linhas[psicologo_id]
+        self.versao = versao
+
+    def sincronizar(self, versao, cache=None, idade_maxima=None):
+        """
+        Relê as linhas alteradas desde self.versao (ou tudo, se necessário).
+        Com idade_maxima (segundos), reconstrói também a matriz mais velha que isso.
+        """
+        vencida = idade_maxima is not None and (
+            self.construida_em is None or time.monotonic() - self.construida_em > idade_maxima
+        )
+        if vencida:
+            self.reconstruir(versao)
+            return
+        if self.versao == versao and self.dia == timezone.localdate():
+            return
+        if self.versao is None or self.dia != timezone.localdate() or not 0 < versao - self.versao <= LIMITE_ALTERACOES:
+            self.reconstruir(versao)
+            return
+        alteracoes = (cache or _cache()).get_many([_chave_alteracao(v) for v in range(self.versao + 1, versao + 1)])
+        if len(alteracoes) < versao - self.versao:  # entradas expiradas ou despejadas
+            self.reconstruir(versao)
+        else:
+            self.atualizar_linhas(set(alteracoes.values()), versao)
+
+    def vetor(self, intensidades):
+        """Vetor de pesos do usuário, na mesma ordem das colunas da matriz."""
+        pesos = np.zeros(self.matriz.shape[1], dtype=np.float32)
+        for necessidade, intensidade in intensidades.items():
+            colunas = self.colunas_por_necessidade.get(necessidade)
+            if colunas is not None and len(colunas):
+                pesos[colunas] = np.maximum(pesos[colunas], intensidade)
+        pesos[-2] = PESO_HORAS
+        pesos[-1] = PESO_NOTA
+        return pesos
+
+    def melhores(self, intensidades, k):
+        pontuacoes = self.matriz @ self.vetor(intensidades)
+        pontuacoes[~self.elegiveis] = -np.inf
+        if k < len(pontuacoes):
+            candidatas = np.argpartition(-pontuacoes, k)[:k]
+        else:
+            candidatas = np.arange(len(pontuacoes))
+        candidatas = candidatas[np.argsort(-pontuacoes[candidatas], kind='stable')]
+        return [
+            (self.ids[linha], float(pontuacoes[linha]))
+            for linha in candidatas
+            if np.isfinite(pontuacoes[linha])
+        ]
+
+
+_matriz = None
+_trava_matriz = threading.Lock()
+
+
+def matriz():
+    global _matriz
+    with _trava_matriz:
+        if _matriz is None:
+            _matriz = MatrizPsicologos()
+    return _matriz
+
+
+# --- Recomendação ---
+
+def intensidades_do_usuario(autoavaliacao, tema=None):
+    """Intensidade (0 a 1) de cada necessidade, pela autoavaliação e pelo tema do chat."""
+    intensidades = {}
+    if autoavaliacao:
+        intensidades['ansiedade'] = (autoavaliacao['ansiedade'] - 1) / 9
+        intensidades['estresse'] = (autoavaliacao['estresse'] - 1) / 9
+        intensidades['tristeza'] = (10 - autoavaliacao['humor']) / 9
+    if tema in NECESSIDADES:
+        intensidades[tema] = 1.0
+    return intensidades
+
+
+def recomendar(usuario_id, autoavaliacao, tema=None, k=None):
+    """
+    Os k psicólogos mais indicados para o usuário:
+    [{'id', 'nome', 'especialidades', 'horas_livres', 'nota', 'pontuacao'}, ...].
+    """
+    if not disponivel():
+        return []
+    k = k or getattr(settings, 'RECOMENDACAO_TOP_K', 5)
+    intensidades = intensidades_do_usuario(autoavaliacao, tema)
+    cache = _cache()
+    versao = versao_atual(cache)
+    assinatura = hashlib.sha256(
+        json.dumps([k, sorted((n, round(i, 2)) for n, i in intensidades.items())]).encode()
+    ).hexdigest()[:16]
+    chave = f'recomendacao:top:{usuario_id}:{timezone.localdate().isoformat()}:{versao}:{assinatura}'
+    recomendacoes = cache.get(chave)
+    if recomendacoes is not None:
+        return recomendacoes
+
+    idade_maxima = _idade_maxima()
+    atual = matriz()
+    with atual.trava:
+        atual.sincronizar(versao, cache, idade_maxima)
+        melhores = atual.melhores(intensidades, k)
+        recomendacoes = []
+        for psicologo_id, pontuacao in melhores:
+            nome, especialidades, horas, nota = atual.dados[atual.linhas[psicologo_id]]
+            recomendacoes.append({
+                'id': psicologo_id,
+                'nome': nome,
+                'especialidades': especialidades,
+                'horas_livres': round(horas, 1),
+                'nota': round(nota, 2),
+                'pontuacao': round(pontuacao, 4),
+            })
+    cache.set(chave, recomendacoes, _ttl() if idade_maxima is None else min(_ttl(), idade_maxima))
+    return recomendacoes
+
+
+async def arecomendar_no_chat(usuario, mensagem, contexto=None):
+    """
+    Recomendações para anexar à resposta do chat quando o tema pede; senão [].
+    ``contexto`` é o já carregado para responder à mensagem, se houver.
+    """
+    tema = detectar_tema(mensagem)
+    if not disponivel() or not usuario.is_authenticated or tema not in TEMAS_COM_RECOMENDACAO:
+        return []
+    if contexto is None:
+        contexto = await acarregar_contexto(usuario.id)
+    return await sync_to_async(recomendar)(usuario.id, contexto['autoavaliacao'], tema)
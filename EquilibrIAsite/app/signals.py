@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .blog import invalidar_blog
+from .contexto import descartar_contexto
+from .lista_espera import oferecer_horario
+from .papeis import invalidar_perfil
+from .models import Artigo, AutoavaliacaoEmocional, Avaliacao, Consulta, HorarioDisponivel, Psicologo, ResumoAvaliacoes
+from .recomendacao import marcar_alterado
+
+
+# --- Contexto de conversa do chat ---
+
+@receiver([post_save, post_delete], sender=AutoavaliacaoEmocional)
+def autoavaliacao_alterada(sender, instance, **kwargs):
+    # O contexto em cache traz o resumo da autoavaliação mais recente.
+    # Descarta de novo após o commit: um processo pode reler o banco antes dele
+    descartar_contexto(instance.usuario_id)
+    transaction.on_commit(lambda: descartar_contexto(instance.usuario_id))
+
+
+# --- Papel do usuário (request.perfil) ---
+
+@receiver([post_save, post_delete], sender=Psicologo)
+def perfil_psicologo_alterado(sender, instance, **kwargs):
+    invalidar_perfil(instance.usuario_id)
+
+
+# --- Resumo das avaliações dos psicólogos ---
+
+@receiver(post_save, sender=Psicologo)
+def psicologo_salvo(sender, instance, created, **kwargs):
+    # Todo psicólogo tem um resumo, para aparecer no diretório ordenado por avaliação
+    if created:
+        ResumoAvaliacoes.objects.get_or_create(
+            psicologo=instance,
+            defaults={'media_bayesiana': ResumoAvaliacoes.calcular_media(0, 0)},
+        )
+
+
+@receiver(post_delete, sender=Avaliacao)
+def avaliacao_excluida(sender, instance, **kwargs):
+    # Também cobre exclusões em cascata (ex.: consulta excluída)
+    psicologo_id = (
+        Consulta.objects.filter(pk=instance.consulta_id).values_list('psicologo_id', flat=True).first()
+    )
+    if psicologo_id is not None:
+        ResumoAvaliacoes.registrar(psicologo_id, total=-1, soma=-instance.nota)
+        _marcar_psicologo(psicologo_id)
+
+
+# --- Matriz de recomendação de psicólogos ---
+
+def _marcar_psicologo(psicologo_id):
+    # Só depois do commit: outro processo que relesse a linha antes veria o valor antigo
+    transaction.on_commit(lambda: marcar_alterado(psicologo_id))
+
+
+@receiver([post_save, post_delete], sender=Psicologo)
+def psicologo_alterado(sender, instance, **kwargs):
+    _marcar_psicologo(instance.id)
+
+
+@receiver([post_save, post_delete], sender=HorarioDisponivel)
+@receiver([post_save, post_delete], sender=Consulta)
+def agenda_alterada(sender, instance, **kwargs):
+    # Horários e consultas marcadas mudam as horas livres do psicólogo
+    _marcar_psicologo(instance.psicologo_id)
+
+
+@receiver(post_save, sender=Avaliacao)
+def avaliacao_salva(sender, instance, **kwargs):
+    psicologo_id = (
+        Consulta.objects.filter(pk=instance.consulta_id).values_list('psicologo_id', flat=True).first()
+    )
+    if psicologo_id is not None:
+        _marcar_psicologo(psicologo_id)
+
+
+# --- Blog ---
+
+@receiver([post_save, post_delete], sender=Artigo)
+def artigo_alterado(sender, instance, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_slug_original', None)} - {None}
+
+    def invalidar():
+        for slug in slugs:
+            invalidar_blog(slug)
+    transaction.on_commit(invalidar)
+
+
+# --- Lista de espera ---
+
+@receiver(post_save, sender=Consulta)
+def consulta_cancelada(sender, instance, created, **kwargs):
+    status_original = getattr(instance, '_status_original', None)
+    instance._status_original = instance.status
+    if created or status_original in Consulta.STATUS_CANCELADOS or instance.status not in Consulta.STATUS_CANCELADOS:
+        return
+    # O horário liberado vai para o primeiro da fila, depois que o cancelamento estiver gravado
+    transaction.on_commit(
+        lambda: oferecer_horario(
+            instance.psicologo_id, instance.data, instance.horario, exceto_usuario_id=instance.usuario_id,
+        ),
+        robust=True,
+    )
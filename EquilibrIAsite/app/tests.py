@@ -1,3 +1,1450 @@
-from django.test import TestCase
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import shutil
+import smtplib
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import aquecimento, hashers, ia, recomendacao
+from .backends import UsuarioOuEmailBackend
+from .blog import listar_artigos, obter_artigo, publicados
+from .caixa_saida import enviar_lote, espera_para, reservar_lote
+from .ciclo_consultas import atualizar_consultas, registrar_faltas
+from .contexto import acarregar_contexto, aregistrar_turno, carregar_contexto, registrar_turno
+from .db_router import (
+    COOKIE_FIXACAO, ReplicaRouter, encerrar_requisicao, fixar_no_primario, iniciar_requisicao,
+)
+from .exportacao import COLUNAS_CSV, gerar_exportacao
+from .forms import ListaEsperaForm, RegistroForm
+from .hashers import verificar_senha
+from .ia import RESPOSTA_ANSIEDADE, RESPOSTA_ESTRESSE, RESPOSTA_TRISTEZA
+from .lista_espera import expirar_reservas, metricas, oferecer_horario
+from .markdown_seguro import renderizar_markdown
+from .middleware import ReplicaMiddleware
+from .models import (
+    Artigo, AutoavaliacaoEmocional, Avaliacao, Consulta, HorarioDisponivel, InscritoNewsletter, InteracaoIA,
+    ListaEspera, MensagemContato, Notificacao, Psicologo, RespostaIA, ResumoAvaliacoes, ResumoDiarioConsultas,
+    Usuario,
+)
+from .papeis import resolver_perfil
+from .throttling import cliente_por_ip, consumir_ficha, interpretar_taxa
+from .utilizacao import atualizar_resumos, relatorio_semanal
+from .websocket import CAMINHO, rotear_websockets
+
+
+def criar_usuario(username, **campos):
+    campos.setdefault('email', f'{username}@example.com')
+    return Usuario.objects.create_user(username=username, password='senha-de-teste-123', **campos)
+
+
+def criar_psicologo(username, numero=1, **campos):
+    usuario = criar_usuario(username)
+    return Psicologo.objects.create(usuario=usuario, nome=f'Dra. {username}', crp=f'06/{numero:06d}', **campos)
+
+
+def criar_consulta(usuario, psicologo, dias=1, hora=10, **campos):
+    data = datetime.date.today() + datetime.timedelta(days=dias)
+    return Consulta.objects.create(usuario=usuario, psicologo=psicologo, data=data, horario=datetime.time(hora), **campos)
+
+
+class LimparCachesMixin:
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+
+
+class CacheCompartilhadoMixin:
+    """Troca os caches locais por caches em arquivo, que app/caches.py considera compartilhados."""
+
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        caches_em_arquivo = {
+            alias: {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': f'{diretorio}/{alias}'}
+            for alias in ('default', 'contexto')
+        }
+        configuracao = override_settings(CACHES=caches_em_arquivo, CONTEXTO_CHAT_CACHE='contexto')
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+
+# --- Exportação de dados pessoais ---
+
+class ExportacaoTests(TestCase):
+    def setUp(self):
+        self.usuario = criar_usuario('paciente')
+        self.outro = criar_usuario('outro')
+        psicologo = criar_psicologo('psi')
+        amanha = datetime.date.today() + datetime.timedelta(days=1)
+        Consulta.objects.create(usuario=self.usuario, psicologo=psicologo, data=amanha, horario=datetime.time(10))
+        Consulta.objects.create(usuario=self.outro, psicologo=psicologo, data=amanha, horario=datetime.time(11))
+        AutoavaliacaoEmocional.objects.create(usuario=self.usuario, humor=5, ansiedade=8, estresse=4)
+        Notificacao.objects.create(destinatario=self.usuario, mensagem='Lembrete')
+
+    def linhas_jsonl(self, **opcoes):
+        conteudo = b''.join(gerar_exportacao(self.usuario, **opcoes))
+        return [json.loads(linha) for linha in conteudo.decode().splitlines()]
+
+    def test_jsonl_traz_so_os_dados_do_usuario(self):
+        linhas = self.linhas_jsonl()
+        tabelas = [linha['tabela'] for linha in linhas]
+        self.assertEqual(tabelas.count('consulta'), 1)
+        self.assertEqual(tabelas.count('autoavaliacao_emocional'), 1)
+        self.assertEqual(tabelas.count('notificacao'), 1)
+        consulta = next(linha for linha in linhas if linha['tabela'] == 'consulta')
+        self.assertEqual(consulta['psicologo__nome'], 'Dra. psi')
+        self.assertEqual(consulta['horario'], '10:00:00')
+
+    def test_csv_tem_cabecalho_unico(self):
+        conteudo = b''.join(gerar_exportacao(self.usuario, formato='csv')).decode()
+        linhas = conteudo.splitlines()
+        self.assertEqual(linhas[0].split(','), COLUNAS_CSV)
+        self.assertEqual(len(linhas), 1 + 3)
+
+    def test_gzip_descompacta_no_mesmo_conteudo(self):
+        compactado = b''.join(gerar_exportacao(self.usuario, compactar=True))
+        self.assertEqual(gzip.decompress(compactado), b''.join(gerar_exportacao(self.usuario)))
+
+    def test_formato_invalido(self):
+        with self.assertRaises(ValueError):
+            b''.join(gerar_exportacao(self.usuario, formato='xml'))
+
+    def test_comando_mede_contra_o_alvo(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            saida, erros = io.StringIO(), io.StringIO()
+            call_command('exportar_dados', 'paciente', saida=f'{diretorio}/dados.jsonl', alvo=60, stderr=erros)
+            self.assertIn('3 linhas', erros.getvalue())
+            with self.assertRaisesMessage(CommandError, 'acima do alvo'):
+                call_command('exportar_dados', 'paciente', saida=f'{diretorio}/dados.jsonl', alvo=0, stderr=saida)
+
+    def test_view_transmite_em_blocos(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('exportar_dados'), {'formato': 'csv', 'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('equilibria-dados-paciente.csv.gz', response['Content-Disposition'])
+        self.assertEqual(self.client.get(reverse('exportar_dados'), {'formato': 'xml'}).status_code, 400)
+
+    def test_view_sob_asgi_usa_iterador_assincrono(self):
+        cliente = AsyncClient()
+
+        async def exportar():
+            await cliente.aforce_login(self.usuario)
+            response = await cliente.get(reverse('exportar_dados'))
+            return response.is_async, b''.join([bloco async for bloco in response.streaming_content])
+
+        assincrono, conteudo = async_to_sync(exportar)()
+        self.assertTrue(assincrono)
+        self.assertEqual(conteudo, b''.join(gerar_exportacao(self.usuario)))
+
+
+# --- Respostas da IA armazenadas uma única vez ---
+
+class RespostaIATests(TestCase):
+    def setUp(self):
+        RespostaIA._ids_por_hash.clear()
+        self.addCleanup(RespostaIA._ids_por_hash.clear)
+        self.usuario = criar_usuario('paciente')
+
+    def test_respostas_iguais_compartilham_a_linha(self):
+        for _ in range(3):
+            InteracaoIA.objects.create(usuario=self.usuario, mensagem_usuario='oi', resposta_ia=RESPOSTA_ANSIEDADE)
+        InteracaoIA.objects.create(usuario=self.usuario, mensagem_usuario='oi', resposta_ia=RESPOSTA_TRISTEZA)
+        self.assertEqual(RespostaIA.objects.count(), 2)
+        self.assertEqual(RespostaIA.objects.get(texto=RESPOSTA_ANSIEDADE).interacoes.count(), 3)
+        interacao = InteracaoIA.objects.filter(resposta__texto=RESPOSTA_TRISTEZA).get()
+        self.assertEqual(interacao.resposta_ia, RESPOSTA_TRISTEZA)
+        self.assertEqual(interacao.resposta.hash, RespostaIA.calcular_hash(RESPOSTA_TRISTEZA))
+
+    def test_id_so_entra_no_cache_apos_o_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            resposta_id = RespostaIA.obter_id(RESPOSTA_ESTRESSE)
+        self.assertNotIn(RespostaIA.calcular_hash(RESPOSTA_ESTRESSE), RespostaIA._ids_por_hash)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(RespostaIA.obter_id(RESPOSTA_ESTRESSE), resposta_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(RespostaIA.obter_id(RESPOSTA_ESTRESSE), resposta_id)
+
+
+# --- Limitação de taxa ---
+
+class ThrottleTests(LimparCachesMixin, TestCase):
+    def test_interpretar_taxa(self):
+        self.assertEqual(interpretar_taxa('20/min'), (20, 20 / 60))
+        self.assertEqual(interpretar_taxa('5/s'), (5, 5))
+
+    def test_janela_deslizante(self):
+        capacidade, por_segundo = interpretar_taxa('10/min')
+        inicio = 6000.0  # início exato de uma janela de 60 s
+
+        resultados = [consumir_ficha('t', capacidade, por_segundo, agora=inicio + 15) for _ in range(11)]
+        self.assertTrue(all(permitido for permitido, _ in resultados[:10]))
+        self.assertEqual(resultados[10], (False, 45))
+
+        # Na metade da janela seguinte, a anterior ainda pesa 10 * 0,5
+        resultados = [consumir_ficha('t', capacidade, por_segundo, agora=inicio + 90) for _ in range(6)]
+        self.assertTrue(all(permitido for permitido, _ in resultados[:5]))
+        permitido, espera = resultados[5]
+        self.assertFalse(permitido)
+        # Falta 1 ficha; a janela anterior libera 10 por minuto
+        self.assertAlmostEqual(espera, 6)
+
+        # A recusa não contou: 6 s depois cabe exatamente mais uma
+        self.assertTrue(consumir_ficha('t', capacidade, por_segundo, agora=inicio + 96)[0])
+        self.assertFalse(consumir_ficha('t', capacidade, por_segundo, agora=inicio + 96)[0])
+
+    def test_chaves_independentes(self):
+        for _ in range(2):
+            consumir_ficha('a', 2, 2 / 60, agora=60.0)
+        self.assertFalse(consumir_ficha('a', 2, 2 / 60, agora=60.0)[0])
+        self.assertTrue(consumir_ficha('b', 2, 2 / 60, agora=60.0)[0])
+
+    def test_cliente_por_ip(self):
+        self.assertEqual(cliente_por_ip('10.0.0.1', '1.2.3.4, 5.6.7.8'), 'ip:10.0.0.1')
+        with override_settings(THROTTLE_USAR_X_FORWARDED_FOR=True):
+            self.assertEqual(cliente_por_ip('10.0.0.1', '1.2.3.4, 5.6.7.8'), 'ip:5.6.7.8')
+
+    @override_settings(THROTTLE_TAXAS={'chat_ia_api': '2/min'})
+    def test_middleware_recusa_sem_consultar_o_banco(self):
+        url = reverse('chat_ia_api')
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'mensagem': 'oi'}).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'mensagem': 'oi'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # GET não é limitado
+        self.assertEqual(self.client.get(url).status_code, 405)
+        # Um cookie de sessão inventado cai no limite do IP
+        self.client.cookies['sessionid'] = 'sessao-inventada'
+        self.assertEqual(self.client.post(url, {'mensagem': 'oi'}).status_code, 429)
+
+    @override_settings(THROTTLE_TAXAS={'chat_ia_api': '2/min'})
+    def test_usuario_logado_tem_limite_proprio(self):
+        url = reverse('chat_ia_api')
+        for _ in range(3):
+            self.client.post(url, {'mensagem': 'oi'})
+        # Do mesmo IP, cada paciente logado tem o seu limite
+        for username in ('ana', 'bia'):
+            self.client.force_login(criar_usuario(username))
+            for _ in range(2):
+                self.assertEqual(self.client.post(url, {'mensagem': 'oi'}).status_code, 200)
+            self.assertEqual(self.client.post(url, {'mensagem': 'oi'}).status_code, 429)
+
+
+# --- Chat assíncrono e serviço externo de respostas ---
+
+class RespostaServicoFalso:
+    def __init__(self, dados):
+        self.dados = dados
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.dados
+
+
+class ClienteServicoFalso:
+    def __init__(self, dados):
+        self.dados = dados
+        self.enviados = []
+
+    async def post(self, url, json):
+        self.enviados.append(json)
+        return RespostaServicoFalso(self.dados)
+
+
+def servico_falso(cliente):
+    @contextlib.asynccontextmanager
+    async def _cliente_http():
+        yield cliente
+    return mock.patch.object(ia, '_cliente_http', _cliente_http)
+
+
+class ChatAssincronoTests(LimparCachesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.usuario = criar_usuario('paciente')
+
+    def test_simulador_por_tema(self):
+        self.assertEqual(async_to_sync(ia.agerar_resposta_ia)('Estou muito ansioso'), RESPOSTA_ANSIEDADE)
+        contexto = {'turnos': [], 'autoavaliacao': {'humor': 5, 'ansiedade': 3, 'estresse': 9}}
+        self.assertEqual(async_to_sync(ia.agerar_resposta_ia)('oi', contexto), RESPOSTA_ESTRESSE)
+
+    @override_settings(IA_RESPONDER_URL='http://ia.invalid/responder')
+    def test_sem_httpx_usa_o_simulador(self):
+        with mock.patch.object(ia, 'httpx', None), self.assertLogs('app.ia', 'ERROR'):
+            self.assertEqual(async_to_sync(ia.agerar_resposta_ia)('triste'), RESPOSTA_TRISTEZA)
+
+    @unittest.skipIf(ia.httpx is None, 'httpx não instalado')
+    @override_settings(IA_RESPONDER_URL='http://ia.invalid/responder')
+    def test_servico_externo(self):
+        cliente = ClienteServicoFalso({'resposta': 'Resposta do serviço'})
+        contexto = {'turnos': [['oi', 'olá']], 'autoavaliacao': None}
+        with servico_falso(cliente):
+            self.assertEqual(async_to_sync(ia.agerar_resposta_ia)('tudo bem?', contexto), 'Resposta do serviço')
+        self.assertEqual(cliente.enviados, [{'mensagem': 'tudo bem?', 'historico': [['oi', 'olá']], 'autoavaliacao': None}])
+
+        # Resposta num formato inesperado: volta ao simulador
+        with servico_falso(ClienteServicoFalso({'resposta': ['lista']})), self.assertLogs('app.ia', 'ERROR'):
+            self.assertEqual(async_to_sync(ia.agerar_resposta_ia)('nervoso'), RESPOSTA_ANSIEDADE)
+
+    def test_so_registra_interacao_de_usuario_logado(self):
+        async_to_sync(ia.aresponder_mensagem)(AnonymousUser(), 'ansioso')
+        self.assertFalse(InteracaoIA.objects.exists())
+        resposta = async_to_sync(ia.aresponder_mensagem)(self.usuario, 'ansioso')
+        interacao = InteracaoIA.objects.get(usuario=self.usuario)
+        self.assertEqual((interacao.mensagem_usuario, interacao.resposta_ia), ('ansioso', resposta))
+
+    def test_views_assincronas(self):
+        cliente = AsyncClient()
+
+        async def conversar():
+            await cliente.aforce_login(self.usuario)
+            vazia = await cliente.post(reverse('chat_ia_api'), {'mensagem': ''})
+            api = await cliente.post(reverse('chat_ia_api'), {'mensagem': 'estressado'})
+            pagina = await cliente.post(reverse('apoio_emocional'), {'mensagem': 'triste'})
+            return vazia, api, pagina
+
+        vazia, api, pagina = async_to_sync(conversar)()
+        self.assertEqual(vazia.status_code, 400)
+        self.assertEqual(api.json()['resposta'], RESPOSTA_ESTRESSE)
+        self.assertEqual(pagina.json()['resposta'], RESPOSTA_TRISTEZA)
+        self.assertEqual(InteracaoIA.objects.filter(usuario=self.usuario).count(), 2)
+
+
+# --- Contexto do chat em cache ---
+
+class ContextoChatTests(CacheCompartilhadoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.usuario = criar_usuario('paciente')
+        self.criar_turno('primeira', RESPOSTA_TRISTEZA)
+
+    def criar_turno(self, mensagem, resposta):
+        InteracaoIA.objects.create(usuario=self.usuario, mensagem_usuario=mensagem, resposta_ia=resposta)
+
+    def test_segundo_acesso_vem_do_cache(self):
+        with self.assertNumQueries(2):
+            contexto = carregar_contexto(self.usuario.id)
+        self.assertEqual(contexto['turnos'], [['primeira', RESPOSTA_TRISTEZA]])
+        with self.assertNumQueries(0):
+            self.assertEqual(carregar_contexto(self.usuario.id), contexto)
+
+    def test_turno_registrado_entra_no_cache(self):
+        contexto = carregar_contexto(self.usuario.id)
+        self.criar_turno('segunda', RESPOSTA_ANSIEDADE)
+        registrar_turno(self.usuario.id, contexto, 'segunda', RESPOSTA_ANSIEDADE)
+        with self.assertNumQueries(0):
+            turnos = carregar_contexto(self.usuario.id)['turnos']
+        self.assertEqual(turnos, [['primeira', RESPOSTA_TRISTEZA], ['segunda', RESPOSTA_ANSIEDADE]])
+
+    @override_settings(CONTEXTO_CHAT_TURNOS=2)
+    def test_mantem_so_os_ultimos_turnos(self):
+        contexto = carregar_contexto(self.usuario.id)
+        for mensagem in ('segunda', 'terceira'):
+            self.criar_turno(mensagem, RESPOSTA_ESTRESSE)
+            registrar_turno(self.usuario.id, contexto, mensagem, RESPOSTA_ESTRESSE)
+            contexto = carregar_contexto(self.usuario.id)
+        self.assertEqual([mensagem for mensagem, _ in contexto['turnos']], ['segunda', 'terceira'])
+
+    def test_turnos_concorrentes_nao_perdem_mensagens(self):
+        # Duas abas leem o mesmo contexto e registram um turno cada
+        aba1 = carregar_contexto(self.usuario.id)
+        aba2 = carregar_contexto(self.usuario.id)
+        self.criar_turno('aba 1', RESPOSTA_ANSIEDADE)
+        registrar_turno(self.usuario.id, aba1, 'aba 1', RESPOSTA_ANSIEDADE)
+        self.criar_turno('aba 2', RESPOSTA_ESTRESSE)
+        registrar_turno(self.usuario.id, aba2, 'aba 2', RESPOSTA_ESTRESSE)
+
+        with self.assertNumQueries(2):  # a gravação atrasada descartou o cache
+            turnos = carregar_contexto(self.usuario.id)['turnos']
+        self.assertEqual([mensagem for mensagem, _ in turnos], ['primeira', 'aba 1', 'aba 2'])
+
+    def test_nova_autoavaliacao_invalida_o_contexto(self):
+        contexto = carregar_contexto(self.usuario.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            autoavaliacao = AutoavaliacaoEmocional.objects.create(usuario=self.usuario, humor=2, ansiedade=5, estresse=5)
+        # Um registro com o contexto lido antes da alteração não volta a valer
+        registrar_turno(self.usuario.id, contexto, 'depois', RESPOSTA_TRISTEZA)
+        self.assertEqual(carregar_contexto(self.usuario.id)['autoavaliacao']['id'], autoavaliacao.id)
+
+    def test_versao_assincrona(self):
+        contexto = async_to_sync(acarregar_contexto)(self.usuario.id)
+        self.criar_turno('segunda', RESPOSTA_ANSIEDADE)
+        async_to_sync(aregistrar_turno)(self.usuario.id, contexto, 'segunda', RESPOSTA_ANSIEDADE)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(async_to_sync(acarregar_contexto)(self.usuario.id)['turnos']), 2)
+
+
+class ContextoSemCacheTests(TestCase):
+    """Configuração padrão, sem REDIS_URL: só o cache local 'default'."""
+
+    def test_historico_lido_do_banco_a_cada_mensagem(self):
+        self.assertEqual(list(settings.CACHES), ['default'])
+        self.assertEqual(settings.CONTEXTO_CHAT_CACHE, 'default')
+        usuario = criar_usuario('paciente')
+
+        self.assertEqual(async_to_sync(ia.aresponder_mensagem)(usuario, 'Estou ansioso'), RESPOSTA_ANSIEDADE)
+        with self.assertNumQueries(2):
+            contexto = carregar_contexto(usuario.id)
+        self.assertEqual(contexto['turnos'], [['Estou ansioso', RESPOSTA_ANSIEDADE]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AutoavaliacaoEmocional.objects.create(usuario=usuario, humor=2, ansiedade=5, estresse=5)
+        with self.assertNumQueries(2):
+            self.assertEqual(carregar_contexto(usuario.id)['autoavaliacao']['humor'], 2)
+
+
+# --- Login por nome de usuário ou e-mail ---
+
+class LoginPorEmailTests(TestCase):
+    def setUp(self):
+        self.backend = UsuarioOuEmailBackend()
+        self.maria = criar_usuario('Maria', email='Maria.Silva@Example.com')
+
+    def autenticar(self, identificador, senha='senha-de-teste-123'):
+        return self.backend.authenticate(None, username=identificador, password=senha)
+
+    def test_nome_ou_email_sem_diferenciar_maiusculas(self):
+        for identificador in ('maria', 'MARIA', ' Maria ', 'maria.silva@example.com', 'MARIA.SILVA@EXAMPLE.COM'):
+            with self.subTest(identificador=identificador):
+                self.assertEqual(self.autenticar(identificador), self.maria)
+
+    def test_uma_consulta_por_login(self):
+        with self.assertNumQueries(1):
+            self.backend.buscar_usuario('MARIA.silva@example.com')
+
+    def test_senha_errada_ou_conta_inexistente(self):
+        self.assertIsNone(self.autenticar('maria', 'outra-senha'))
+        self.assertIsNone(self.autenticar('ninguem@example.com'))
+        self.assertIsNone(self.autenticar(''))
+
+    def test_nome_de_usuario_tem_prioridade_sobre_email(self):
+        dono_do_nome = criar_usuario('maria.silva@example.com', email='outra@example.com')
+        self.assertEqual(self.backend.buscar_usuario('Maria.Silva@example.com'), dono_do_nome)
+
+    def test_contas_repetidas_com_outras_maiusculas(self):
+        # Contas anteriores à normalização do cadastro
+        mais_nova = criar_usuario('MARIA', email='maria.silva@example.com')
+        terceira = criar_usuario('maria', email='MARIA.SILVA@example.com')
+        self.assertEqual(self.backend.buscar_usuario('Maria'), self.maria)
+        self.assertEqual(self.backend.buscar_usuario('maria'), terceira)
+        self.assertEqual(self.backend.buscar_usuario('mAriA'), self.maria)
+        self.assertEqual(self.backend.buscar_usuario('maria.silva@example.com'), mais_nova)
+        self.assertEqual(self.backend.buscar_usuario('Maria.SILVA@example.com'), self.maria)
+        # Nome de usuário de uma conta e e-mail de outras duas
+        dono_do_nome = criar_usuario('maria.silva@example.com', email='outra@example.com')
+        self.assertEqual(self.backend.buscar_usuario('MARIA.SILVA@EXAMPLE.COM'), dono_do_nome)
+
+    def test_cadastro_normaliza_e_recusa_email_repetido(self):
+        dados = {
+            'username': 'joao', 'email': ' MARIA.silva@example.COM ', 'first_name': 'João', 'last_name': 'Souza',
+            'password1': 'Senha-Forte-2024', 'password2': 'Senha-Forte-2024',
+        }
+        form = RegistroForm(dados)
+        self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+
+        form = RegistroForm({**dados, 'email': ' Joao@Example.COM '})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['email'], 'joao@example.com')
+
+
+# --- Resumo das avaliações por psicólogo ---
+
+class ResumoAvaliacoesTests(TestCase):
+    def setUp(self):
+        self.paciente = criar_usuario('paciente')
+        self.psicologo = criar_psicologo('psi')
+
+    def avaliar(self, nota, psicologo=None, hora=10):
+        consulta = criar_consulta(self.paciente, psicologo or self.psicologo, hora=hora, status='realizada')
+        return Avaliacao.objects.create(consulta=consulta, nota=nota)
+
+    def resumo(self, psicologo=None):
+        return ResumoAvaliacoes.objects.get(psicologo=psicologo or self.psicologo)
+
+    def assertResumo(self, total, soma, psicologo=None):
+        resumo = self.resumo(psicologo)
+        self.assertEqual((resumo.total, resumo.soma), (total, soma))
+        self.assertAlmostEqual(resumo.media_bayesiana, (5 * 3.0 + soma) / (5 + total))
+
+    def test_psicologo_novo_comeca_na_media_a_priori(self):
+        self.assertResumo(0, 0)
+        self.assertEqual(self.resumo().media_bayesiana, 3.0)
+
+    def test_criar_alterar_e_excluir_avaliacoes(self):
+        primeira = self.avaliar(5)
+        segunda = self.avaliar(4, hora=11)
+        self.assertResumo(2, 9)
+
+        segunda.nota = 1
+        segunda.save()
+        self.assertResumo(2, 6)
+
+        primeira.delete()
+        self.assertResumo(1, 1)
+        # Exclusão em cascata, pela consulta
+        segunda.consulta.delete()
+        self.assertResumo(0, 0)
+
+    def test_avaliacao_movida_para_outro_psicologo(self):
+        outro = criar_psicologo('outro', numero=2)
+        avaliacao = self.avaliar(5)
+        avaliacao.consulta = criar_consulta(self.paciente, outro)
+        avaliacao.save()
+        self.assertResumo(0, 0)
+        self.assertResumo(1, 5, psicologo=outro)
+
+    def test_reconstruir(self):
+        self.avaliar(2)
+        self.avaliar(4, hora=11)
+        ResumoAvaliacoes.objects.update(total=0, soma=0, media_bayesiana=0)
+        ResumoAvaliacoes.reconstruir()
+        self.assertResumo(2, 6)
+
+    def test_diretorio_ordenado_pela_media(self):
+        outro = criar_psicologo('outro', numero=2)
+        self.avaliar(2)
+        self.avaliar(5, psicologo=outro)
+        response = self.client.get(reverse('profissionais'), {'ordem': 'avaliacao'})
+        self.assertEqual(response.context['psicologos'], [outro, self.psicologo])
+
+
+# --- Recomendação de psicólogos ---
+
+@unittest.skipUnless(recomendacao.disponivel(), 'NumPy não instalado')
+class RecomendacaoTests(LimparCachesMixin, TestCase):
+    ANSIOSO = {'humor': 6, 'ansiedade': 10, 'estresse': 1}
+
+    def setUp(self):
+        super().setUp()
+        recomendacao._matriz = None
+        self.addCleanup(setattr, recomendacao, '_matriz', None)
+        self.ansiedade = self.criar('ansiedade', 'Ansiedade, Pânico', 1)
+        self.luto = self.criar('luto', 'Luto, Depressão', 2)
+        self.burnout = self.criar('burnout', 'Burnout', 3)
+
+    def criar(self, username, especialidades, numero, horas=8):
+        psicologo = criar_psicologo(username, numero, especialidades=especialidades)
+        if horas:
+            HorarioDisponivel.objects.create(
+                psicologo=psicologo, dia_semana=0, hora_inicio=datetime.time(8), hora_fim=datetime.time(8 + horas),
+            )
+        return psicologo
+
+    def ids(self, autoavaliacao, tema=None, k=None, usuario_id=1):
+        return [item['id'] for item in recomendacao.recomendar(usuario_id, autoavaliacao, tema, k)]
+
+    def test_ordena_pela_necessidade(self):
+        self.assertEqual(self.ids(self.ANSIOSO)[0], self.ansiedade.id)
+        triste = {'humor': 1, 'ansiedade': 1, 'estresse': 1}
+        self.assertEqual(self.ids(triste)[0], self.luto.id)
+        # O tema do chat pesa como intensidade máxima
+        tranquilo = {'humor': 8, 'ansiedade': 1, 'estresse': 1}
+        self.assertEqual(self.ids(tranquilo, tema='estresse')[0], self.burnout.id)
+
+    def test_k_e_psicologos_sem_horas_livres(self):
+        sem_agenda = self.criar('sem_agenda', 'Ansiedade', 4, horas=0)
+        self.assertEqual(len(self.ids(self.ANSIOSO, k=2)), 2)
+        self.assertNotIn(sem_agenda.id, self.ids(self.ANSIOSO, k=10))
+
+    def test_nota_desempata(self):
+        outro = self.criar('outro', 'Ansiedade, Pânico', 4)
+        paciente = criar_usuario('paciente')
+        Avaliacao.objects.create(consulta=criar_consulta(paciente, outro, dias=-1, status='realizada'), nota=5)
+        self.assertEqual(self.ids(self.ANSIOSO, k=2), [outro.id, self.ansiedade.id])
+
+    def test_alteracoes_relidas_sem_reconstruir(self):
+        self.assertEqual(self.ids(self.ANSIOSO)[0], self.ansiedade.id)
+        matriz = recomendacao.matriz()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.burnout.especialidades = 'Ansiedade, Fobia, Pânico'
+            self.burnout.save()
+            self.ansiedade.horarios_list.all().delete()
+
+        with mock.patch.object(matriz, 'reconstruir', side_effect=AssertionError('reconstruiu')):
+            ids = self.ids(self.ANSIOSO, usuario_id=2)
+        self.assertEqual(ids[0], self.burnout.id)
+        self.assertNotIn(self.ansiedade.id, ids)
+
+    def test_cache_local_reconstroi_a_matriz_vencida(self):
+        self.assertEqual(self.ids(self.ANSIOSO)[0], self.ansiedade.id)
+        # Alterações feitas em outro worker: o log de versões deste processo não as vê
+        Psicologo.objects.filter(pk=self.burnout.pk).update(especialidades='Ansiedade, Fobia, Pânico')
+        HorarioDisponivel.objects.filter(psicologo=self.ansiedade).delete()
+        self.assertEqual(self.ids(self.ANSIOSO, usuario_id=2)[0], self.ansiedade.id)
+
+        depois = time.monotonic() + settings.RECOMENDACAO_TTL_LOCAL + 1
+        with mock.patch.object(recomendacao.time, 'monotonic', return_value=depois):
+            self.assertEqual(self.ids(self.ANSIOSO, usuario_id=3)[0], self.burnout.id)
+
+    def test_api(self):
+        paciente = criar_usuario('paciente')
+        AutoavaliacaoEmocional.objects.create(usuario=paciente, **self.ANSIOSO)
+        self.client.force_login(paciente)
+        resposta = self.client.get(reverse('recomendacoes_api'))
+        self.assertEqual(resposta.json()['recomendacoes'][0]['nome'], self.ansiedade.nome)
+        self.assertEqual(self.client.get(reverse('recomendacoes_api'), {'tema': 'outro'}).status_code, 400)
+
+    def test_chat_le_o_historico_uma_vez(self):
+        paciente = criar_usuario('paciente')
+        AutoavaliacaoEmocional.objects.create(usuario=paciente, **self.ANSIOSO)
+        self.client.force_login(paciente)
+        with CaptureQueriesContext(connections['default']) as contexto:
+            resposta = self.client.post(reverse('chat_ia_api'), {'mensagem': 'Estou muito ansioso'})
+        self.assertEqual(resposta.json()['recomendacoes'][0]['id'], self.ansiedade.id)
+        leituras = [q['sql'] for q in contexto if q['sql'].startswith('SELECT') and 'app_autoavaliacaoemocional' in q['sql']]
+        self.assertEqual(len(leituras), 1)
+
+
+# --- Leituras em réplicas ---
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.router.replicas = ['replica_1']
+        self.addCleanup(encerrar_requisicao)
+
+    def requisicao(self, **cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        iniciar_requisicao(request)
+
+    def test_fora_de_requisicao_le_do_primario(self):
+        self.assertEqual(self.router.db_for_read(Psicologo), 'default')
+
+    def test_escrita_fixa_o_resto_da_requisicao_no_primario(self):
+        self.requisicao()
+        self.assertEqual(self.router.db_for_read(Psicologo), 'replica_1')
+        self.assertEqual(self.router.db_for_write(Consulta), 'default')
+        self.assertEqual(self.router.db_for_read(Psicologo), 'default')
+        self.assertTrue(encerrar_requisicao())
+
+    def test_cookie_de_fixacao(self):
+        self.requisicao(**{COOKIE_FIXACAO: '1'})
+        self.assertEqual(self.router.db_for_read(Psicologo), 'default')
+        self.assertFalse(encerrar_requisicao())
+
+    def test_dentro_de_transacao_le_do_primario(self):
+        self.requisicao()
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Psicologo), 'default')
+
+    def test_escrita_em_thread_de_sync_to_async(self):
+        async def requisicao_assincrona():
+            self.requisicao()
+            await sync_to_async(fixar_no_primario)()
+            return self.router.db_for_read(Psicologo), encerrar_requisicao()
+
+        self.assertEqual(async_to_sync(requisicao_assincrona)(), ('default', True))
+
+    def test_sem_replicas(self):
+        self.router.replicas = []
+        self.requisicao()
+        self.assertEqual(self.router.db_for_read(Psicologo), 'default')
+
+
+class ReplicaMiddlewareTests(TestCase):
+    def processar(self, view):
+        middleware = ReplicaMiddleware(view)
+        with mock.patch('app.middleware.replicas', return_value=['replica_1']):
+            return middleware(RequestFactory().post('/'))
+
+    def test_cookie_apos_escrita(self):
+        def view(request):
+            criar_usuario('paciente')
+            return HttpResponse()
+
+        response = self.processar(view)
+        self.assertEqual(response.cookies[COOKIE_FIXACAO]['max-age'], 5)
+
+    def test_sem_cookie_sem_escrita(self):
+        response = self.processar(lambda request: HttpResponse(Psicologo.objects.count()))
+        self.assertNotIn(COOKIE_FIXACAO, response.cookies)
+
+
+# --- Papel do usuário ---
+
+class PapelUsuarioTests(TestCase):
+    def setUp(self):
+        self.paciente = criar_usuario('paciente')
+        self.psicologo = criar_psicologo('psi')
+
+    def test_papel_na_sessao_ate_o_perfil_mudar(self):
+        sessao = {}
+        self.assertFalse(resolver_perfil(self.paciente, sessao).eh_psicologo)
+        with self.assertNumQueries(0):
+            self.assertFalse(resolver_perfil(self.paciente, sessao).eh_psicologo)
+
+        # Como a autenticação de cada requisição, relê o usuário (e a versão)
+        novo = Psicologo.objects.create(usuario=self.paciente, nome='Novo', crp='06/000009')
+        self.paciente.refresh_from_db()
+        self.assertEqual(resolver_perfil(self.paciente, sessao).psicologo_id, novo.id)
+
+        novo.delete()
+        self.paciente.refresh_from_db()
+        self.assertFalse(resolver_perfil(self.paciente, sessao).eh_psicologo)
+
+    def test_anonimo(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(resolver_perfil(AnonymousUser(), {}).eh_psicologo)
+
+    def test_save_de_instancia_antiga_mantem_a_versao(self):
+        antigo = Usuario.objects.get(pk=self.paciente.pk)
+        Psicologo.objects.create(usuario=self.paciente, nome='Novo', crp='06/000009')
+        antigo.first_name = 'Paula'
+        antigo.save()
+        self.paciente.refresh_from_db()
+        self.assertEqual((self.paciente.first_name, self.paciente.versao_papel), ('Paula', 1))
+
+    def test_paginas_autenticadas_nao_consultam_o_papel(self):
+        self.client.force_login(self.psicologo.usuario)
+        self.client.get(reverse('home'))  # guarda o papel na sessão
+        for nome in ('home', 'sobre'):
+            with self.subTest(pagina=nome), self.assertNumQueries(2):  # sessão e usuário
+                response = self.client.get(reverse(nome))
+            self.assertContains(response, reverse('horarios_create'))
+
+        self.client.force_login(self.paciente)
+        self.assertNotContains(self.client.get(reverse('home')), reverse('horarios_create'))
+        Psicologo.objects.create(usuario=self.paciente, nome='Novo', crp='06/000009')
+        self.assertContains(self.client.get(reverse('home')), reverse('horarios_create'))
+
+    def test_views_de_psicologo(self):
+        self.client.force_login(self.paciente)
+        self.assertRedirects(self.client.get(reverse('horarios_list')), reverse('home'))
+
+        self.client.force_login(self.psicologo.usuario)
+        response = self.client.get(reverse('horarios_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['psicologo'], self.psicologo)
+
+
+# --- Caixa de saída do formulário de contato ---
+
+ENVIO_LOCMEM = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
+
+class CaixaSaidaTests(TestCase):
+    def criar_contato(self, **campos):
+        dados = {'nome': 'Ana', 'email': 'ana@example.com', 'assunto': 'duvida', 'mensagem': 'Olá'}
+        return MensagemContato.objects.create(**{**dados, **campos})
+
+    def test_envia_e_inscreve_so_quem_aceitou(self):
+        self.criar_contato(aceito_newsletter=True, email='Ana@Example.com')
+        self.criar_contato(nome='Bia', email='bia@example.com')
+        self.assertEqual(enviar_lote(), (2, 0))
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].reply_to, ['Ana@Example.com'])
+        self.assertFalse(MensagemContato.objects.exclude(status='enviada').exists())
+        self.assertEqual(list(InscritoNewsletter.objects.values_list('email', flat=True)), ['ana@example.com'])
+        self.assertEqual(enviar_lote(), (0, 0))
+
+    def test_espera_exponencial(self):
+        with mock.patch('app.caixa_saida.random.uniform', return_value=1):
+            self.assertEqual(
+                [espera_para(tentativas).total_seconds() for tentativas in (1, 2, 3, 20)],
+                [60, 120, 240, 6 * 60 * 60],
+            )
+
+    def test_falha_do_servidor_reagenda(self):
+        contato = self.criar_contato()
+        with mock.patch(ENVIO_LOCMEM, side_effect=smtplib.SMTPServerDisconnected('caiu')):
+            self.assertEqual(enviar_lote(), (0, 1))
+        contato.refresh_from_db()
+        self.assertEqual((contato.status, contato.tentativas), ('pendente', 1))
+        self.assertIn('SMTPServerDisconnected', contato.ultimo_erro)
+        espera = (contato.proxima_tentativa - timezone.now()).total_seconds()
+        self.assertTrue(45 <= espera <= 72, espera)
+
+        # Ainda não venceu: o próximo lote não a pega
+        self.assertEqual(enviar_lote(), (0, 0))
+        MensagemContato.objects.update(proxima_tentativa=timezone.now())
+        self.assertEqual(enviar_lote(), (1, 0))
+        contato.refresh_from_db()
+        self.assertEqual((contato.status, contato.tentativas, contato.ultimo_erro), ('enviada', 2, ''))
+
+    @override_settings(CONTATO_MAX_TENTATIVAS=2)
+    def test_desiste_apos_o_maximo_de_tentativas(self):
+        contato = self.criar_contato()
+        with mock.patch(ENVIO_LOCMEM, side_effect=smtplib.SMTPException('recusado')):
+            for _ in range(2):
+                MensagemContato.objects.update(proxima_tentativa=timezone.now())
+                enviar_lote()
+        contato.refresh_from_db()
+        self.assertEqual((contato.status, contato.tentativas), ('falhou', 2))
+
+    def test_erro_que_nao_se_resolve_nao_trava_a_fila(self):
+        invalida = self.criar_contato(assunto='linha\ninjetada')
+        valida = self.criar_contato(nome='Bia')
+        self.assertEqual(enviar_lote(), (1, 1))
+        invalida.refresh_from_db()
+        valida.refresh_from_db()
+        self.assertEqual((invalida.status, invalida.tentativas), ('falhou', 1))
+        self.assertEqual(valida.status, 'enviada')
+
+    def test_servidor_indisponivel_devolve_o_lote(self):
+        self.criar_contato()
+        self.criar_contato(nome='Bia')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=ConnectionRefusedError):
+            self.assertEqual(enviar_lote(), (0, 2))
+        self.assertEqual(set(MensagemContato.objects.values_list('status', 'tentativas')), {('pendente', 1)})
+
+    def test_lote_reservado_nao_e_enviado_por_outro_processo(self):
+        self.criar_contato()
+        self.assertEqual(len(reservar_lote(10, timezone.now())), 1)
+        self.assertEqual(enviar_lote(), (0, 0))
+
+    def test_view_so_grava_na_caixa_de_saida(self):
+        dados = {
+            'nome': 'Ana', 'email': 'ana@example.com', 'assunto': 'duvida', 'mensagem': 'Olá',
+            'aceito_termos': 'on',
+        }
+        self.assertRedirects(self.client.post(reverse('contato'), dados), reverse('contato'))
+        self.assertEqual(MensagemContato.objects.get().status, 'pendente')
+        self.assertEqual(mail.outbox, [])
+
+        for campo, valor in (('assunto', 'a\r\nBcc: x@example.com'), ('email', 'nao-e-email')):
+            with self.subTest(campo=campo):
+                self.assertEqual(self.client.post(reverse('contato'), {**dados, campo: valor}).status_code, 200)
+        self.assertEqual(MensagemContato.objects.count(), 1)
+
+
+# --- Blog ---
+
+class MarkdownSeguroTests(SimpleTestCase):
+    def test_marcacoes(self):
+        html = renderizar_markdown('# Título\n\nUm **forte** e *leve* com `x < y`.\n\n- um\n- dois\n\n> citação\n\n---')
+        self.assertEqual(html, (
+            '<h2>Título</h2>\n'
+            '<p>Um <strong>forte</strong> e <em>leve</em> com <code>x &lt; y</code>.</p>\n'
+            '<ul><li>um</li><li>dois</li></ul>\n'
+            '<blockquote><p>citação</p></blockquote>\n'
+            '<hr>'
+        ))
+
+    def test_html_e_links_perigosos_viram_texto(self):
+        html = renderizar_markdown('<script>alert(1)</script> [a](javascript:alert(1)) [b](/sobre/) [c](https://x.org)')
+        self.assertNotIn('<script>', html)
+        self.assertIn('&lt;script&gt;', html)
+        self.assertNotIn('javascript:', html.replace('&lt;', ''))
+        self.assertIn('<a href="/sobre/">b</a>', html)
+        self.assertIn('<a href="https://x.org" rel="noopener nofollow">c</a>', html)
+
+
+class BlogTests(LimparCachesMixin, TestCase):
+    def criar_artigo(self, titulo, publicado=True, **campos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Artigo.objects.create(
+                titulo=titulo, autor='Dra. Ana', categoria='Ansiedade', resumo='Resumo',
+                corpo_markdown=campos.pop('corpo_markdown', '**Texto**'), publicado=publicado, **campos,
+            )
+
+    def test_html_gerado_ao_salvar(self):
+        artigo = self.criar_artigo('Respirar Melhor', corpo_markdown='palavra ' * 450)
+        self.assertEqual(artigo.slug, 'respirar-melhor')
+        self.assertEqual(artigo.tempo_leitura, 2)
+        self.assertIsNotNone(artigo.publicado_em)
+        artigo.corpo_markdown = '*novo*'
+        artigo.save(update_fields=['corpo_markdown'])
+        artigo.refresh_from_db()
+        self.assertEqual(artigo.corpo_html, '<p><em>novo</em></p>')
+
+    def test_paginacao_por_chave(self):
+        inicio = timezone.now()
+        for numero in range(11):
+            self.criar_artigo(f'Artigo {numero}', publicado_em=inicio - datetime.timedelta(minutes=numero % 3))
+        self.criar_artigo('Rascunho', publicado=False)
+
+        titulos, cursor = [], None
+        while True:
+            artigos, cursor = listar_artigos(cursor)
+            titulos += [artigo.titulo for artigo in artigos]
+            if cursor is None:
+                break
+        self.assertEqual(len(titulos), 11)
+        self.assertEqual(titulos, [artigo.titulo for artigo in publicados()])
+        self.assertEqual(listar_artigos('lixo')[0], listar_artigos()[0])
+
+    def test_artigo_em_cache_e_invalidado_ao_editar(self):
+        artigo = self.criar_artigo('Sono')
+        with self.assertNumQueries(1):
+            obter_artigo('sono')
+        with self.assertNumQueries(0):
+            self.assertEqual(obter_artigo('sono').corpo_html, '<p><strong>Texto</strong></p>')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            artigo.corpo_markdown = 'Editado'
+            artigo.save()
+        self.assertEqual(obter_artigo('sono').corpo_html, '<p>Editado</p>')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            artigo.publicado = False
+            artigo.save()
+        self.assertIsNone(obter_artigo('sono'))
+
+    def test_pagina_do_artigo_com_etag(self):
+        self.criar_artigo('Sono')
+        url = reverse('artigo', args=['sono'])
+        response = self.client.get(url)
+        self.assertContains(response, '<p><strong>Texto</strong></p>')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(reverse('artigo', args=['outro'])).status_code, 404)
+
+    def test_cache_local_vence_logo(self):
+        # Outro worker despublica o artigo: a invalidação não chega a este processo
+        self.criar_artigo('Sono')
+        self.assertEqual(len(listar_artigos()[0]), 1)
+        obter_artigo('sono')
+        Artigo.objects.filter(slug='sono').update(publicado=False)
+        self.assertIsNotNone(obter_artigo('sono'))
+
+        with mock.patch('time.time', return_value=time.time() + settings.BLOG_TTL_LOCAL + 1):
+            self.assertIsNone(obter_artigo('sono'))
+            self.assertEqual(listar_artigos()[0], [])
+
+    def test_feed_gerado_de_novo_so_apos_publicacao(self):
+        self.criar_artigo('Primeiro')
+        self.assertContains(self.client.get(reverse('blog_feed')), 'Primeiro')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('blog_feed'))
+        self.criar_artigo('Segundo')
+        self.assertContains(self.client.get(reverse('blog_feed')), 'Segundo')
+
+
+# --- Aquecimento do worker ---
+
+def conexao_falsa(pool=False):
+    conexao = mock.Mock()
+    conexao.settings_dict = {'OPTIONS': {'pool': {'min_size': 2}} if pool else {}}
+    return conexao
+
+
+class AquecimentoTests(TestCase):
+    def test_nao_roda_sob_runserver_nem_desativado(self):
+        with mock.patch.object(sys, 'argv', ['manage.py', 'runserver']):
+            self.assertEqual(aquecimento.aquecer(), [])
+        with override_settings(AQUECIMENTO_ATIVO=False):
+            self.assertEqual(aquecimento.aquecer(), [])
+
+    @override_settings(HASH_PROCESSOS=0)
+    def test_fases(self):
+        with mock.patch.object(sys, 'argv', ['gunicorn']):
+            resultados = aquecimento.aquecer()
+        self.assertEqual([nome for nome, _, _ in resultados], [nome for nome, _ in aquecimento.FASES])
+        detalhes = {nome: detalhe for nome, _, detalhe in resultados}
+        self.assertNotIn('erro', ' '.join(detalhes.values()))
+        self.assertEqual(detalhes['hash'], 'sem pool (HASH_PROCESSOS = 0)')
+
+    def test_falha_numa_fase_nao_impede_as_outras(self):
+        def falhar():
+            raise ConnectionRefusedError('banco fora do ar')
+
+        fases = [('banco', falhar), ('urls', aquecimento.aquecer_urls)]
+        with mock.patch.object(aquecimento, 'FASES', fases), self.assertLogs('app.aquecimento', 'ERROR'):
+            resultados = aquecimento.aquecer(forcar=True)
+        self.assertEqual(resultados[0][2], 'erro: ConnectionRefusedError: banco fora do ar')
+        self.assertTrue(resultados[1][2].endswith('padrões de URL'))
+
+    def test_banco_sob_wsgi_e_asgi(self):
+        sem_pool, com_pool = conexao_falsa(), conexao_falsa(pool=True)
+        with mock.patch.object(aquecimento, 'connections') as conexoes:
+            conexoes.all.return_value = [sem_pool, com_pool]
+            with override_settings(SERVIDOR_ASGI=True):
+                self.assertEqual(aquecimento.aquecer_banco(), '1 conexão(ões)')
+            sem_pool.ensure_connection.assert_not_called()
+            com_pool.close.assert_called_once_with()  # devolvida ao pool
+
+            with override_settings(SERVIDOR_ASGI=False):
+                self.assertEqual(aquecimento.aquecer_banco(), '2 conexão(ões)')
+            sem_pool.ensure_connection.assert_called_once_with()
+            sem_pool.close.assert_not_called()  # a conexão persistente fica aberta
+
+
+# --- Encerramento das consultas vencidas ---
+
+class CicloConsultasTests(TestCase):
+    AGORA = timezone.make_aware(datetime.datetime(2030, 3, 10, 15, 30))
+    HOJE = datetime.date(2030, 3, 10)
+    ONTEM = datetime.date(2030, 3, 9)
+
+    def setUp(self):
+        self.paciente = criar_usuario('paciente')
+        self.psicologo = criar_psicologo('psi')
+
+    def consulta(self, status, data, hora, minuto=0):
+        return Consulta.objects.create(
+            usuario=self.paciente, psicologo=self.psicologo, data=data, horario=datetime.time(hora, minuto), status=status,
+        )
+
+    def status(self, consulta):
+        consulta.refresh_from_db()
+        return consulta.status
+
+    def test_transicoes(self):
+        confirmada = self.consulta('confirmada', self.ONTEM, 10)
+        agendada = self.consulta('agendada', self.HOJE, 14, 30)  # terminou às 15:30
+        em_andamento = self.consulta('agendada', self.HOJE, 14, 31)
+        futura = self.consulta('confirmada', self.HOJE, 18)
+        cancelada = self.consulta('cancelada_paciente', self.ONTEM, 9)
+        atualizada_em = confirmada.atualizada_em
+
+        totais = atualizar_consultas(agora=self.AGORA)
+        self.assertEqual((totais['realizada'], totais['notificacoes']), (2, 2))
+        # Sem confirmação, a consulta não vira falta
+        self.assertEqual(self.status(confirmada), 'realizada')
+        self.assertEqual(self.status(agendada), 'realizada')
+        for consulta, status in ((em_andamento, 'agendada'), (futura, 'confirmada'), (cancelada, 'cancelada_paciente')):
+            self.assertEqual(self.status(consulta), status)
+
+        tipos = sorted(Notificacao.objects.filter(destinatario=self.paciente).values_list('tipo', flat=True))
+        self.assertEqual(tipos, ['avaliacao', 'avaliacao'])
+        self.assertGreater(confirmada.atualizada_em, atualizada_em)  # marca d'água do resumo diário
+
+        # Uma segunda execução não encontra nada
+        self.assertEqual(atualizar_consultas(agora=self.AGORA)['notificacoes'], 0)
+        self.assertEqual(Notificacao.objects.count(), 2)
+
+    def test_faixas_de_id(self):
+        for hora in range(8, 15):
+            self.consulta('confirmada', self.ONTEM, hora)
+        faixas = []
+        totais = atualizar_consultas(tamanho_faixa=3, agora=self.AGORA, progresso=lambda *faixa: faixas.append(faixa))
+        self.assertEqual(totais['realizada'], 7)
+        self.assertEqual([total['realizada'] for _, _, total in faixas], [3, 3, 1])
+
+    def test_consultas_por_faixa_nao_dependem_do_numero_de_linhas(self):
+        def consultas_sql(quantidade, data):
+            for minuto in range(quantidade):
+                self.consulta('confirmada' if minuto % 2 else 'agendada', data, 10, minuto)
+            with CaptureQueriesContext(connections['default']) as contexto:
+                atualizar_consultas(agora=self.AGORA)
+            return len(contexto)
+
+        self.assertEqual(consultas_sql(2, self.ONTEM), consultas_sql(40, self.ONTEM - datetime.timedelta(days=1)))
+
+    def test_comando(self):
+        self.consulta('confirmada', datetime.date(2000, 1, 1), 10)
+        saida = io.StringIO()
+        call_command('atualizar_consultas', stdout=saida)
+        self.assertIn('1 realizadas, 1 notificações', saida.getvalue())
+
+    def test_falta_so_quando_registrada(self):
+        realizada = self.consulta('realizada', self.ONTEM, 10)
+        agendada = self.consulta('agendada', self.ONTEM, 11)
+        avaliada = self.consulta('realizada', self.ONTEM, 12)
+        Avaliacao.objects.create(consulta=avaliada, nota=5)
+        em_andamento = self.consulta('confirmada', self.HOJE, 15)
+        cancelada = self.consulta('cancelada_psicologo', self.ONTEM, 9)
+        atualizada_em = realizada.atualizada_em
+
+        ids = [realizada.id, agendada.id, avaliada.id, em_andamento.id, cancelada.id]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(registrar_faltas(ids, agora=self.AGORA), 2)
+        self.assertEqual(
+            [self.status(consulta) for consulta in (realizada, agendada, avaliada, em_andamento, cancelada)],
+            ['faltou', 'faltou', 'realizada', 'confirmada', 'cancelada_psicologo'],
+        )
+        self.assertGreater(realizada.atualizada_em, atualizada_em)  # entra no resumo diário
+        self.assertEqual(list(Notificacao.objects.values_list('tipo', flat=True)), ['consulta', 'consulta'])
+
+    def test_acao_do_admin(self):
+        equipe = Usuario.objects.create_superuser('equipe', 'equipe@example.com', 'senha-de-teste-123')
+        consulta = self.consulta('agendada', datetime.date(2000, 1, 1), 10)
+        self.client.force_login(equipe)
+        response = self.client.post(
+            reverse('admin:app_consulta_changelist'),
+            {'action': 'registrar_falta', '_selected_action': [consulta.id]},
+            follow=True,
+        )
+        self.assertContains(response, '1 falta(s) registrada(s) de 1 consulta(s)')
+        self.assertEqual(self.status(consulta), 'faltou')
+
+
+# --- Chat por WebSocket ---
+
+@override_settings(ALLOWED_HOSTS=['localhost', 'testserver'], THROTTLE_TAXAS={'apoio_emocional': '3/min'})
+class ChatWebSocketTests(LimparCachesMixin, TestCase):
+    ORIGEM = [(b'host', b'localhost:8000'), (b'origin', b'http://localhost:8000')]
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = criar_usuario('paciente')
+        self.client.force_login(self.usuario)
+        self.sessao = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def cabecalhos(self, cookie=None):
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.sessao}' if cookie is None else cookie
+        return self.ORIGEM + [(b'cookie', cookie.encode())]
+
+    def conversar(self, cabecalhos, eventos, caminho=CAMINHO):
+        """Roda a aplicação ASGI com os eventos dados (textos viram frames; funções são chamadas)."""
+        async def http(scope, receive, send):
+            raise AssertionError('não é HTTP')
+
+        async def conversa():
+            pendentes = [{'type': 'websocket.connect'}, *eventos, {'type': 'websocket.disconnect', 'code': 1000}]
+            enviados = []
+
+            async def receive():
+                evento = pendentes.pop(0)
+                while callable(evento):
+                    await sync_to_async(evento)()
+                    evento = pendentes.pop(0)
+                if isinstance(evento, str):
+                    evento = {'type': 'websocket.receive', 'text': evento}
+                return evento
+
+            async def send(mensagem):
+                enviados.append(mensagem)
+
+            scope = {'type': 'websocket', 'path': caminho, 'headers': cabecalhos, 'client': ('10.0.0.1', 5000)}
+            await rotear_websockets(http)(scope, receive, send)
+            return enviados
+
+        return async_to_sync(conversa)()
+
+    def test_conversa_autenticada(self):
+        enviados = self.conversar(self.cabecalhos(), [json.dumps({'mensagem': 'Estou ansioso'}), 'lixo'])
+        self.assertEqual(enviados[0], {'type': 'websocket.accept'})
+        self.assertEqual(json.loads(enviados[1]['text'])['resposta'], RESPOSTA_ANSIEDADE)
+        self.assertEqual(json.loads(enviados[2]['text']), {'error': 'Mensagem não pode estar vazia'})
+        self.assertEqual(InteracaoIA.objects.get(usuario=self.usuario).mensagem_usuario, 'Estou ansioso')
+
+    def test_origem_e_caminho(self):
+        outra_origem = [(b'host', b'localhost:8000'), (b'origin', b'http://exemplo.com')]
+        self.assertEqual(self.conversar(outra_origem, []), [{'type': 'websocket.close', 'code': 4403}])
+        outro_caminho = self.conversar(self.cabecalhos(), [], caminho='/ws/outro/')
+        self.assertEqual(outro_caminho, [{'type': 'websocket.close', 'code': 4404}])
+
+    def test_cookie_malformado_nao_descarta_a_sessao(self):
+        cookie = f'a"b=1; {settings.SESSION_COOKIE_NAME}={self.sessao}; x=[y'
+        self.conversar(self.cabecalhos(cookie), [json.dumps({'mensagem': 'oi'})])
+        self.assertTrue(InteracaoIA.objects.filter(usuario=self.usuario).exists())
+
+    def test_logout_fecha_o_socket(self):
+        mensagem = json.dumps({'mensagem': 'oi'})
+        logout = Session.objects.filter(session_key=self.sessao).delete
+        enviados = self.conversar(self.cabecalhos(), [mensagem, logout, mensagem])
+        self.assertEqual([m['type'] for m in enviados], ['websocket.accept', 'websocket.send', 'websocket.close'])
+        self.assertEqual(enviados[-1]['code'], 4401)
+
+    def test_limite_compartilhado_com_o_post(self):
+        mensagem = json.dumps({'mensagem': 'oi'})
+        enviados = self.conversar(self.cabecalhos(), [mensagem] * 4)
+        respostas = [json.loads(m['text']) for m in enviados if m['type'] == 'websocket.send']
+        self.assertEqual(sum('resposta' in r for r in respostas), 3)
+        self.assertGreaterEqual(respostas[-1]['retry_after'], 1)
+
+        # O POST do mesmo usuário, mesmo de outro IP, já encontra o limite esgotado
+        response = self.client.post(reverse('apoio_emocional'), {'mensagem': 'oi'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+
+    def test_anonimo_limitado_pelo_ip(self):
+        self.conversar(self.cabecalhos(''), [json.dumps({'mensagem': 'oi'})] * 3)
+        self.client.logout()
+        response = self.client.post(reverse('apoio_emocional'), {'mensagem': 'oi'}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+
+
+# --- Resumo diário e relatório de utilização ---
+
+class UtilizacaoTests(TestCase):
+    def setUp(self):
+        self.paciente = criar_usuario('paciente')
+        self.psicologo = criar_psicologo('psi')
+        for dia in range(7):
+            HorarioDisponivel.objects.create(
+                psicologo=self.psicologo, dia_semana=dia, hora_inicio=datetime.time(8), hora_fim=datetime.time(12),
+            )
+        self.hoje = timezone.localdate()
+        self.dia = self.hoje - datetime.timedelta(days=3)
+        self.realizada = self.consulta(self.dia, 8, 'realizada')
+        self.consulta(self.dia, 9, 'faltou')
+        self.consulta(self.dia, 10, 'cancelada_paciente')
+        self.outra = self.consulta(self.dia - datetime.timedelta(days=1), 8, 'realizada')
+        # Alteradas antes da primeira execução: as próximas só pegam o que mudar depois
+        Consulta.objects.update(atualizada_em=timezone.now() - datetime.timedelta(hours=1))
+
+    def consulta(self, data, hora, status):
+        return Consulta.objects.create(
+            usuario=self.paciente, psicologo=self.psicologo, data=data, horario=datetime.time(hora), status=status,
+        )
+
+    def resumo(self, data=None):
+        return ResumoDiarioConsultas.objects.get(psicologo=self.psicologo, data=data or self.dia)
+
+    def test_primeira_execucao(self):
+        execucao = atualizar_resumos(ofertas_desde=self.hoje - datetime.timedelta(days=7))
+        self.assertEqual(execucao.pares_recalculados, 2)
+        resumo = self.resumo()
+        self.assertEqual(
+            (resumo.minutos_ofertados, resumo.minutos_reservados, resumo.consultas, resumo.realizadas,
+             resumo.faltas, resumo.canceladas_paciente),
+            (240, 120, 3, 1, 1, 1),
+        )
+        self.assertEqual(resumo.semana.weekday(), 0)
+        # Dias congelados também sem consultas
+        self.assertEqual(self.resumo(self.hoje).minutos_ofertados, 240)
+
+    def test_execucao_incremental(self):
+        atualizar_resumos(ofertas_desde=self.dia)
+        self.realizada.status = 'faltou'
+        self.realizada.save()
+        HorarioDisponivel.objects.update(hora_fim=datetime.time(10))
+
+        execucao = atualizar_resumos()
+        self.assertEqual(execucao.pares_recalculados, 1)
+        self.assertEqual((self.resumo().realizadas, self.resumo().faltas), (0, 2))
+        # A oferta dos dias já congelados não muda com a agenda atual
+        self.assertEqual(self.resumo().minutos_ofertados, 240)
+
+    def test_reconstruir_apos_exclusao(self):
+        atualizar_resumos(ofertas_desde=self.dia)
+        self.outra.delete()
+        atualizar_resumos(reconstruir=True)
+        self.assertEqual(self.resumo(self.outra.data).consultas, 0)
+
+    def test_relatorio_semanal(self):
+        atualizar_resumos(ofertas_desde=self.hoje - datetime.timedelta(days=14))
+        linhas = relatorio_semanal(self.dia, self.dia)
+        self.assertEqual(len(linhas), 1)
+        linha = linhas[0]
+        self.assertEqual(linha['utilizacao'], 0.5)
+        self.assertEqual(linha['taxa_faltas'], 0.5)
+        self.assertAlmostEqual(linha['taxa_cancelamento'], 1 / 3)
+
+        # Relatório lido só do resumo, sem tocar nas consultas
+        with CaptureQueriesContext(connections['default']) as contexto:
+            relatorio_semanal(self.hoje - datetime.timedelta(days=14), self.hoje)
+        self.assertNotIn('app_consulta', contexto.captured_queries[0]['sql'])
+
+    def test_view_csv_so_para_a_equipe(self):
+        atualizar_resumos(ofertas_desde=self.dia)
+        url = reverse('relatorio_utilizacao')
+        self.client.force_login(self.paciente)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.paciente.is_staff = True
+        self.paciente.save()
+        response = self.client.get(url, {'inicio': self.dia.isoformat(), 'fim': self.dia.isoformat(), 'formato': 'csv'})
+        linhas = response.content.decode().splitlines()
+        self.assertEqual(linhas[0].split(',')[:3], ['semana', 'psicologo_id', 'psicologo'])
+        self.assertEqual(linhas[1].split(',')[3:5], ['4.0', '2.0'])
+
+
+# --- Lista de espera e horário ocupado ---
+
+class ListaEsperaTests(LimparCachesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.psicologo = criar_psicologo('psi')
+        self.paciente = criar_usuario('paciente')
+        self.primeiro = criar_usuario('primeiro')
+        self.segundo = criar_usuario('segundo')
+        self.consulta = criar_consulta(self.paciente, self.psicologo, dias=2)
+        self.data, self.horario = self.consulta.data, self.consulta.horario
+
+    def esperar(self, usuario, inicio=0, fim=10):
+        hoje = timezone.localdate()
+        return ListaEspera.objects.create(
+            usuario=usuario, psicologo=self.psicologo,
+            data_inicio=hoje + datetime.timedelta(days=inicio), data_fim=hoje + datetime.timedelta(days=fim),
+        )
+
+    def cancelar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consulta.status = 'cancelada_paciente'
+            self.consulta.save()
+
+    def agendar(self, usuario):
+        self.client.force_login(usuario)
+        self.client.post(reverse('agendamento'), {
+            'psicologo': self.psicologo.id, 'data': self.data.isoformat(), 'horario': self.horario.strftime('%H:%M'),
+        })
+        return Consulta.objects.filter(usuario=usuario, data=self.data, horario=self.horario).exists()
+
+    def test_horario_ocupado_e_liberado_pelo_cancelamento(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            criar_consulta(self.primeiro, self.psicologo, dias=2)
+        self.cancelar()
+        criar_consulta(self.primeiro, self.psicologo, dias=2)
+        self.assertEqual(Consulta.objects.filter(data=self.data, horario=self.horario).count(), 2)
+
+    def test_cancelamento_oferece_ao_primeiro_da_fila(self):
+        fora_da_janela = self.esperar(self.segundo, inicio=5)
+        primeiro = self.esperar(self.primeiro)
+        segundo = self.esperar(self.segundo)
+        self.esperar(self.paciente)  # quem cancelou não recebe o próprio horário
+        self.cancelar()
+
+        primeiro.refresh_from_db()
+        oferta = (primeiro.status, primeiro.oferta_data, primeiro.oferta_horario)
+        self.assertEqual(oferta, ('ofertada', self.data, self.horario))
+        self.assertEqual(Notificacao.objects.get(destinatario=self.primeiro).tipo, 'consulta')
+        self.assertEqual(ListaEspera.objects.filter(status='ofertada').count(), 1)
+        for entrada in (fora_da_janela, segundo):
+            entrada.refresh_from_db()
+            self.assertEqual(entrada.status, 'aguardando')
+
+    def test_reserva_vale_so_para_quem_recebeu(self):
+        primeiro = self.esperar(self.primeiro)
+        self.cancelar()
+        self.assertFalse(self.agendar(self.segundo))
+        self.assertTrue(self.agendar(self.primeiro))
+        primeiro.refresh_from_db()
+        self.assertEqual(primeiro.status, 'atendida')
+
+        dia = timezone.localdate().isoformat()
+        self.assertEqual(metricas()['agendamento'][dia], {'tentativas': 2, 'conflitos': 1})
+        self.assertEqual(metricas()['lista_espera']['atendidas'], 1)
+
+    def test_reserva_expirada_vai_para_o_proximo(self):
+        primeiro = self.esperar(self.primeiro)
+        segundo = self.esperar(self.segundo)
+        self.cancelar()
+        self.assertEqual(expirar_reservas(), (0, 0))
+
+        depois = timezone.now() + datetime.timedelta(minutes=31)
+        self.assertEqual(expirar_reservas(agora=depois), (1, 1))
+        primeiro.refresh_from_db()
+        segundo.refresh_from_db()
+        self.assertEqual((primeiro.status, segundo.status), ('expirada', 'ofertada'))
+
+    def test_horario_passado_nao_e_oferecido(self):
+        self.esperar(self.primeiro, inicio=-5)
+        passada = criar_consulta(self.paciente, self.psicologo, dias=-1)
+        self.assertIsNone(oferecer_horario(self.psicologo.id, passada.data, passada.horario))
+
+    def test_formulario(self):
+        hoje = timezone.localdate()
+
+        def erros(inicio, fim, usuario=self.primeiro):
+            form = ListaEsperaForm(
+                {'psicologo': self.psicologo.id, 'data_inicio': inicio, 'data_fim': fim}, usuario=usuario,
+            )
+            return form.non_field_errors()
+
+        self.assertFalse(erros(hoje, hoje + datetime.timedelta(days=10)))
+        self.assertTrue(erros(hoje - datetime.timedelta(days=1), hoje))
+        self.assertTrue(erros(hoje + datetime.timedelta(days=2), hoje))
+        self.assertTrue(erros(hoje, hoje + datetime.timedelta(days=61)))
+        self.esperar(self.primeiro)
+        self.assertTrue(erros(hoje, hoje + datetime.timedelta(days=10)))
+
+
+# --- Hash de senhas fora do worker ---
+
+def encerrar_pool_de_hash():
+    if hashers._pool is not None:
+        hashers._pool.shutdown()
+        hashers._pool = None
+
+
+@override_settings(
+    HASH_PROCESSOS=0,
+    PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ],
+)
+class HashSenhasTests(TestCase):
+    def setUp(self):
+        self.cliente = AsyncClient()
+
+    def entrar(self, identificador, senha):
+        return async_to_sync(self.cliente.post)(reverse('login'), {'username': identificador, 'password': senha})
+
+    def test_login_refaz_hash_antigo(self):
+        usuario = criar_usuario('paciente')
+        usuario.password = make_password('senha-antiga-123', hasher='md5')
+        usuario.save()
+
+        self.assertEqual(self.entrar('paciente', 'errada').status_code, 200)
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.password.startswith('md5$'))
+
+        resposta = self.entrar('PACIENTE@example.com', 'senha-antiga-123')
+        self.assertRedirects(resposta, reverse('home'), fetch_redirect_response=False)
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(usuario.check_password('senha-antiga-123'))
+
+    def test_verificar_senha(self):
+        codificado = make_password('segredo', hasher='md5')
+        correta, novo_hash = verificar_senha('segredo', codificado)
+        self.assertTrue(correta)
+        self.assertTrue(check_password('segredo', novo_hash))
+        self.assertEqual(verificar_senha('segredo', make_password('segredo')), (True, None))
+        self.assertEqual(verificar_senha('outra', codificado), (False, None))
+
+    @override_settings(HASH_PROCESSOS=2)
+    def test_processo_do_pool_morto(self):
+        criar_usuario('paciente')
+        hashers.iniciar_pool()
+        self.addCleanup(encerrar_pool_de_hash)
+        quebrado = hashers._pool
+        processo = next(iter(quebrado._processes.values()))
+        processo.kill()
+        processo.join()
+        while not quebrado._broken:  # o pool percebe a morte numa thread própria
+            time.sleep(0.01)
+
+        resposta = self.entrar('paciente', 'senha-de-teste-123')
+        self.assertRedirects(resposta, reverse('home'), fetch_redirect_response=False)
+        self.assertIsNot(hashers._pool, quebrado)
+
+    def test_cadastro(self):
+        dados = {
+            'username': 'novo', 'email': 'Novo@Example.com', 'first_name': 'Novo', 'last_name': 'Paciente',
+            'password1': 'Senha-Forte-2024', 'password2': 'Senha-Forte-2024',
+        }
+        resposta = async_to_sync(self.cliente.post)(reverse('registro'), dados)
+        self.assertRedirects(resposta, reverse('login'), fetch_redirect_response=False)
+        usuario = Usuario.objects.get(username='novo')
+        self.assertEqual(usuario.email, 'novo@example.com')
+        self.assertTrue(usuario.check_password('Senha-Forte-2024'))
+
+
+@override_settings(HASH_PROCESSOS=2)
+class PoolHashTests(SimpleTestCase):
+    def tearDown(self):
+        encerrar_pool_de_hash()
+
+    def test_pool_sobe_todos_os_processos(self):
+        self.assertEqual(hashers.iniciar_pool(), 2)
+        codificado = async_to_sync(hashers.agerar_hash)('segredo')
+        self.assertEqual(async_to_sync(hashers.averificar_senha)('segredo', codificado), (True, None))
+
+    @override_settings(HASH_PROCESSOS=0)
+    def test_sem_pool(self):
+        self.assertEqual(hashers.iniciar_pool(), 0)
+        self.assertTrue(check_password('segredo', async_to_sync(hashers.agerar_hash)('segredo')))
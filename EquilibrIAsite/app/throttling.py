@@ -0,0 +1,91 @@
+"""
+Limitação de taxa guardada no cache compartilhado.
+
+Cada par (rota, cliente) pode fazer ``capacidade`` requisições por janela
+de ``capacidade / taxa`` segundos (20/min: 20 por minuto). A contagem é
+uma janela deslizante: o contador da janela atual mais o da anterior,
+proporcional ao tempo que ela ainda cobre. Os contadores usam só add e
+incr/decr do cache, que são atômicos: requisições simultâneas de uma
+rajada recebem contagens diferentes e só as que cabem no limite passam.
+Sem ficha, a requisição é recusada e o cliente recebe em quantos segundos
+poderá tentar de novo.
+
+O cliente é o usuário logado (pela sessão, sem consultar a tabela de
+usuários), para que pacientes atrás do mesmo NAT ou proxy não dividam o
+limite; sem login, o IP. Sem cookie de sessão, a recusa não custa nenhuma
+consulta ao banco; com um cookie, custa a leitura da sessão, que a
+requisição permitida faria de qualquer forma (nenhuma, com sessões em cache).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+
+UNIDADES = {'s': 1, 'seg': 1, 'min': 60, 'h': 3600, 'hora': 3600}
+
+
+def interpretar_taxa(taxa):
+    """Converte '20/min' em (capacidade, fichas por segundo)."""
+    quantidade, unidade = taxa.split('/')
+    quantidade = int(quantidade)
+    return quantidade, quantidade / UNIDADES[unidade]
+
+
+def _incrementar(cache, chave, timeout):
+    cache.add(chave, 0, timeout)
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        # A chave expirou entre o add e o incr
+        cache.add(chave, 1, timeout)
+        return 1
+
+
+def consumir_ficha(chave, capacidade, por_segundo, agora=None):
+    """
+    Tenta consumir uma ficha do limite ``chave``.
+    Devolve (permitido, segundos até poder tentar de novo).
+    """
+    cache = caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+    agora = time.time() if agora is None else agora
+    janela = capacidade / por_segundo
+    indice = int(agora // janela)
+    decorrido = agora - indice * janela
+
+    atual = f'{chave}:{indice}'
+    # A janela ainda é lida como "anterior" durante a seguinte
+    contagem = _incrementar(cache, atual, int(2 * janela) + 1)
+    anterior = cache.get(f'{chave}:{indice - 1}', 0)
+    excesso = anterior * (1 - decorrido / janela) + contagem - capacidade
+    if excesso <= 0:
+        return True, 0
+
+    try:
+        cache.decr(atual)  # recusada não conta
+    except ValueError:
+        pass
+    restante = janela - decorrido
+    # A parte da janela anterior cai a anterior / janela por segundo
+    espera = min(excesso * janela / anterior, restante) if anterior else restante
+    return False, espera
+
+
+def cliente_por_ip(ip, encaminhado=None):
+    """Chave do cliente a partir do IP da conexão (ou do último de X-Forwarded-For)."""
+    if encaminhado and getattr(settings, 'THROTTLE_USAR_X_FORWARDED_FOR', False):
+        ip = encaminhado.split(',')[-1].strip()
+    return f'ip:{ip}'
+
+
+def cliente_por_usuario(usuario_id):
+    return f'u:{usuario_id}'
+
+
+def identificar_cliente(request):
+    """Usuário da sessão ou, sem login, o IP."""
+    session = getattr(request, 'session', None)
+    usuario_id = session.get(SESSION_KEY) if session is not None else None
+    if usuario_id:
+        return cliente_por_usuario(usuario_id)
+    return cliente_por_ip(request.META.get('REMOTE_ADDR', ''), request.META.get('HTTP_X_FORWARDED_FOR'))
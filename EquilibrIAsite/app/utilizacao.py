@@ -0,0 +1,212 @@
+"""
+Utilização da agenda e taxas de falta e cancelamento por psicólogo.
+A taxa de faltas é a das faltas registradas pela equipe sobre as consultas
+encerradas (realizadas + faltas); ver app/ciclo_consultas.py.
+
+Os relatórios leem só o resumo diário (ResumoDiarioConsultas), nunca as
+consultas: o custo depende do período pedido, não do tamanho do histórico.
+O resumo é mantido por atualizar_resumos(), de forma incremental:
+
+- consultas alteradas desde a última execução (Consulta.atualizada_em, com
+  uma folga para transações que confirmaram depois da marca) indicam os
+  pares (psicólogo, dia) a recalcular; cada par é recalculado por inteiro a
+  partir das consultas, então reprocessar um par não muda o resultado;
+- os dias que chegaram desde a última execução recebem os minutos
+  ofertados por cada psicólogo (HorarioDisponivel do dia da semana). Dias
+  já congelados não mudam quando a agenda de disponibilidade muda depois.
+  Como não há histórico de disponibilidade, a primeira execução congela a
+  partir do dia corrente, a menos que receba ofertas_desde (aproximação:
+  aplica os horários atuais aos dias passados).
+
+Consultas excluídas ou que trocaram de data/psicólogo só saem do dia
+antigo com reconstruir=True (comando atualizar_resumos_consultas --reconstruir).
+"""
+import datetime
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Consulta, ExecucaoRollup, HorarioDisponivel, ResumoDiarioConsultas
+
+FOLGA = datetime.timedelta(minutes=5)
+STATUS_RESERVADOS = ('agendada', 'confirmada', 'realizada', 'faltou')
+CAMPOS_CONTAGEM = [
+    'minutos_reservados', 'consultas', 'realizadas', 'faltas', 'canceladas_paciente', 'canceladas_psicologo',
+]
+CAMPOS_SOMADOS = ['minutos_ofertados'] + CAMPOS_CONTAGEM
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def ofertas_por_dia_da_semana(psicologo_ids=None):
+    """{psicologo_id: [minutos de segunda, ..., domingo]} pelos horários atuais."""
+    horarios = HorarioDisponivel.objects.order_by()
+    if psicologo_ids is not None:
+        horarios = horarios.filter(psicologo_id__in=psicologo_ids)
+    ofertas = defaultdict(lambda: [0] * 7)
+    for psicologo_id, dia, inicio, fim in horarios.values_list('psicologo_id', 'dia_semana', 'hora_inicio', 'hora_fim'):
+        ofertas[psicologo_id][dia] += max(0, _minutos(fim) - _minutos(inicio))
+    return ofertas
+
+
+def _contagens(pares):
+    """Contagens das consultas de cada par (psicologo_id, data), num único GROUP BY."""
+    duracao = getattr(settings, 'CONSULTA_DURACAO_MINUTOS', 60)
+    linhas = (
+        Consulta.objects
+        .filter(psicologo_id__in={p for p, _ in pares}, data__in={d for _, d in pares})
+        .order_by()
+        .values('psicologo_id', 'data')
+        .annotate(
+            consultas=Count('id'),
+            reservadas=Count('id', filter=Q(status__in=STATUS_RESERVADOS)),
+            realizadas=Count('id', filter=Q(status='realizada')),
+            faltas=Count('id', filter=Q(status='faltou')),
+            canceladas_paciente=Count('id', filter=Q(status='cancelada_paciente')),
+            canceladas_psicologo=Count('id', filter=Q(status='cancelada_psicologo')),
+        )
+    )
+    contagens = {}
+    for linha in linhas:
+        par = (linha.pop('psicologo_id'), linha.pop('data'))
+        if par in pares:  # o filtro por IN traz pares a mais
+            linha['minutos_reservados'] = linha.pop('reservadas') * duracao
+            contagens[par] = linha
+    return contagens
+
+
+def recalcular_pares(pares, ofertas_ate, lote=1000):
+    """
+    Regrava as contagens dos pares a partir das consultas. Pares novos em
+    dias ainda não congelados recebem a oferta atual; nos já congelados,
+    não ter linha significava oferta zero.
+    """
+    # Ordenados por dia: cada lote cobre poucos dias e o IN de datas fica curto
+    pares = sorted(pares, key=lambda par: (par[1], par[0]))
+    for inicio in range(0, len(pares), lote):
+        trecho = set(pares[inicio:inicio + lote])
+        contagens = _contagens(trecho)
+        ofertas = ofertas_por_dia_da_semana({p for p, _ in trecho})
+        resumos = [
+            ResumoDiarioConsultas(
+                psicologo_id=psicologo_id,
+                data=data,
+                semana=ResumoDiarioConsultas.semana_de(data),
+                minutos_ofertados=ofertas[psicologo_id][data.weekday()] if data > ofertas_ate else 0,
+                **contagens.get((psicologo_id, data), {}),
+            )
+            for psicologo_id, data in trecho
+        ]
+        ResumoDiarioConsultas.objects.bulk_create(
+            resumos,
+            update_conflicts=True,
+            unique_fields=['psicologo', 'data'],
+            update_fields=CAMPOS_CONTAGEM,
+        )
+    return len(pares)
+
+
+def congelar_ofertas(desde, ate, lote=5000):
+    """Grava os minutos ofertados de cada psicólogo nos dias de desde a ate."""
+    if desde > ate:
+        return 0
+    ofertas = ofertas_por_dia_da_semana()
+    dias = (ate - desde).days + 1
+    resumos = []
+    for n in range(dias):
+        data = desde + datetime.timedelta(days=n)
+        semana = ResumoDiarioConsultas.semana_de(data)
+        resumos.extend(
+            ResumoDiarioConsultas(
+                psicologo_id=psicologo_id, data=data, semana=semana, minutos_ofertados=minutos[data.weekday()],
+            )
+            for psicologo_id, minutos in ofertas.items()
+            if minutos[data.weekday()]
+        )
+        if len(resumos) >= lote or n == dias - 1:
+            ResumoDiarioConsultas.objects.bulk_create(
+                resumos,
+                update_conflicts=True,
+                unique_fields=['psicologo', 'data'],
+                update_fields=['minutos_ofertados'],
+            )
+            resumos = []
+
+    # Dias em que o psicólogo tinha consultas, mas nenhum horário ofertado
+    for dia in range(7):
+        ofertantes = [psicologo_id for psicologo_id, minutos in ofertas.items() if minutos[dia]]
+        (
+            ResumoDiarioConsultas.objects
+            .filter(data__range=(desde, ate), data__iso_week_day=dia + 1)
+            .exclude(psicologo_id__in=ofertantes)
+            .exclude(minutos_ofertados=0)
+            .update(minutos_ofertados=0)
+        )
+    return dias
+
+
+def atualizar_resumos(reconstruir=False, lote=1000, ofertas_desde=None):
+    """Atualiza o resumo diário e registra a execução (ExecucaoRollup)."""
+    inicio = time.perf_counter()
+    marca = timezone.now()
+    hoje = timezone.localdate(marca)
+    ultima = ExecucaoRollup.objects.order_by('-id').first()
+
+    if ultima is None:
+        ofertas_ate = min(ofertas_desde or hoje, hoje) - datetime.timedelta(days=1)
+    else:
+        ofertas_ate = ultima.ofertas_ate
+
+    if reconstruir or ultima is None:
+        pares = set(Consulta.objects.order_by().values_list('psicologo_id', 'data').distinct())
+        # Linhas sem nenhuma consulta restante também precisam ser zeradas
+        pares |= set(ResumoDiarioConsultas.objects.exclude(consultas=0).values_list('psicologo_id', 'data'))
+    else:
+        pares = set(
+            Consulta.objects
+            .filter(atualizada_em__gte=ultima.marca - FOLGA)
+            .order_by()
+            .values_list('psicologo_id', 'data')
+            .distinct()
+        )
+
+    recalculados = recalcular_pares(pares, ofertas_ate, lote)
+    dias = congelar_ofertas(ofertas_ate + datetime.timedelta(days=1), hoje)
+    return ExecucaoRollup.objects.create(
+        marca=marca,
+        ofertas_ate=max(ofertas_ate, hoje),
+        pares_recalculados=recalculados,
+        dias_ofertados=dias,
+        duracao=time.perf_counter() - inicio,
+    )
+
+
+# --- Relatório ---
+
+def _taxa(parte, total):
+    return parte / total if total else None
+
+
+def relatorio_semanal(inicio, fim, psicologo_id=None):
+    """Uma linha por psicólogo e semana do período, com as taxas calculadas."""
+    resumos = ResumoDiarioConsultas.objects.filter(data__range=(inicio, fim))
+    if psicologo_id:
+        resumos = resumos.filter(psicologo_id=psicologo_id)
+    linhas = list(
+        resumos
+        .values('semana', 'psicologo_id', 'psicologo__nome')
+        .annotate(**{campo: Sum(campo) for campo in CAMPOS_SOMADOS})
+        .order_by('semana', 'psicologo__nome', 'psicologo_id')
+    )
+    for linha in linhas:
+        linha['utilizacao'] = _taxa(linha['minutos_reservados'], linha['minutos_ofertados'])
+        linha['taxa_faltas'] = _taxa(linha['faltas'], linha['realizadas'] + linha['faltas'])
+        linha['taxa_cancelamento'] = _taxa(
+            linha['canceladas_paciente'] + linha['canceladas_psicologo'], linha['consultas'],
+        )
+    return linhas
@@ -1,16 +1,33 @@
+import csv
+import datetime
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
 from django.views import View
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import aauthenticate, alogin, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.utils.decorators import method_decorator
-
-from .models import Psicologo, Consulta, InteracaoIA, HorarioDisponivel
-from .forms import RegistroForm, LoginForm
-
-import random
+from asgiref.sync import sync_to_async
+
+from .models import Psicologo, Consulta, HorarioDisponivel, ListaEspera, ResumoAvaliacoes, MensagemContato
+from .forms import RegistroForm, LoginForm, ListaEsperaForm
+from .ia import aresponder_mensagem
+from .contexto import acarregar_contexto, carregar_contexto
+from .recomendacao import NECESSIDADES, arecomendar_no_chat, recomendar, disponivel as recomendacao_disponivel
+from .db_router import atraso_replicas
+from .papeis import psicologo_requerido
+from .blog import etag_artigo, listar_artigos, obter_artigo
+from .exportacao import FORMATOS, agerar_exportacao, gerar_exportacao, nome_arquivo, tipo_conteudo
+from .utilizacao import relatorio_semanal
+from .lista_espera import horario_ocupado, metricas as metricas_agendamento, registrar_atendimento, registrar_tentativa, reservas_ativas
 
 # --- Views de Páginas Estáticas ---
 
@@ -30,15 +47,58 @@ class ServicosView(View):
 
 
 class ProfissionaisView(View):
+    POR_PAGINA = 30
+
     def get(self, request, *args, **kwargs):
-        psicologos = Psicologo.objects.all()
-        context = {'psicologos': psicologos}
+        ordem = request.GET.get('ordem')
+        if ordem == 'avaliacao':
+            # ORDER BY direto no índice de ResumoAvaliacoes, sem agregação
+            resumos = (
+                ResumoAvaliacoes.objects
+                .select_related('psicologo')
+                .order_by('-media_bayesiana', 'psicologo_id')
+            )
+            pagina = Paginator(resumos, self.POR_PAGINA).get_page(request.GET.get('pagina'))
+            psicologos = [resumo.psicologo for resumo in pagina]
+        else:
+            psicologos_qs = Psicologo.objects.select_related('resumo_avaliacoes').order_by('nome', 'id')
+            pagina = Paginator(psicologos_qs, self.POR_PAGINA).get_page(request.GET.get('pagina'))
+            psicologos = list(pagina)
+
+        context = {'psicologos': psicologos, 'pagina': pagina, 'ordem': ordem}
         return render(request, 'profissionais.html', context)
 
 
 class BlogView(View):
     def get(self, request, *args, **kwargs):
-        return render(request, 'blog.html')
+        # Paginação por chave: ?apos=<cursor> vem do link "Artigos anteriores"
+        cursor = request.GET.get('apos')
+        artigos, proximo_cursor = listar_artigos(cursor)
+        context = {
+            'artigos': artigos,
+            'proximo_cursor': proximo_cursor,
+            'primeira_pagina': not cursor,
+        }
+        return render(request, 'blog.html', context)
+
+
+class ArtigoView(View):
+    """
+    Página de um artigo: o HTML do corpo vem pronto do banco (ou do cache),
+    sem conversão de Markdown. Responde 304 quando a ETag não mudou.
+    """
+    def get(self, request, slug, *args, **kwargs):
+        artigo = obter_artigo(slug)
+        if artigo is None:
+            raise Http404('Artigo não encontrado.')
+
+        etag = etag_artigo(artigo, request)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = render(request, 'artigo.html', {'artigo': artigo})
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Cookie'])
+        return response
 
 
 class ContatoView(View):
@@ -58,9 +118,28 @@ class ContatoView(View):
             messages.error(request, 'Por favor, preencha todos os campos obrigatórios.')
             return render(request, 'contato.html')
         
-        # Simulação de envio de e-mail ou salvamento de contato
+        # Nome, e-mail e assunto vão para cabeçalhos do e-mail: quebras de linha são recusadas
+        if any('\r' in valor or '\n' in valor for valor in (nome, email, assunto)):
+            messages.error(request, 'Nome, e-mail e assunto não podem conter quebras de linha.')
+            return render(request, 'contato.html')
+        contato = MensagemContato(
+            nome=nome.strip(),
+            email=email.strip(),
+            telefone=(telefone or '').strip(),
+            assunto=assunto,
+            mensagem=mensagem,
+            aceito_newsletter=bool(aceito_newsletter),
+        )
+        try:
+            contato.full_clean()
+        except ValidationError as erro:
+            messages.error(request, ' '.join(erro.messages))
+            return render(request, 'contato.html')
+
+        # Só grava na caixa de saída: o e-mail é enviado pelo comando enviar_contatos,
+        # então a resposta não depende da latência do servidor de e-mail
         try:
-            # Aqui você implementaria a lógica real de envio de e-mail ou salvamento no DB
+            contato.save()
             messages.success(request, 'Sua mensagem foi enviada com sucesso! Entraremos em contato em breve.')
             return redirect('contato')
         except Exception as e:
@@ -70,17 +149,10 @@ class ContatoView(View):
 
 # --- Views de Gerenciamento de Horários ---
 
-@method_decorator(login_required, name='dispatch')
+@method_decorator(psicologo_requerido, name='dispatch')
 class HorarioDisponivelListView(View):
     def get(self, request, *args, **kwargs):
-        # ⚠️ Apenas psicólogos devem acessar esta view.
-        # Implementação de verificação de perfil de psicólogo é necessária.
-        try:
-            psicologo = Psicologo.objects.get(usuario=request.user)
-        except Psicologo.DoesNotExist:
-            messages.error(request, 'Acesso negado. Você não está cadastrado como psicólogo.')
-            return redirect('home')
-        
+        psicologo = request.perfil.psicologo
         horarios = HorarioDisponivel.objects.filter(psicologo=psicologo).order_by('dia_semana', 'hora_inicio')
         
         context = {
@@ -90,28 +162,17 @@ class HorarioDisponivelListView(View):
         }
         return render(request, 'horarios_list.html', context) # Template a ser criado
 
-@method_decorator(login_required, name='dispatch')
+@method_decorator(psicologo_requerido, name='dispatch')
 class HorarioDisponivelCreateView(View):
     def get(self, request, *args, **kwargs):
-        try:
-            psicologo = Psicologo.objects.get(usuario=request.user)
-        except Psicologo.DoesNotExist:
-            messages.error(request, 'Acesso negado. Você não está cadastrado como psicólogo.')
-            return redirect('home')
-        
         context = {
-            'psicologo': psicologo,
+            'psicologo': request.perfil.psicologo,
             'dias_semana': HorarioDisponivel.DIA_CHOICES
         }
         return render(request, 'horarios_create.html', context) # Template a ser criado
 
     def post(self, request, *args, **kwargs):
-        try:
-            psicologo = Psicologo.objects.get(usuario=request.user)
-        except Psicologo.DoesNotExist:
-            messages.error(request, 'Acesso negado. Você não está cadastrado como psicólogo.')
-            return redirect('home')
-        
+        psicologo = request.perfil.psicologo
         dia_semana = request.POST.get('dia_semana')
         hora_inicio = request.POST.get('hora_inicio')
         hora_fim = request.POST.get('hora_fim')
@@ -140,7 +201,14 @@ class HorarioDisponivelCreateView(View):
 class AgendamentoView(View):
     def get(self, request, *args, **kwargs):
         psicologos = Psicologo.objects.all()
-        context = {'psicologos': psicologos}
+        ofertas = ListaEspera.objects.filter(
+            usuario=request.user, status='ofertada', oferta_expira_em__gt=timezone.now(),
+        ).select_related('psicologo')
+        context = {
+            'psicologos': psicologos,
+            'ofertas': ofertas,
+            'form_espera': ListaEsperaForm(usuario=request.user),
+        }
         return render(request, 'agendamento.html', context)
     
     def post(self, request, *args, **kwargs):
@@ -157,27 +225,34 @@ class AgendamentoView(View):
         try:
             psicologo = get_object_or_404(Psicologo, id=psicologo_id)
             
-            # ⚠️ Correção: use os nomes de campo ATUALIZADOS (sem 'id_')
-            consulta_existente = Consulta.objects.filter(
-                psicologo=psicologo,
-                data=data,
-                horario=horario,
-                status='agendada'
-            ).exists()
-            
-            if consulta_existente:
-                messages.error(request, 'Este horário já está ocupado. Escolha outro horário.')
+            # Horário ocupado, ou reservado para outro paciente da lista de espera
+            reservado = reservas_ativas(psicologo.id, data, horario).exclude(usuario=request.user).exists()
+            if reservado or horario_ocupado(psicologo.id, data, horario):
+                registrar_tentativa(conflito=True)
+                messages.error(
+                    request,
+                    'Este horário já está ocupado. Escolha outro horário ou entre na lista de espera.',
+                )
                 return redirect('agendamento')
             
-            # ⚠️ Correção: use os nomes corretos ao criar
-            consulta = Consulta.objects.create(
-                usuario=request.user,
-                psicologo=psicologo,
-                data=data,
-                horario=horario,
-                status='agendada'
-            )
+            try:
+                with transaction.atomic():
+                    # ⚠️ Correção: use os nomes corretos ao criar
+                    consulta = Consulta.objects.create(
+                        usuario=request.user,
+                        psicologo=psicologo,
+                        data=data,
+                        horario=horario,
+                        status='agendada'
+                    )
+                    registrar_atendimento(request.user.id, psicologo.id, data, horario)
+            except IntegrityError:
+                # Outro paciente agendou o mesmo horário entre a verificação e a gravação
+                registrar_tentativa(conflito=True)
+                messages.error(request, 'Este horário acabou de ser ocupado. Escolha outro horário.')
+                return redirect('agendamento')
             
+            registrar_tentativa(conflito=False)
             messages.success(request, f'Consulta agendada com sucesso para {data} às {horario} com {psicologo.nome}!')
             return redirect('agendamento')
             
@@ -186,57 +261,58 @@ class AgendamentoView(View):
             return redirect('agendamento')
 
 
+@login_required
+def lista_espera_view(request):
+    """Inscreve o usuário na lista de espera de um psicólogo (app/lista_espera.py)."""
+    if request.method != 'POST':
+        return redirect('agendamento')
+    form = ListaEsperaForm(request.POST, usuario=request.user)
+    if form.is_valid():
+        entrada = form.save(commit=False)
+        entrada.usuario = request.user
+        entrada.save()
+        messages.success(
+            request,
+            f'Você entrou na lista de espera de {entrada.psicologo.nome}. Avisaremos se um horário abrir no período.',
+        )
+    else:
+        for erro in form.non_field_errors() or [erro for erros in form.errors.values() for erro in erros]:
+            messages.error(request, erro)
+    return redirect('agendamento')
+
+
 # --- Views de Apoio Emocional (IA) ---
 
 class ApoioEmocionalView(View):
-    def get(self, request, *args, **kwargs):
-        return render(request, 'apoio_emocional.html')
+    """
+    View assíncrona: sob ASGI, enquanto espera a IA e o banco, não ocupa
+    uma thread do worker.
+    """
+    async def get(self, request, *args, **kwargs):
+        # A renderização acessa a sessão e o usuário de forma síncrona
+        return await sync_to_async(render)(request, 'apoio_emocional.html')
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         mensagem_usuario = request.POST.get('mensagem')
         
         if not mensagem_usuario:
             return JsonResponse({'error': 'Mensagem não pode estar vazia'}, status=400)
         
         try:
-            resposta_ia = self.gerar_resposta_ia(mensagem_usuario)
-            
-            if request.user.is_authenticated:
-                # ⚠️ Correção: use 'usuario', não 'id_usuario'
-                InteracaoIA.objects.create(
-                    usuario=request.user,
-                    mensagem_usuario=mensagem_usuario,
-                    resposta_ia=resposta_ia
-                )
-            
-            return JsonResponse({
+            usuario = await request.auser()
+            contexto = await acarregar_contexto(usuario.id) if usuario.is_authenticated else None
+            resposta_ia = await aresponder_mensagem(usuario, mensagem_usuario, contexto)
+            dados = {
                 'resposta': resposta_ia,
                 'timestamp': timezone.now().isoformat()
-            })
+            }
+            recomendacoes = await arecomendar_no_chat(usuario, mensagem_usuario, contexto)
+            if recomendacoes:
+                dados['recomendacoes'] = recomendacoes
+            
+            return JsonResponse(dados)
         except Exception as e:
             return JsonResponse({'error': 'Erro interno do servidor'}, status=500)
-    
-    def gerar_resposta_ia(self, mensagem):
-        respostas_exemplo = [
-            "Entendo que você está passando por um momento difícil. É importante reconhecer seus sentimentos. Que tal tentarmos um exercício de respiração?",
-            "Obrigado por compartilhar isso comigo. Seus sentimentos são válidos. Como posso te ajudar melhor neste momento?",
-            "Percebo que você está enfrentando desafios. Lembre-se de que buscar ajuda é um sinal de força, não de fraqueza.",
-            "É normal sentir-se assim às vezes. Vamos trabalhar juntos para encontrar estratégias que possam te ajudar.",
-        ]
-        
-        mensagem_lower = mensagem.lower()
-        
-        if any(palavra in mensagem_lower for palavra in ['ansioso', 'ansiedade', 'nervoso']):
-            return "Entendo que você está sentindo ansiedade. Vamos tentar um exercício de respiração: inspire por 4 segundos, segure por 4, expire por 6. Repita algumas vezes. Como você está se sentindo agora?"
-        
-        elif any(palavra in mensagem_lower for palavra in ['triste', 'deprimido', 'sozinho']):
-            return "Sinto muito que você esteja se sentindo assim. Seus sentimentos são válidos e você não está sozinho. Às vezes, conversar sobre o que está acontecendo pode ajudar. Gostaria de me contar mais sobre o que está te deixando triste?"
-        
-        elif any(palavra in mensagem_lower for palavra in ['estresse', 'estressado', 'pressão']):
-            return "O estresse pode ser muito desafiador. Uma técnica que pode ajudar é a regra 5-4-3-2-1: identifique 5 coisas que você pode ver, 4 que pode tocar, 3 que pode ouvir, 2 que pode cheirar e 1 que pode saborear. Isso pode te ajudar a se conectar com o momento presente."
-        
-        else:
-            return random.choice(respostas_exemplo)
 
 
 class EmergenciaView(View):
@@ -246,28 +322,27 @@ class EmergenciaView(View):
 
 # --- Views de Autenticação ---
 
-def registro_view(request):
-    if request.user.is_authenticated:
+async def registro_view(request):
+    # Assíncrona: o hash da senha roda no pool de app/hashers.py, sem ocupar o worker
+    if (await request.auser()).is_authenticated:
         return redirect('home')
 
     if request.method == 'POST':
         form = RegistroForm(request.POST)
-        if form.is_valid():
-            user = form.save(commit=False)
-            user.is_active = True # Ativa o usuário por padrão
-            user.save()
+        if await sync_to_async(form.is_valid)():
+            user = await form.asave()
             messages.success(request, f'Conta criada com sucesso para {user.username}! Você já pode fazer login.')
             return redirect('login')
         else:
             messages.error(request, 'Corrija os erros abaixo.')
     else:
         form = RegistroForm()
-                
-    return render(request, 'registro.html', {'form': form})
 
+    return await sync_to_async(render)(request, 'registro.html', {'form': form})
 
-def login_view(request):
-    if request.user.is_authenticated:
+
+async def login_view(request):
+    if (await request.auser()).is_authenticated:
         return redirect('home')
 
     if request.method == 'POST':
@@ -275,16 +350,16 @@ def login_view(request):
         if form.is_valid():
             username = form.cleaned_data['username']
             password = form.cleaned_data['password']
-            user = authenticate(request, username=username, password=password)
+            user = await aauthenticate(request, username=username, password=password)
             if user is not None:
-                login(request, user)
+                await alogin(request, user)
                 messages.success(request, f'Bem-vindo(a) de volta, {user.first_name}!')
                 return redirect('home')
             else:
                 messages.error(request, 'Usuário ou senha inválidos.')
     else:
         form = LoginForm()
-    return render(request, 'login.html', {'form': form})
+    return await sync_to_async(render)(request, 'login.html', {'form': form})
 
 
 @login_required
@@ -308,9 +383,30 @@ def perfil_view(request):
     }
     return render(request, 'perfil.html', context)
 
+
+@login_required
+def exportar_dados_view(request):
+    """
+    Exporta os dados pessoais do usuário logado (portabilidade - LGPD).
+    A resposta é transmitida em blocos, sem montar o arquivo em memória.
+    """
+    formato = request.GET.get('formato', 'jsonl')
+    if formato not in FORMATOS:
+        return JsonResponse({'error': 'Formato inválido'}, status=400)
+    compactar = request.GET.get('gzip') in ('1', 'true')
+
+    # Sob ASGI, só um iterador assíncrono é transmitido sem ser consumido antes
+    gerar = agerar_exportacao if isinstance(request, ASGIRequest) else gerar_exportacao
+    response = StreamingHttpResponse(
+        gerar(request.user, formato=formato, compactar=compactar),
+        content_type=tipo_conteudo(formato, compactar),
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo(request.user, formato, compactar)}"'
+    return response
+
 # --- API para chat com IA ---
 
-def chat_ia_api(request):
+async def chat_ia_api(request):
     """
     Simula a resposta de uma IA para o chat de apoio emocional.
     """
@@ -320,41 +416,100 @@ def chat_ia_api(request):
         if not mensagem_usuario:
             return JsonResponse({'error': 'Mensagem não pode estar vazia'}, status=400)
         
-        # Lógica de simulação de resposta da IA (copiada da ApoioEmocionalView)
-        respostas_exemplo = [
-            "Entendo que você está passando por um momento difícil. É importante reconhecer seus sentimentos. Que tal tentarmos um exercício de respiração?",
-            "Obrigado por compartilhar isso comigo. Seus sentimentos são válidos. Como posso te ajudar melhor neste momento?",
-            "Percebo que você está enfrentando desafios. Lembre-se de que buscar ajuda é um sinal de força, não de fraqueza.",
-            "É normal sentir-se assim às vezes. Vamos trabalhar juntos para encontrar estratégias que possam te ajudar.",
-        ]
-        
-        mensagem_lower = mensagem_usuario.lower()
-        
-        if any(palavra in mensagem_lower for palavra in ['ansioso', 'ansiedade', 'nervoso']):
-            resposta_ia = "Entendo que você está sentindo ansiedade. Vamos tentar um exercício de respiração: inspire por 4 segundos, segure por 4, expire por 6. Repita algumas vezes. Como você está se sentindo agora?"
-        
-        elif any(palavra in mensagem_lower for palavra in ['triste', 'deprimido', 'sozinho']):
-            resposta_ia = "Sinto muito que você esteja se sentindo assim. Seus sentimentos são válidos e você não está sozinho. Às vezes, conversar sobre o que está acontecendo pode ajudar. Gostaria de me contar mais sobre o que está te deixando triste?"
-        
-        elif any(palavra in mensagem_lower for palavra in ['estresse', 'estressado', 'pressão']):
-            resposta_ia = "O estresse pode ser muito desafiador. Uma técnica que pode ajudar é a regra 5-4-3-2-1: identifique 5 coisas que você pode ver, 4 que pode tocar, 3 que pode ouvir, 2 que pode cheirar e 1 que pode saborear. Isso pode te ajudar a se conectar com o momento presente."
-        
-        else:
-            resposta_ia = random.choice(respostas_exemplo)
-        
         try:
-            if request.user.is_authenticated:
-                InteracaoIA.objects.create(
-                    usuario=request.user,
-                    mensagem_usuario=mensagem_usuario,
-                    resposta_ia=resposta_ia
-                )
-            
-            return JsonResponse({
+            usuario = await request.auser()
+            contexto = await acarregar_contexto(usuario.id) if usuario.is_authenticated else None
+            resposta_ia = await aresponder_mensagem(usuario, mensagem_usuario, contexto)
+            dados = {
                 'resposta': resposta_ia,
                 'timestamp': timezone.now().isoformat()
-            })
+            }
+            recomendacoes = await arecomendar_no_chat(usuario, mensagem_usuario, contexto)
+            if recomendacoes:
+                dados['recomendacoes'] = recomendacoes
+            
+            return JsonResponse(dados)
         except Exception as e:
             return JsonResponse({'error': 'Erro interno do servidor'}, status=500)
     
     return JsonResponse({'error': 'Método não permitido'}, status=405)
+
+
+# --- API de recomendação de psicólogos ---
+
+@login_required
+def recomendacoes_api(request):
+    """
+    Psicólogos indicados pela autoavaliação mais recente do usuário e,
+    opcionalmente, por um tema (?tema=ansiedade|estresse|tristeza).
+    """
+    if not recomendacao_disponivel():
+        return JsonResponse({'error': 'Recomendações indisponíveis no momento'}, status=503)
+
+    tema = request.GET.get('tema')
+    if tema and tema not in NECESSIDADES:
+        return JsonResponse({'error': 'Tema inválido'}, status=400)
+
+    autoavaliacao = carregar_contexto(request.user.id)['autoavaliacao']
+    return JsonResponse({'recomendacoes': recomendar(request.user.id, autoavaliacao, tema)})
+
+
+# --- Métricas operacionais (equipe) ---
+
+@staff_member_required
+def metricas_view(request):
+    """
+    Atraso das réplicas de leitura, em segundos (None: não medido), e
+    tentativas/conflitos de agendamento e tempo até reagendar pela lista de espera.
+    """
+    return JsonResponse({'replicas': atraso_replicas(), **metricas_agendamento()})
+
+
+def _data_do_parametro(request, nome, padrao):
+    try:
+        return datetime.date.fromisoformat(request.GET[nome])
+    except (KeyError, ValueError):
+        return padrao
+
+
+def _formatar_taxa(taxa):
+    return '' if taxa is None else f'{taxa:.4f}'
+
+
+@staff_member_required
+def relatorio_utilizacao_view(request):
+    """
+    Utilização da agenda e taxas de falta e cancelamento por psicólogo e
+    semana, lidas do resumo diário (app/utilizacao.py). ?formato=csv exporta.
+    """
+    hoje = timezone.localdate()
+    fim = _data_do_parametro(request, 'fim', hoje)
+    inicio = _data_do_parametro(request, 'inicio', fim - datetime.timedelta(weeks=12))
+    psicologo_id = request.GET.get('psicologo')
+    linhas = relatorio_semanal(inicio, fim, psicologo_id if psicologo_id and psicologo_id.isdigit() else None)
+
+    if request.GET.get('formato') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="utilizacao_{inicio}_{fim}.csv"'
+        escritor = csv.writer(response)
+        escritor.writerow([
+            'semana', 'psicologo_id', 'psicologo', 'horas_ofertadas', 'horas_reservadas', 'utilizacao',
+            'consultas', 'realizadas', 'faltas', 'taxa_faltas', 'canceladas_paciente', 'canceladas_psicologo',
+            'taxa_cancelamento',
+        ])
+        for linha in linhas:
+            escritor.writerow([
+                linha['semana'], linha['psicologo_id'], linha['psicologo__nome'],
+                round(linha['minutos_ofertados'] / 60, 2), round(linha['minutos_reservados'] / 60, 2),
+                _formatar_taxa(linha['utilizacao']), linha['consultas'], linha['realizadas'], linha['faltas'],
+                _formatar_taxa(linha['taxa_faltas']), linha['canceladas_paciente'], linha['canceladas_psicologo'],
+                _formatar_taxa(linha['taxa_cancelamento']),
+            ])
+        return response
+
+    return render(request, 'relatorio_utilizacao.html', {
+        'linhas': linhas,
+        'inicio': inicio,
+        'fim': fim,
+        'psicologo_id': psicologo_id or '',
+    })
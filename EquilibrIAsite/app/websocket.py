@@ -0,0 +1,161 @@
+"""
+Canal WebSocket do chat de apoio emocional, servido pela aplicação ASGI.
+
+Sem Channels: config/asgi.py encaminha as conexões WebSocket em CAMINHO
+para ChatWebSocket e todo o resto para o Django. O usuário vem do cookie de
+sessão enviado na abertura (como o AuthenticationMiddleware faria); numa
+conexão autenticada, a sessão é conferida de novo a cada mensagem, e o
+socket é fechado (4401) se ela deixou de valer (logout, troca de senha).
+Cada mensagem é um frame JSON, sem CSRF a processar:
+
+    cliente → {"mensagem": "..."}
+    servidor → {"resposta": "...", "timestamp": "...", "recomendacoes": [...]}
+               ou {"error": "...", "retry_after": s}
+
+A origem da conexão precisa ser o próprio site (WebSockets não passam pelo
+CSRF) e as mensagens respeitam o mesmo limite de taxa do POST. O endpoint
+POST continua valendo: a página volta para ele se o WebSocket não abrir
+(ex.: servidor WSGI).
+"""
+import json
+import math
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aget_user
+from django.db import close_old_connections
+from django.http.cookie import parse_cookie
+from django.http.request import split_domain_port, validate_host
+from django.utils import timezone
+
+from .contexto import acarregar_contexto
+from .ia import aresponder_mensagem
+from .recomendacao import arecomendar_no_chat
+from .throttling import cliente_por_ip, cliente_por_usuario, consumir_ficha, interpretar_taxa
+
+CAMINHO = '/ws/apoio_emocional/'
+TAMANHO_MAXIMO = 8 * 1024  # caracteres por frame
+ROTA_THROTTLE = 'apoio_emocional'  # mesmo limite do POST da página
+
+
+def _cabecalhos(scope):
+    return {nome.decode('latin-1').lower(): valor.decode('latin-1') for nome, valor in scope.get('headers', [])}
+
+
+def origem_permitida(cabecalhos):
+    """Origin igual ao Host, e Host aceito por ALLOWED_HOSTS."""
+    host = cabecalhos.get('host', '')
+    origem = cabecalhos.get('origin')
+    if not origem or urlsplit(origem).netloc != host:
+        return False
+    dominio, _ = split_domain_port(host)
+    permitidos = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not permitidos:
+        permitidos = ['.localhost', '127.0.0.1', '[::1]']
+    return bool(dominio) and validate_host(dominio, permitidos)
+
+
+def chave_sessao(cabecalhos):
+    # parse_cookie, como o Django: um cookie malformado não descarta os outros
+    return parse_cookie(cabecalhos.get('cookie', '')).get(settings.SESSION_COOKIE_NAME)
+
+
+async def autenticar(chave):
+    """Usuário da sessão de chave dada (AnonymousUser se não houver ou não valer mais)."""
+    engine = import_module(settings.SESSION_ENGINE)
+    return await aget_user(SimpleNamespace(session=engine.SessionStore(chave)))
+
+
+def _cliente(scope, cabecalhos, usuario):
+    # Mesma chave do ThrottleMiddleware: o limite é um só para POST e WebSocket
+    if usuario.is_authenticated:
+        return cliente_por_usuario(usuario.pk)
+    return cliente_por_ip((scope.get('client') or ('',))[0], cabecalhos.get('x-forwarded-for'))
+
+
+class ChatWebSocket:
+    """Aplicação ASGI de uma conexão WebSocket do chat."""
+
+    def __init__(self):
+        taxa = getattr(settings, 'THROTTLE_TAXAS', {}).get(ROTA_THROTTLE)
+        self.taxa = interpretar_taxa(taxa) if taxa else None
+
+    async def __call__(self, scope, receive, send):
+        evento = await receive()
+        if evento['type'] != 'websocket.connect':
+            return
+
+        cabecalhos = _cabecalhos(scope)
+        if not origem_permitida(cabecalhos):
+            await send({'type': 'websocket.close', 'code': 4403})
+            return
+        sessao = chave_sessao(cabecalhos)
+        usuario = await autenticar(sessao)
+        await send({'type': 'websocket.accept'})
+
+        chave_throttle = f'throttle:{ROTA_THROTTLE}:{_cliente(scope, cabecalhos, usuario)}'
+        while True:
+            evento = await receive()
+            if evento['type'] == 'websocket.disconnect':
+                return
+            if evento['type'] != 'websocket.receive':
+                continue
+            # Como no início de cada requisição HTTP: descarta conexões vencidas ou quebradas
+            await sync_to_async(close_old_connections)()
+            if usuario.is_authenticated:
+                atual = await autenticar(sessao)
+                if atual.pk != usuario.pk:
+                    await send({'type': 'websocket.close', 'code': 4401})
+                    return
+                usuario = atual
+            dados = await self.processar(evento.get('text') or '', usuario, chave_throttle)
+            await send({'type': 'websocket.send', 'text': json.dumps(dados)})
+
+    async def processar(self, texto, usuario, chave_throttle):
+        if len(texto) > TAMANHO_MAXIMO:
+            return {'error': 'Mensagem muito longa'}
+        try:
+            mensagem = json.loads(texto).get('mensagem')
+        except (ValueError, AttributeError):
+            mensagem = None
+        if not isinstance(mensagem, str) or not mensagem.strip():
+            return {'error': 'Mensagem não pode estar vazia'}
+
+        if self.taxa:
+            permitido, espera = await sync_to_async(consumir_ficha)(chave_throttle, *self.taxa)
+            if not permitido:
+                return {
+                    'error': 'Muitas mensagens em pouco tempo. Aguarde um instante e tente novamente.',
+                    'retry_after': max(1, math.ceil(espera)),
+                }
+
+        try:
+            contexto = await acarregar_contexto(usuario.id) if usuario.is_authenticated else None
+            dados = {
+                'resposta': await aresponder_mensagem(usuario, mensagem, contexto),
+                'timestamp': timezone.now().isoformat(),
+            }
+            recomendacoes = await arecomendar_no_chat(usuario, mensagem, contexto)
+            if recomendacoes:
+                dados['recomendacoes'] = recomendacoes
+            return dados
+        except Exception:
+            return {'error': 'Erro interno do servidor'}
+
+
+def rotear_websockets(aplicacao_http):
+    """Aplicação ASGI: o chat em CAMINHO vai para ChatWebSocket, o resto para o Django."""
+    chat = ChatWebSocket()
+
+    async def aplicacao(scope, receive, send):
+        if scope['type'] == 'websocket':
+            if scope['path'] == CAMINHO:
+                return await chat(scope, receive, send)
+            await receive()  # websocket.connect
+            return await send({'type': 'websocket.close', 'code': 4404})
+        return await aplicacao_http(scope, receive, send)
+
+    return aplicacao
@@ -12,5 +12,17 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Lido pelas settings (conexões com o banco) e pelo aquecimento
+os.environ.setdefault('SERVIDOR_ASGI', '1')
 
 application = get_asgi_application()
+
+# WebSocket do chat de apoio emocional (app/websocket.py); o resto segue para o Django
+from app.websocket import rotear_websockets  # noqa: E402
+
+application = rotear_websockets(application)
+
+# Aquece templates, URLs, banco e caches antes da primeira requisição
+from app.aquecimento import aquecer  # noqa: E402
+
+aquecer()
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,15 +19,19 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'app',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'app.middleware.ThrottleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'app.middleware.PerfilMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -44,6 +49,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'app.context_processors.perfil',
             ],
         },
     },
@@ -63,9 +69,84 @@ DATABASES = {
     }
 }
 
+# Conexões reaproveitadas entre requisições (e abertas já no aquecimento do
+# worker, ver app/aquecimento.py). Com DATABASE_POOL=1 (requer psycopg[pool]),
+# usa o pool de conexões do Django, compartilhado pelas threads do worker.
+# Sob ASGI (config/asgi.py define SERVIDOR_ASGI), o ORM roda em threads do
+# asgiref e conexões persistentes não são reaproveitadas de forma confiável:
+# sem o pool, cada requisição abre e fecha a sua. Use DATABASE_POOL=1.
+SERVIDOR_ASGI = bool(os.environ.get('SERVIDOR_ASGI'))
+if os.environ.get('DATABASE_POOL'):
+    DATABASES['default']['OPTIONS'] = {'pool': {'min_size': 2, 'max_size': 10}}
+elif SERVIDOR_ASGI:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = 60
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Réplicas de leitura: DATABASE_REPLICAS="host1:5432,host2:5432" (mesmo banco,
+# usuário e senha do primário). Ver app/db_router.py.
+for numero, endereco in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    host, _, porta = endereco.strip().partition(':')
+    DATABASES[f'replica_{numero}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': porta or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['app.db_router.ReplicaRouter']
+REPLICA_JANELA_FIXACAO = 5  # segundos no primário depois de uma escrita
+
+# Cache
+# Em produção, defina REDIS_URL para que o cache (e os limites de taxa)
+# seja compartilhado entre todos os workers.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        # Configure o Redis com maxmemory-policy allkeys-lru
+        'contexto': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'contexto',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
 # Custom User Model
 AUTH_USER_MODEL = 'app.Usuario'
 
+# Login por nome de usuário ou e-mail
+AUTHENTICATION_BACKENDS = [
+    'app.backends.UsuarioOuEmailBackend',
+]
+
+# Hash de senhas (app/hashers.py): Argon2 se o pacote argon2-cffi estiver
+# instalado, senão PBKDF2. Hashes antigos de outro algoritmo ou com outros
+# custos são refeitos no próximo login. Para escolher os custos para o
+# hardware de produção, use "manage.py calibrar_hash".
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if find_spec('argon2'):
+    PASSWORD_HASHERS.insert(0, 'app.hashers.Argon2ConfiguravelHasher')
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19456))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+# Processos dedicados ao hash no login/cadastro (0: threads do próprio worker)
+HASH_PROCESSOS = int(os.environ.get('HASH_PROCESSOS', 2))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -99,4 +180,75 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = 'home'     # após login, vai para home
-LOGOUT_REDIRECT_URL = 'home'    # após logout, volta para home
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'    # após logout, volta para home
+
+# Exportação de dados pessoais (LGPD): linhas buscadas por vez no cursor do banco
+EXPORTACAO_CHUNK_SIZE = 2000
+
+# Limites de taxa por rota (nome da URL): "quantidade/unidade" (s, min, h).
+# Valem para métodos que não são GET/HEAD/OPTIONS.
+THROTTLE_CACHE = 'default'
+THROTTLE_TAXAS = {
+    'apoio_emocional': '20/min',
+    'chat_ia_api': '20/min',
+}
+if os.environ.get('THROTTLE_DESATIVADO'):  # benchmarks de carga
+    THROTTLE_TAXAS = {}
+# Use o último IP de X-Forwarded-For (apenas atrás de um proxy reverso confiável)
+THROTTLE_USAR_X_FORWARDED_FOR = False
+
+# Serviço de respostas da IA (opcional; requer o pacote httpx).
+# Sem URL, o chat usa o simulador de respostas fixas.
+IA_RESPONDER_URL = os.environ.get('IA_RESPONDER_URL')
+IA_RESPONDER_TIMEOUT = 10  # segundos
+# Atraso artificial do simulador, útil para benchmarks de concorrência
+IA_LATENCIA_SIMULADA = float(os.environ.get('IA_LATENCIA_SIMULADA', 0))
+
+# Contexto de conversa do chat (últimos turnos + autoavaliação mais recente).
+# Só fica em cache com REDIS_URL; sem ele, é lido do banco a cada mensagem.
+CONTEXTO_CHAT_CACHE = 'contexto' if 'contexto' in CACHES else 'default'
+CONTEXTO_CHAT_TURNOS = 10
+CONTEXTO_CHAT_TTL = 30 * 60  # segundos
+
+# Média bayesiana das avaliações: (PESO * MEDIA + soma) / (PESO + total)
+AVALIACAO_PRIOR_PESO = 5
+AVALIACAO_PRIOR_MEDIA = 3.0
+
+# Recomendação de psicólogos (requer numpy). O log de alterações da matriz
+# fica neste cache. Com um cache local (sem REDIS_URL), as alterações feitas
+# em outro worker só chegam quando a matriz é reconstruída, a cada
+# RECOMENDACAO_TTL_LOCAL segundos.
+RECOMENDACAO_CACHE = 'default'
+RECOMENDACAO_TOP_K = 5
+RECOMENDACAO_CACHE_TTL = 10 * 60  # segundos
+RECOMENDACAO_TTL_LOCAL = 60  # segundos
+CONSULTA_DURACAO_MINUTOS = 60
+
+# Lista de espera: por quanto tempo um horário liberado fica reservado para
+# o primeiro da fila (app/lista_espera.py)
+LISTA_ESPERA_RESERVA_MINUTOS = 30
+LISTA_ESPERA_JANELA_MAXIMA_DIAS = 60
+
+# E-mail (mensagens de contato). Para testar localmente, rode um servidor SMTP
+# de depuração na porta 1025 (ver README) e o comando enviar_contatos.
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = bool(os.environ.get('EMAIL_USE_TLS'))
+EMAIL_TIMEOUT = 10  # segundos
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'contato@equilibria.com.br')
+CONTATO_DESTINATARIOS = [os.environ.get('CONTATO_DESTINATARIO', 'contato@equilibria.com.br')]
+CONTATO_MAX_TENTATIVAS = 8
+CONTATO_ESPERA_BASE = 60  # segundos; dobra a cada falha
+CONTATO_ESPERA_MAXIMA = 6 * 60 * 60
+CONTATO_RESERVA_SEGUNDOS = 10 * 60  # prazo de um lote reservado por um processo de envio
+
+# Blog: listagens, feed e sitemap ficam em cache até a próxima alteração de artigo.
+# Com um cache local (sem REDIS_URL), os outros workers só veem a alteração
+# quando a entrada vence, a cada BLOG_TTL_LOCAL segundos.
+BLOG_CACHE_TTL = 60 * 60  # segundos
+BLOG_TTL_LOCAL = 60  # segundos
+
+# Aquecimento do worker na carga da aplicação WSGI/ASGI (AQUECIMENTO=0 desativa)
+AQUECIMENTO_ATIVO = os.environ.get('AQUECIMENTO', '1') != '0'
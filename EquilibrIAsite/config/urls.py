@@ -1,7 +1,9 @@
 from django.contrib import admin
+from django.contrib.sitemaps.views import sitemap
 from django.urls import include, path
 from django.views.generic import TemplateView
 from app.views import *
+from app.blog import ArtigosFeed, SITEMAPS, em_cache_por_versao
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,8 +12,12 @@ urlpatterns = [
     path('servicos/', ServicosView.as_view(), name='servicos'),
     path('profissionais/', ProfissionaisView.as_view(), name='profissionais'),
     path('blog/', BlogView.as_view(), name='blog'),
+    path('blog/feed/', em_cache_por_versao(ArtigosFeed()), name='blog_feed'),
+    path('blog/<slug:slug>/', ArtigoView.as_view(), name='artigo'),
+    path('sitemap.xml', em_cache_por_versao(sitemap), {'sitemaps': SITEMAPS}, name='sitemap'),
     path('contato/', ContatoView.as_view(), name='contato'),
     path('agendamento/', AgendamentoView.as_view(), name='agendamento'),
+    path('agendamento/lista-espera/', lista_espera_view, name='lista_espera'),
     path('apoio_emocional/', ApoioEmocionalView.as_view(), name='apoio_emocional'),
     path('emergencias/', EmergenciaView.as_view(), name='emergencias'),
 
@@ -25,7 +31,11 @@ urlpatterns = [
     path('registro/', registro_view, name='registro'),
     path('logout/', logout_view, name='logout'),
     path('perfil/', perfil_view, name='perfil'),
+    path('perfil/exportar/', exportar_dados_view, name='exportar_dados'),
     
     # API para chat com IA
     path('api/chat-ia/', chat_ia_api, name='chat_ia_api'),
+    path('api/recomendacoes/', recomendacoes_api, name='recomendacoes_api'),
+    path('metricas/', metricas_view, name='metricas'),
+    path('relatorios/utilizacao/', relatorio_utilizacao_view, name='relatorio_utilizacao'),
 ]
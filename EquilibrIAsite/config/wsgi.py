@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Aquece templates, URLs, banco e caches antes da primeira requisição
+from app.aquecimento import aquecer  # noqa: E402
+
+aquecer()